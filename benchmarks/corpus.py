@@ -0,0 +1,143 @@
+"""
+Seeded synthetic lead corpus, shaped like the records the three collectors
+produce. The same size and seed always give the same leads, so benchmark
+runs are comparable. Leads are generated lazily: a 5M lead corpus never sits
+in memory.
+"""
+import random
+from collections import deque
+
+# Share of the corpus per niche (registry key -> weight)
+NICHE_WEIGHTS = {"real_estate": 0.4, "tutors": 0.3, "service_providers": 0.3}
+# Share of leads that are a re-sighting of an earlier lead of the same niche
+# (same person, email case or phone format changed), as a rescrape would give
+DUPLICATE_RATE = 0.05
+# Share of leads without an email, and without a phone (never both)
+MISSING_EMAIL_RATE = 0.05
+MISSING_PHONE_RATE = 0.05
+# Earlier leads a re-sighting can repeat
+RECENT_LEADS = 10000
+
+FIRST_NAMES = (
+    "Thabo", "Lerato", "Sipho", "Naledi", "Johan", "Anika", "Pieter", "Zanele", "Ayanda", "Michael",
+    "Sarah", "David", "Nomvula", "Kagiso", "Fatima", "Ravi", "Megan", "Bongani", "Lindiwe", "Chris",
+)
+LAST_NAMES = (
+    "Nkosi", "Dlamini", "van der Merwe", "Botha", "Naidoo", "Mokoena", "Smith", "Pillay", "Khumalo",
+    "Venter", "Jacobs", "Mthembu", "Pretorius", "Ndlovu", "Williams", "Govender", "Coetzee", "Zulu",
+)
+LOCATIONS = ("Cape Town", "Johannesburg", "Durban", "Pretoria", "Port Elizabeth", "Bloemfontein", "Stellenbosch")
+AGENCIES = ("Pam Golding", "Seeff", "Rawson", "Remax", "Chas Everitt", "Harcourts", "Lew Geffen")
+SUBJECTS = ("Math", "Science", "English", "History", "Coding", "Afrikaans", "Accounting")
+SERVICES = ("Plumber", "Electrician", "Locksmith", "Mechanic", "Painter", "Roofer")
+MAIL_DOMAINS = ("gmail.com", "outlook.com", "teachme.co.za", "webmail.co.za")
+
+def parse_size(text):
+    """Corpus size from '10k', '2.5m', '5M' or a plain number."""
+    text = str(text).strip().lower().replace("_", "")
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    if multiplier > 1:
+        text = text[:-1]
+    size = int(float(text) * multiplier)
+    if size <= 0:
+        raise ValueError(f"Corpus size must be positive: {text!r}")
+    return size
+
+def niche_counts(size):
+    """How many of size leads each niche gets (they add up to size)."""
+    counts = {niche: int(size * weight) for niche, weight in NICHE_WEIGHTS.items()}
+    first = next(iter(counts))
+    counts[first] += size - sum(counts.values())
+    return counts
+
+def _phone_digits(index, niche_offset):
+    # 7919 is coprime with 10**8, so every index gets its own 8 digits
+    return f"8{(index * 7919 + niche_offset) % 10 ** 8:08d}"
+
+def _format_phone(digits, style):
+    """+27 and the 9 national digits, as the collectors find them written."""
+    if style == 0:
+        return f"+27{digits}"
+    if style == 1:
+        return f"0{digits[:2]} {digits[2:5]} {digits[5:]}"
+    return f"+27 {digits[:2]} {digits[2:5]} {digits[5:]}"
+
+def _real_estate(rng, i, first, last, phone):
+    agency = rng.choice(AGENCIES)
+    return {
+        "first_name": first,
+        "last_name": last,
+        "email": f"{first}.{last}{i}@{agency.lower().replace(' ', '')}.co.za".replace(" ", "").lower(),
+        "phone": phone,
+        "company": agency,
+        "role": "Property Practitioner",
+        "source": "Property24 (Synthetic)",
+        "url": f"https://www.property24.com/agent/{i}",
+        "location": rng.choice(LOCATIONS),
+    }
+
+def _tutors(rng, i, first, last, phone):
+    subject = rng.choice(SUBJECTS)
+    return {
+        "first_name": first,
+        "last_name": last,
+        "email": f"{first}{last}{i}@{rng.choice(MAIL_DOMAINS)}".replace(" ", "").lower(),
+        "phone": phone,
+        "company": "Private Tutor",
+        "role": f"{subject} Tutor",
+        "source": "Superprof (Synthetic)",
+        "url": f"https://www.superprof.co.za/tutor/{i}",
+        "location": rng.choice(LOCATIONS + ("Online",)),
+    }
+
+def _service_providers(rng, i, first, last, phone):
+    service = rng.choice(SERVICES)
+    return {
+        "first_name": first,
+        "last_name": last,
+        "email": f"contact@{service.lower()}{i}.co.za",
+        "phone": phone,
+        "company": f"{last} {service} Services {i}",
+        "role": service,
+        "source": "Bark (Synthetic)",
+        "url": f"https://www.bark.com/en/za/company/{i}",
+        "location": rng.choice(LOCATIONS),
+    }
+
+BUILDERS = {"real_estate": _real_estate, "tutors": _tutors, "service_providers": _service_providers}
+
+def _resighting(rng, lead):
+    """The same lead seen again: the email's case or the phone's format differs."""
+    lead = dict(lead)
+    if lead["email"] and rng.random() < 0.5:
+        lead["email"] = lead["email"].upper()
+    elif lead["phone"]:
+        digits = "".join(ch for ch in lead["phone"] if ch.isdigit())[-9:]
+        lead["phone"] = _format_phone(digits, rng.randrange(3))
+    return lead
+
+def niche_leads(niche, count, seed=42):
+    """Yields count lead dicts for the niche (a NICHE_WEIGHTS key)."""
+    build = BUILDERS[niche]
+    niche_offset = list(BUILDERS).index(niche) * 33333331
+    rng = random.Random(f"{seed}:{niche}")
+    recent = deque(maxlen=RECENT_LEADS)
+    for i in range(count):
+        if recent and rng.random() < DUPLICATE_RATE:
+            yield _resighting(rng, rng.choice(recent))
+            continue
+        phone = _format_phone(_phone_digits(i, niche_offset), rng.randrange(3))
+        lead = build(rng, i, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), phone)
+        roll = rng.random()
+        if roll < MISSING_EMAIL_RATE:
+            lead["email"] = None
+        elif roll < MISSING_EMAIL_RATE + MISSING_PHONE_RATE:
+            lead["phone"] = None
+        recent.append(lead)
+        yield lead
+
+def generate(size, seed=42):
+    """Yields (niche, lead) for a corpus of size leads, niche by niche."""
+    for niche, count in niche_counts(size).items():
+        for lead in niche_leads(niche, count, seed):
+            yield niche, lead
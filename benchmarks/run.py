@@ -0,0 +1,161 @@
+"""
+End-to-end benchmarks on a synthetic corpus (see corpus.py):
+
+    PYTHONPATH=src python -m benchmarks.run --size 100k --output results.json
+
+Runs in a temporary directory with its own SQLite database, so the real
+leads.db, reports and logs are never touched. Results are written as JSON
+and, when a baseline file exists, compared against it metric by metric.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from .corpus import parse_size
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+STAGE_NAMES = ("ingest", "process", "export", "api")
+
+def higher_is_better(metric):
+    """True for rates, False for durations and latencies, None for metrics that are context only."""
+    if metric.endswith("_per_second"):
+        return True
+    if metric.endswith(("_seconds", "_ms")):
+        return False
+    return None
+
+def compare(results, baseline, tolerance):
+    """
+    Every metric present in both runs, with its relative change and whether
+    that is a regression or an improvement beyond tolerance (0.1 = 10%).
+    """
+    comparison = {}
+    for stage, metrics in results["stages"].items():
+        for metric, current in metrics.items():
+            direction = higher_is_better(metric)
+            previous = baseline.get("stages", {}).get(stage, {}).get(metric)
+            if direction is None or not current or not previous:
+                continue
+            change = (current - previous) / previous
+            better = change > 0 if direction else change < 0
+            if abs(change) <= tolerance:
+                status = "ok"
+            else:
+                status = "improved" if better else "regressed"
+            comparison[f"{stage}.{metric}"] = {
+                "baseline": previous,
+                "current": current,
+                "change": round(change, 4),
+                "status": status,
+            }
+    return comparison
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="LeadForge end-to-end benchmarks")
+    parser.add_argument("--size", default="10k", help="Corpus size: 10k, 100k, 1m, 5m, ...")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", default=",".join(STAGE_NAMES),
+                        help=f"Comma separated, from {', '.join(STAGE_NAMES)} (ingest always runs: it loads the corpus)")
+    parser.add_argument("--process-rows", type=int, default=1000000, help="Leads cleaned, scored and put in the delta Excel report")
+    parser.add_argument("--pdf-rows", type=int, default=20000, help="Leads rendered in the PDF report")
+    parser.add_argument("--api-requests", type=int, default=50, help="Requests per API endpoint")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 when a metric regressed")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory (database, reports, log)")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = set(stages) - set(STAGE_NAMES)
+    if unknown:
+        parser.error(f"Unknown stages {sorted(unknown)}. Available: {list(STAGE_NAMES)}")
+    stages = [name for name in STAGE_NAMES if name == "ingest" or name in stages]
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+
+    # The application reads its settings at import time: point it at a
+    # database of its own and switch off every wait and external call first
+    workdir = tempfile.mkdtemp(prefix="leadforge-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["HTTP_CACHE_DIR"] = os.path.join(workdir, "http_cache")
+    os.environ["FETCH_JITTER_SECONDS"] = "0"
+    os.environ.pop("GOOGLE_PLACES_API_KEY", None)  # enrich with mock data, not the Places API
+    os.chdir(workdir)
+    from .stages import STAGES, Bench
+
+    # Per-batch INFO logging would be a large part of what's measured
+    logging.getLogger("LeadForge").setLevel(logging.WARNING)
+
+    bench = Bench(size, seed=args.seed, workdir=workdir, process_rows=args.process_rows,
+                  pdf_rows=args.pdf_rows, api_requests=args.api_requests)
+    results = {
+        "meta": {
+            "size": size,
+            "seed": args.seed,
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "stages": {},
+    }
+    try:
+        for name in stages:
+            print(f"Running {name} ({size} leads)...", flush=True)
+            results["stages"][name] = STAGES[name](bench)
+            print(json.dumps(results["stages"][name], indent=2), flush=True)
+    finally:
+        if args.keep:
+            print(f"Working directory kept: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    # ru_maxrss is in KB on Linux
+    results["meta"]["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    regressed = []
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("size") != size:
+            print(f"Warning: the baseline is a {baseline.get('meta', {}).get('size')} lead run, this one {size}")
+        comparison = compare(results, baseline, args.tolerance)
+        results["comparison"] = {"baseline": baseline_path, "tolerance": args.tolerance, "metrics": comparison}
+        print(f"\nCompared with {baseline_path} (tolerance {args.tolerance:.0%}):")
+        for metric, entry in comparison.items():
+            print(f"  {metric:45} {entry['baseline']:>12} -> {entry['current']:>12} {entry['change']:+8.1%}  {entry['status']}")
+        regressed = [metric for metric, entry in comparison.items() if entry["status"] == "regressed"]
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+
+    if regressed:
+        print(f"{len(regressed)} metric(s) regressed: {', '.join(regressed)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
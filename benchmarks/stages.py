@@ -0,0 +1,212 @@
+"""
+The benchmark stages. Each one takes the Bench and returns its metrics:
+rates end in _per_second (higher is better), durations and latencies in
+_seconds or _ms (lower is better); anything else is context.
+
+Importing this module imports the application, so run.py only does it once
+DATABASE_URL points at the benchmark's own database.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from sqlalchemy import func, select
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, Lead, LEAD_PUBLIC_FIELDS
+from registry import niche_label
+from . import corpus
+
+MB = 1024 * 1024
+
+STAGES = {}
+
+def stage(name):
+    def register(function):
+        STAGES[name] = function
+        return function
+    return register
+
+@contextmanager
+def timed(result):
+    """Stores the block's wall time in result['seconds']."""
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - started
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+def percentiles(prefix, samples_ms):
+    """p50/p95/p99 and mean of a list of latencies, as {prefix}_p50_ms etc."""
+    if len(samples_ms) > 1:
+        cuts = statistics.quantiles(samples_ms, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = samples_ms[0]
+    return {
+        f"{prefix}_p50_ms": round(p50, 2),
+        f"{prefix}_p95_ms": round(p95, 2),
+        f"{prefix}_p99_ms": round(p99, 2),
+        f"{prefix}_mean_ms": round(statistics.fmean(samples_ms), 2),
+    }
+
+class CorpusCollector(BaseCollector):
+    """
+    Collects a corpus niche through the same path as the real collectors
+    (fetch scheduler, save_lead, batched upserts), minus the waiting: no
+    simulated page loads, rate limit or jitter.
+    """
+    requests_per_second = None
+
+    def __init__(self, niche_name, db_session=None):
+        super().__init__(niche_name, db_session)
+        self.scheduler.jitter = 0
+
+    async def collect(self, leads):
+        async for lead in self.fetch_all(self.fetch_lead, leads):
+            self.save_lead(lead)
+            # self.data keeps every new lead for the reports; a large corpus would not fit
+            if len(self.data) >= 10000:
+                self.data.clear()
+
+    async def fetch_lead(self, lead):
+        await self.random_delay(0.5, 1.5)  # Simulated page load
+        return lead
+
+    async def random_delay(self, min_seconds=1, max_seconds=3):
+        pass
+
+class Bench:
+    def __init__(self, size, seed=42, workdir=".", process_rows=1000000, pdf_rows=20000, api_requests=50):
+        self.size = size
+        self.seed = seed
+        self.workdir = workdir
+        self.process_rows = process_rows
+        self.pdf_rows = pdf_rows
+        self.api_requests = api_requests
+        self.scored = None  # The process stage's output, reused by export
+
+    def records(self, limit):
+        """The first limit stored leads, as the report pipeline reads them."""
+        query = select(*(getattr(Lead, column) for column in LEAD_PUBLIC_FIELDS)).order_by(Lead.id).limit(limit)
+        with SessionLocal() as db:
+            return [dict(row._mapping) for row in db.execute(query)]
+
+@stage("ingest")
+def ingest(bench):
+    """Corpus leads saved per second, through the collectors' fetch and write-behind path."""
+    import asyncio
+
+    init_db()
+    result = {'leads': bench.size}
+    with timed(result), SessionLocal() as db:
+        for niche, count in corpus.niche_counts(bench.size).items():
+            collector = CorpusCollector(niche_label(niche), db)
+            asyncio.run(collector.collect(corpus.niche_leads(niche, count, bench.seed)))
+    with SessionLocal() as db:
+        result['stored'] = db.query(func.count(Lead.id)).scalar()
+    result['seconds'] = round(result['seconds'], 3)
+    result['leads_per_second'] = rate(bench.size, result['seconds'])
+    result['database_mb'] = round(os.path.getsize(os.path.join(bench.workdir, "bench.db")) / MB, 2)
+    return result
+
+@stage("process")
+def process(bench):
+    """DataProcessor clean (with the mock enricher and its cache) and score throughput."""
+    from processors.data_processor import DataProcessor
+
+    records = bench.records(bench.process_rows)
+    clean, score = {}, {}
+    with timed(clean):
+        processor = DataProcessor(records)
+        processor.clean_data()
+    with timed(score):
+        bench.scored = processor.score_leads()
+    return {
+        'rows': len(records),
+        'clean_seconds': round(clean['seconds'], 3),
+        'clean_rows_per_second': rate(len(records), clean['seconds']),
+        'score_seconds': round(score['seconds'], 3),
+        'score_rows_per_second': rate(len(records), score['seconds']),
+    }
+
+@stage("export")
+def export(bench):
+    """Report generation speed: the streamed Excel export of every lead, and the delta reports' Excel and PDF."""
+    from generators.report_generator import ReportGenerator
+
+    output_dir = os.path.join(bench.workdir, "reports")
+    data = bench.scored if bench.scored is not None else bench.records(bench.process_rows)
+    result = {}
+    with SessionLocal() as db:
+        generator = ReportGenerator(output_dir=output_dir, db_session=db)
+
+        streamed = {}
+        with timed(streamed):
+            path = generator.stream_excel(filename="bench_stream.xlsx")
+        rows = db.query(func.count(Lead.id)).filter(Lead.duplicate_of.is_(None)).scalar()
+        result.update(_file_metrics("xlsx_stream", path, rows, streamed['seconds']))
+
+        excel = {}
+        with timed(excel):
+            path = generator.generate_excel(data, filename="bench_report.xlsx")
+        result.update(_file_metrics("xlsx", path, len(data), excel['seconds']))
+
+        sample = data[:bench.pdf_rows]
+        pdf = {}
+        with timed(pdf):
+            path = generator.generate_pdf(sample, title="Benchmark Leads", filename="bench_report.pdf")
+        result.update(_file_metrics("pdf", path, len(sample), pdf['seconds']))
+    return result
+
+def _file_metrics(prefix, path, rows, seconds):
+    size_mb = os.path.getsize(path) / MB
+    return {
+        f"{prefix}_rows": rows,
+        f"{prefix}_mb": round(size_mb, 2),
+        f"{prefix}_seconds": round(seconds, 3),
+        f"{prefix}_rows_per_second": rate(rows, seconds),
+        f"{prefix}_mb_per_second": rate(size_mb, seconds),
+    }
+
+@stage("api")
+def api_latency(bench):
+    """Latency of the API's read endpoints, called in process (no network) as the admin user."""
+    from fastapi.testclient import TestClient
+    import api
+
+    result = {}
+    with TestClient(api.app) as client:
+        token = client.post("/token", data={"username": "admin@leadforge.com", "password": "admin"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def measure(name, path, params=None, repeat=bench.api_requests):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.get(path, params=params, headers=headers)
+                samples.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+            result.update(percentiles(name, samples))
+
+        measure("leads_first_page", "/leads", {"limit": 100})
+        measure("leads_niche_page", "/leads", {"limit": 100, "niche": niche_label("tutors")})
+        measure("stats", "/stats")
+        measure("stats_breakdown", "/stats/breakdown", {"bucket": "week", "by_source": True})
+
+        # Keyset paging deep into the table costs the same as the first page
+        samples, cursor = [], None
+        for _ in range(bench.api_requests):
+            started = time.perf_counter()
+            response = client.get("/leads", params={"limit": 100, "cursor": cursor} if cursor else {"limit": 100}, headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        result.update(percentiles("leads_next_page", samples))
+
+        result['leads_csv_rows'] = min(10000, bench.size)
+        measure("leads_csv", "/leads", {"format": "csv", "limit": result['leads_csv_rows']}, repeat=max(1, bench.api_requests // 10))
+    return result
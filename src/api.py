@@ -1,16 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from database import get_db, Lead, Source, User, init_db
-from collectors.real_estate_collector import RealEstateCollector
-from collectors.tutor_collector import TutorCollector
-from collectors.service_provider_collector import ServiceProviderCollector
-from auth import authenticate_user, create_access_token, get_current_user, create_default_admin, ACCESS_TOKEN_EXPIRE_MINUTES
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_engine, get_async_db, get_db, AsyncSessionLocal, Lead, LEAD_PUBLIC_FIELDS, User, init_db
+from auth import aauthenticate_user, create_access_token, create_api_key, get_current_user, create_default_admin, Principal, ACCESS_TOKEN_EXPIRE_MINUTES
+from jobs import JobManager
+from blacklist import blacklist
+from registry import NICHES, niche_key, niche_label
+import metrics
+import stats
 from logger import logger
-import asyncio
-from datetime import timedelta
+import base64
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
 
 app = FastAPI(title="LeadForge API", version="3.0.0")
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Scrape jobs run in the background on this many workers
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "2"))
+job_manager = JobManager(max_workers=SCRAPE_WORKERS)
 
 # Initialize database and create default admin on startup
 @app.on_event("startup")
@@ -23,13 +38,14 @@ def startup_event():
     finally:
         db.close()
 
-# Dependency to get DB session
-def get_db_session():
-    db = next(get_db())
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+async def start_job_manager():
+    await job_manager.start()
+
+@app.on_event("shutdown")
+async def stop_job_manager():
+    await job_manager.stop()
+    await async_engine.dispose()
 
 @app.get("/")
 def read_root():
@@ -39,10 +55,16 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def get_metrics():
+    """Pipeline and API metrics in the Prometheus text format, for scraping."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Login endpoint to get JWT token."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await aauthenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=401,
@@ -55,65 +77,197 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-async def run_collector_task(collector_cls, niche_name: str, db: Session):
-    logger.info(f"Starting background task for {niche_name}")
-    collector = collector_cls(db)
-    await collector.collect(num_samples=20)
-    logger.info(f"Background task for {niche_name} completed")
+@app.post("/api-keys", status_code=201)
+async def issue_api_key(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Issue an API key for the X-API-Key header. Replaces the user's previous key."""
+    user = await db.get(User, current_user.id)
+    api_key = await create_api_key(db, user)
+    return {"api_key": api_key, "header": "X-API-Key"}
 
-@app.post("/scrape/{niche}")
+@app.post("/scrape/{niche}", status_code=202)
 async def trigger_scrape(
-    niche: str, 
-    background_tasks: BackgroundTasks, 
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session)
+    niche: str,
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Trigger scraping job. Requires Pro or Enterprise subscription."""
+    """
+    Queue a scraping job and return its id immediately. Requires Pro or Enterprise subscription.
+    If the niche already has a queued or running job, that job is returned instead.
+    """
     # Check subscription tier
     if current_user.subscription_tier == "Free":
         raise HTTPException(
             status_code=403,
             detail="Scraping is not available on Free tier. Please upgrade to Pro or Enterprise."
         )
-    
-    niche_map = {
-        "real_estate": (RealEstateCollector, "Real Estate"),
-        "tutors": (TutorCollector, "Tutors"),
-        "service_providers": (ServiceProviderCollector, "Service Providers")
-    }
-    
-    key = niche.lower().replace(" ", "_")
-    if key not in niche_map:
-        raise HTTPException(status_code=404, detail=f"Niche '{niche}' not found. Available: {list(niche_map.keys())}")
-    
-    collector_cls, name = niche_map[key]
-    
-    await run_collector_task(collector_cls, name, db)
-    
-    return {"message": f"Scraping started for {name}", "status": "processing"}
+
+    key = niche_key(niche)
+    if key not in NICHES:
+        raise HTTPException(status_code=404, detail=f"Niche '{niche}' not found. Available: {NICHES.names()}")
+
+    # The collector module is imported on the first scrape of its niche
+    collector_cls, name = NICHES.resolve(key), niche_label(key)
+
+    job, created = job_manager.submit(key, collector_cls, name, num_samples=20, requested_by=current_user.email)
+
+    message = f"Scraping started for {name}" if created else f"Scraping already in progress for {name}"
+    return {"message": message, "status": job.status, "job_id": job.id, "coalesced": not created}
+
+def job_for(job_id, user):
+    """The job, if the user submitted it (or was given it by coalescing); superusers see every job."""
+    job = job_manager.get(job_id)
+    if job is None or not (user.is_superuser or user.email in job.requesters):
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+def job_view(job, user):
+    job_dict = job.to_dict()
+    if not user.is_superuser and job.requested_by != user.email:
+        job_dict['requested_by'] = None  # Another customer's address
+    return job_dict
+
+@app.get("/jobs")
+def list_jobs(current_user: Principal = Depends(get_current_user)):
+    """List your recent scraping jobs (every job for superusers), newest first."""
+    jobs = [job for job in job_manager.jobs.values() if current_user.is_superuser or current_user.email in job.requesters]
+    jobs.sort(key=lambda job: job.created_at, reverse=True)
+    return [job_view(job, current_user) for job in jobs]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, current_user: Principal = Depends(get_current_user)):
+    """Get a scraping job's status, progress, leads saved and errors."""
+    return job_view(job_for(job_id, current_user), current_user)
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, current_user: Principal = Depends(get_current_user)):
+    """Cancel a queued or running scraping job, unless other users are waiting on it too."""
+    if current_user.subscription_tier == "Free":
+        raise HTTPException(status_code=403, detail="Scraping is not available on Free tier.")
+    job = job_for(job_id, current_user)
+    if not current_user.is_superuser and job.requesters != {current_user.email}:
+        raise HTTPException(status_code=403, detail="Other users are waiting on this job; it can't be cancelled.")
+    return job_view(job_manager.cancel(job_id), current_user)
+
+LEAD_FORMATS = ("json", "ndjson", "csv")
+STREAM_CHUNK_ROWS = 1000
+
+def encode_cursor(date_added, lead_id):
+    """Opaque keyset cursor pointing just past the given lead."""
+    return base64.urlsafe_b64encode(f"{date_added.isoformat()}|{lead_id}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        date_added, lead_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date_added), int(lead_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def leads_page_query(niche=None, cursor=None):
+    """Leads newest first by (date_added, id), starting after the cursor."""
+    columns = [getattr(Lead, field) for field in LEAD_PUBLIC_FIELDS]
+    query = select(*columns)
+    if niche:
+        query = query.where(Lead.niche == niche)
+    if cursor:
+        query = query.where(tuple_(Lead.date_added, Lead.id) < tuple_(*decode_cursor(cursor)))
+    return query.order_by(Lead.date_added.desc(), Lead.id.desc())
+
+async def without_blacklisted(leads):
+    """
+    Drops blacklisted leads (dicts or row mappings). The list was refreshed
+    before the query, so this checks memory only; a Bloom filter's positives
+    are confirmed against the table, which happens in a worker thread.
+    """
+    if blacklist.in_memory:
+        return blacklist.filter(leads, refresh=False)
+    return await run_in_threadpool(blacklist.filter, leads, False)
+
+async def stream_leads(query, fmt):
+    """
+    Yields the query's rows as NDJSON or CSV, a chunk at a time, from a
+    server-side cursor on a session of its own.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=STREAM_CHUNK_ROWS))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(LEAD_PUBLIC_FIELDS)
+            async for rows in result.partitions():
+                leads = await without_blacklisted([row._mapping for row in rows])
+                writer.writerows(lead.values() for lead in leads)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            async for rows in result.partitions():
+                leads = await without_blacklisted([row._mapping for row in rows])
+                yield "".join(json.dumps(dict(lead), default=str) + "\n" for lead in leads)
 
 @app.get("/leads")
-def get_leads(
-    niche: str = None, 
-    limit: int = 100, 
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session)
+async def get_leads(
+    response: Response,
+    niche: str = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get leads. Free tier limited to 5 leads."""
-    # Enforce subscription limits
+    """
+    Get leads, newest first. Free tier limited to 5 leads.
+    Pages are keyset-paginated: pass the X-Next-Cursor header of one page as
+    `cursor` to get the next. format=ndjson or csv streams every lead after the
+    cursor (or `limit` of them) instead of returning one page.
+    """
+    if format not in LEAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'. Available: {list(LEAD_FORMATS)}")
+
+    # Enforce subscription limits: Free users see the newest 5 leads only, so no cursors
     if current_user.subscription_tier == "Free":
-        limit = min(limit, 5)
-    
-    query = db.query(Lead)
-    if niche:
-        query = query.filter(Lead.niche == niche)
-    
-    leads = query.order_by(Lead.date_added.desc()).limit(limit).all()
-    return [lead.to_dict() for lead in leads]
+        if cursor:
+            raise HTTPException(status_code=403, detail="Paging is not available on Free tier. Please upgrade to Pro or Enterprise.")
+        limit = min(limit or 5, 5)
+
+    query = leads_page_query(niche, cursor)
+    # Load blacklist changes off the event loop, once: the per-lead checks don't refresh
+    await run_in_threadpool(blacklist.refresh)
+
+    if format != "json":
+        if limit is not None:
+            query = query.limit(limit)
+        media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+        headers = {"Content-Disposition": f"attachment; filename=leads.{format}"} if format == "csv" else {}
+        return StreamingResponse(stream_leads(query, format), media_type=media_type, headers=headers)
+
+    limit = limit or 100
+    leads = [dict(row._mapping) for row in await db.execute(query.limit(limit))]
+    if len(leads) == limit and current_user.subscription_tier != "Free":
+        response.headers["X-Next-Cursor"] = encode_cursor(leads[-1]['date_added'], leads[-1]['id'])
+    # Filtered after paging so the cursor still points past every lead read
+    return await without_blacklisted(leads)
+
+@app.get("/leads/version")
+async def get_leads_version(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """A token that changes whenever the leads may have (see stats.data_version): cache pages until it does."""
+    await run_in_threadpool(blacklist.refresh)
+    return {"version": await db.run_sync(stats.data_version)}
 
 @app.get("/stats")
-def get_stats(current_user: User = Depends(get_current_user), db: Session = Depends(get_db_session)):
+async def get_stats(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get lead statistics. Requires authentication."""
-    from sqlalchemy import func
-    stats = db.query(Lead.niche, func.count(Lead.id)).group_by(Lead.niche).all()
-    return {niche: count for niche, count in stats}
+    return await db.run_sync(stats.niche_totals)
+
+@app.get("/stats/breakdown")
+async def get_stats_breakdown(
+    bucket: str = "day",
+    niche: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    by_source: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Lead counts per day, week or month and niche (and source with by_source=true)."""
+    if bucket not in stats.BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket '{bucket}'. Available: {list(stats.BUCKETS)}")
+    return await db.run_sync(stats.breakdown, bucket=bucket, niche=niche, since=since, until=until, by_source=by_source)
@@ -1,23 +1,118 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
+import asyncio
 import bcrypt
+import hashlib
+import os
+import secrets
+import threading
+import time
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db, User
+from database import AsyncSessionLocal, User
 
 # Security Configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"  # TODO: Move to environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# How long a resolved user is trusted before it is reloaded (seconds)
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = 10000
+API_KEY_PREFIX = "lf_"
+
+# bcrypt is deliberately slow; logins hash on these threads, never on the event loop.
+# The default leaves half the CPUs to serving other requests during a burst of logins.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Either credential may be missing; get_current_user decides
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+api_key_scheme = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by request handlers (a detached, read-only copy)."""
+    id: int
+    email: str
+    subscription_tier: str
+    is_active: bool
+    is_superuser: bool
+
+    @classmethod
+    def from_user(cls, user: User):
+        return cls(
+            id=user.id,
+            email=user.email,
+            subscription_tier=user.subscription_tier or "Free",
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+        )
+
+# credential -> (monotonic expiry, Principal), oldest first
+_principal_cache = {}
+_keys_by_user = {}
+_cache_lock = threading.Lock()
+
+def _cache_get(key):
+    entry = _principal_cache.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    return entry[1]
+
+def _cache_put(key, principal, ttl):
+    if ttl <= 0:
+        return
+    with _cache_lock:
+        if len(_principal_cache) >= PRINCIPAL_CACHE_SIZE:
+            now = time.monotonic()
+            for old_key in [k for k, (expires, _) in _principal_cache.items() if expires <= now]:
+                _drop(old_key)
+            while len(_principal_cache) >= PRINCIPAL_CACHE_SIZE:
+                _drop(next(iter(_principal_cache)))
+        _principal_cache[key] = (time.monotonic() + ttl, principal)
+        _keys_by_user.setdefault(principal.id, set()).add(key)
+
+def _drop(key):
+    entry = _principal_cache.pop(key, None)
+    if entry is not None:
+        keys = _keys_by_user.get(entry[1].id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _keys_by_user[entry[1].id]
+
+def invalidate_principal(user_id=None):
+    """Forgets the cached principal of one user, or of everyone when user_id is None."""
+    with _cache_lock:
+        if user_id is None:
+            _principal_cache.clear()
+            _keys_by_user.clear()
+            return
+        for key in list(_keys_by_user.get(user_id, ())):
+            _drop(key)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    # Tier, status or key changes made through the ORM take effect on the next request.
+    # Bulk query.update() bypasses this; call invalidate_principal() after those.
+    invalidate_principal(target.id)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() on the password hashing pool."""
+    return await asyncio.get_running_loop().run_in_executor(_password_pool, verify_password, plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     salt = bcrypt.gensalt()
@@ -39,6 +134,21 @@ def get_user_by_email(db: Session, email: str):
     """Get a user by email."""
     return db.query(User).filter(User.email == email).first()
 
+def hash_api_key(api_key: str) -> str:
+    """API keys are stored and looked up by their SHA-256 (they are random, so no salt is needed)."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+async def get_user_by_api_key(db: AsyncSession, api_key: str):
+    """Get a user by plain API key."""
+    return await db.scalar(select(User).where(User.api_key == hash_api_key(api_key)))
+
+async def create_api_key(db: AsyncSession, user: User) -> str:
+    """Issues a new API key for user, replacing any previous one. Returns the plain key (shown once)."""
+    api_key = API_KEY_PREFIX + secrets.token_urlsafe(32)
+    user.api_key = hash_api_key(api_key)
+    await db.commit()
+    return api_key
+
 def authenticate_user(db: Session, email: str, password: str):
     """Authenticate a user."""
     user = get_user_by_email(db, email)
@@ -48,25 +158,66 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current authenticated user from JWT token."""
+async def aauthenticate_user(db: AsyncSession, email: str, password: str):
+    """authenticate_user() for the async session; the password check runs off the event loop."""
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        return False
+    if not await averify_password(password, user.hashed_password):
+        return False
+    return user
+
+async def _load_principal(kind: str, value: str) -> Optional[Principal]:
+    async with AsyncSessionLocal() as db:
+        if kind == "email":
+            user = await db.scalar(select(User).where(User.email == value))
+        else:
+            user = await get_user_by_api_key(db, value)
+        return Principal.from_user(user) if user else None
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), api_key: Optional[str] = Depends(api_key_scheme)) -> Principal:
+    """
+    Get the current authenticated user from a JWT bearer token or an X-API-Key header.
+    Resolved users are cached per credential for PRINCIPAL_CACHE_TTL seconds, so
+    repeat requests skip both the JWT decode and the database.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_email(db, email=email)
-    if user is None:
+    if api_key:
+        cache_key = ("api_key", api_key)
+    elif token:
+        cache_key = ("token", token)
+    else:
         raise credentials_exception
-    return user
+
+    principal = _cache_get(cache_key)
+    if principal is None:
+        ttl = PRINCIPAL_CACHE_TTL
+        if api_key:
+            lookup = ("api_key", api_key)
+        else:
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                email: str = payload.get("sub")
+                if email is None:
+                    raise credentials_exception
+            except JWTError:
+                raise credentials_exception
+            # Never trust a cached token past its own expiry
+            ttl = min(ttl, payload["exp"] - time.time()) if "exp" in payload else ttl
+            lookup = ("email", email)
+
+        principal = await _load_principal(*lookup)
+        if principal is None:
+            raise credentials_exception
+        _cache_put(cache_key, principal, ttl)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return principal
 
 def create_default_admin(db: Session):
     """Create a default admin user if none exists."""
@@ -0,0 +1,197 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal, Blacklist
+from normalize import normalize_email, normalize_identifier, normalize_phone, normalize_phone_series
+from logger import logger
+
+# How often the in-memory list checks the table for changes (seconds)
+BLACKLIST_REFRESH_SECONDS = int(os.getenv("BLACKLIST_REFRESH_SECONDS", "30"))
+# Above this many identifiers the list is kept as a Bloom filter, and its
+# (rare) positive answers are confirmed against the table
+BLACKLIST_BLOOM_THRESHOLD = int(os.getenv("BLACKLIST_BLOOM_THRESHOLD", "1000000"))
+BLOOM_FALSE_POSITIVE_RATE = 0.001
+
+class BloomFilter:
+    """A fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity, false_positive_rate=BLOOM_FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class BlacklistService:
+    """
+    The Do Not Contact list, held in memory so checking a lead costs a set
+    lookup instead of a query. Refreshes itself at most every refresh_seconds:
+    rows added since the last load are fetched by id, and the list is
+    reloaded in full only when rows were deleted.
+    """
+
+    def __init__(self, session_factory=SessionLocal, refresh_seconds=BLACKLIST_REFRESH_SECONDS,
+                 bloom_threshold=BLACKLIST_BLOOM_THRESHOLD):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self.bloom_threshold = bloom_threshold
+        self._identifiers = set()
+        self._bloom = None
+        # With a Bloom filter: identifiers of rows not stored normalized, which
+        # a query for the normalized form wouldn't confirm
+        self._stored_raw = set()
+        self._max_id = 0
+        self._row_count = 0
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        self.refresh()
+        return self._row_count
+
+    @property
+    def version(self):
+        """(highest id, row count) of the list as loaded: changes whenever rows are added or deleted."""
+        self.refresh()
+        return self._max_id, self._row_count
+
+    # --- loading ---
+
+    def refresh(self, force=False):
+        """Brings the in-memory list up to date if it is older than refresh_seconds (or force)."""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+                return
+            with self.session_factory() as db:
+                max_id, row_count = db.query(func.max(Blacklist.id), func.count(Blacklist.id)).one()
+                max_id, row_count = max_id or 0, row_count or 0
+                if (max_id, row_count) != (self._max_id, self._row_count):
+                    if max_id > self._max_id and row_count - self._row_count == self._count_after(db, self._max_id):
+                        # Only additions since the last load
+                        self._add_rows(db, self._max_id)
+                    else:
+                        self._identifiers, self._bloom, self._stored_raw = set(), None, set()
+                        self._add_rows(db, 0)
+                    self._max_id, self._row_count = max_id, row_count
+            self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _count_after(db: Session, after_id):
+        return db.query(func.count(Blacklist.id)).filter(Blacklist.id > after_id).scalar()
+
+    def _add_rows(self, db: Session, after_id):
+        added = 0
+        for (stored,) in db.query(Blacklist.identifier).filter(Blacklist.id > after_id).yield_per(10000):
+            identifier = normalize_identifier(stored)
+            if not identifier:
+                continue
+            if identifier != stored:
+                # Rows written around add_to_blacklist; init_db normalizes them on the next start
+                self._stored_raw.add(identifier)
+            if self._bloom is not None:
+                self._bloom.add(identifier)
+            else:
+                self._identifiers.add(identifier)
+            added += 1
+        if self._bloom is None and len(self._identifiers) > self.bloom_threshold:
+            # Sized with headroom for later additions
+            self._bloom = BloomFilter(len(self._identifiers) * 2)
+            for identifier in self._identifiers:
+                self._bloom.add(identifier)
+            self._identifiers = set()
+        if added:
+            kind = "Bloom filter" if self._bloom is not None else "set"
+            logger.info(f"Blacklist loaded {added} identifier(s) into its {kind}")
+
+    # --- checks ---
+
+    def _contains(self, identifier):
+        if not identifier:
+            return False
+        if self._bloom is None:
+            return identifier in self._identifiers
+        if identifier not in self._bloom:
+            return False
+        if identifier in self._stored_raw:
+            return True
+        # Possible false positive: confirm with the table (identifiers are stored normalized)
+        with self.session_factory() as db:
+            return db.query(Blacklist.id).filter(Blacklist.identifier == identifier).first() is not None
+
+    @property
+    def in_memory(self):
+        """True if checks never query the table (no Bloom filter whose positives need confirming)."""
+        return self._bloom is None
+
+    def is_blocked_keys(self, email_key=None, phone_key=None, refresh=True):
+        """
+        Check by already-normalized email/phone keys (as stored on leads).
+        refresh=False skips the refresh and its queries, for callers that
+        refreshed beforehand (the API's event loop).
+        """
+        if refresh:
+            self.refresh()
+        return self._contains(email_key) or self._contains(phone_key)
+
+    def is_blocked(self, lead, refresh=True):
+        """True if the lead's email or phone is blacklisted."""
+        return self.is_blocked_keys(normalize_email(lead.get("email")), normalize_phone(lead.get("phone")), refresh)
+
+    def filter(self, leads, refresh=True):
+        """The leads (dicts or rows) that are not blacklisted."""
+        if refresh:
+            self.refresh()
+        if not self._row_count:
+            return list(leads)
+        return [lead for lead in leads if not self.is_blocked(lead, refresh=False)]
+
+    def frame_mask(self, df):
+        """Boolean Series marking the DataFrame rows that are blacklisted."""
+        self.refresh()
+        blocked = None
+        for column, normalized in (
+            ("email", lambda values: values.astype("string").str.strip().str.lower()),
+            ("phone", normalize_phone_series),
+        ):
+            if column not in df.columns:
+                continue
+            keys = normalized(df[column])
+            if self._bloom is None:
+                hits = keys.isin(self._identifiers).fillna(False).astype(bool)
+            else:
+                hits = keys.map(lambda key: isinstance(key, str) and self._contains(key)).astype(bool)
+            blocked = hits if blocked is None else blocked | hits
+        if blocked is None:
+            import pandas as pd
+            return pd.Series(False, index=df.index)
+        return blocked
+
+def add_to_blacklist(db: Session, identifier, reason=None):
+    """Adds an email or phone number to the blacklist (normalized). Does not commit."""
+    normalized = normalize_identifier(identifier)
+    if normalized is None:
+        raise ValueError(f"Not an email or phone number: {identifier!r}")
+    if db.query(Blacklist.id).filter(Blacklist.identifier == normalized).first() is None:
+        db.add(Blacklist(identifier=normalized, reason=reason))
+    return normalized
+
+# Shared by collectors, reports and the API
+blacklist = BlacklistService()
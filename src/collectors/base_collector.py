@@ -1,16 +1,83 @@
 from abc import ABC, abstractmethod
-import pandas as pd
 import asyncio
+from collections import defaultdict
+import functools
 import random
+import time
+from datetime import datetime
 from sqlalchemy.orm import Session
-from database import Lead
+from database import find_leads_by_keys, lock_lead_writes, merge_lead_row, upsert_leads
+from normalize import normalize_email, normalize_phone, dedup_key
+from blacklist import blacklist
 from logger import logger
+import metrics
+from .fetch_scheduler import FetchScheduler, FETCH_CONCURRENCY, FETCH_REQUESTS_PER_SECOND
 
 class BaseCollector(ABC):
-    def __init__(self, niche_name, db_session: Session = None):
+    # Write-behind settings: pending leads are flushed as one multi-row upsert
+    # once `batch_size` leads are queued or the oldest one is `flush_interval_ms` old.
+    batch_size = 50
+    flush_interval_ms = 2000
+    # Per-field overrides of database.LEAD_MERGE_POLICY for leads that already exist
+    merge_policy = None
+    # Fetch politeness (see fetch_all): fetches in flight for this source, and
+    # requests per second to its host
+    host = None
+    max_concurrency = FETCH_CONCURRENCY
+    requests_per_second = FETCH_REQUESTS_PER_SECOND
+    # Keep fetched pages in the disk cache and revalidate them (see get_page)
+    cache_pages = True
+
+    def __init__(self, niche_name, db_session: Session = None, batch_size=None, flush_interval_ms=None, merge_policy=None):
         self.niche_name = niche_name
         self.data = [] # Keeping for backward compatibility for now, but primary storage is DB
         self.db_session = db_session
+        self.processed_count = 0 # Leads passed to save_lead, for progress reporting
+        self.blacklisted_count = 0
+        self.errors = []
+        if batch_size is not None:
+            self.batch_size = batch_size
+        if flush_interval_ms is not None:
+            self.flush_interval_ms = flush_interval_ms
+        if merge_policy is not None:
+            self.merge_policy = merge_policy
+
+        self._pending = []
+        self._pending_since = None
+        self._flush_timer = None
+        self._flush_task = None
+        self._collecting = False
+        self.scheduler = FetchScheduler(self.max_concurrency, self.requests_per_second)
+        self._http = None
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Wraps each subclass's collect() so the write buffer is always drained
+        when collection finishes, including when it fails part way through.
+        Only the outermost collect() does this: a subclass calling
+        super().collect() runs the wrapped parent without a second flush.
+        """
+        super().__init_subclass__(**kwargs)
+        collect = cls.__dict__.get('collect')
+        if collect is None or getattr(collect, '__isabstractmethod__', False):
+            return
+
+        @functools.wraps(collect)
+        async def collect_and_flush(self, *args, **kwargs):
+            if self._collecting:
+                return await collect(self, *args, **kwargs)
+            self._collecting = True
+            try:
+                return await collect(self, *args, **kwargs)
+            finally:
+                self._collecting = False
+                if self._http is not None:
+                    await self._http.close()
+                await self.aflush()
+                skipped = f" Skipped {self.blacklisted_count} blacklisted." if self.blacklisted_count else ""
+                logger.info(f"{self.niche_name} collection complete. Collected {len(self.data)} leads.{skipped}")
+
+        cls.collect = collect_and_flush
 
     @abstractmethod
     async def collect(self):
@@ -20,49 +87,198 @@ class BaseCollector(ABC):
         """
         pass
 
+    def _build_row(self, lead_data: dict) -> dict:
+        email_key = normalize_email(lead_data.get('email'))
+        phone_key = normalize_phone(lead_data.get('phone'))
+        now = datetime.utcnow()
+        return {
+            'email': lead_data.get('email'),
+            'phone': lead_data.get('phone'),
+            'first_name': lead_data.get('first_name'),
+            'last_name': lead_data.get('last_name'),
+            'company': lead_data.get('company'),
+            'role': lead_data.get('role'),
+            'niche': self.niche_name,
+            'source': lead_data.get('source'),
+            'url': lead_data.get('url'),
+            'location': lead_data.get('location'),
+            'date_added': now,
+            'last_seen': now,
+            'email_key': email_key,
+            'phone_key': phone_key,
+            'dedup_key': dedup_key(email_key, phone_key),
+        }
+
     def save_lead(self, lead_data: dict):
         """
-        Saves a single lead to the database.
-        Checks for duplicates based on email or phone.
+        Queues a single lead for the database. The queue is flushed once it
+        reaches batch_size or flush_interval_ms; see _write() for how leads
+        seen before are matched.
         """
         if not self.db_session:
-            logger.warning("No database session provided. Skipping DB save.")
+            logger.warning(f"{self.niche_name}: no database session provided. Skipping DB save.", extra={"sample": "lead_no_session"})
+            self.processed_count += 1
+            if blacklist.is_blocked(lead_data):
+                self.blacklisted_count += 1
+                return
             self.data.append(lead_data)
             return
 
-        # Check for existing lead
-        existing_lead = None
-        if lead_data.get('email'):
-            existing_lead = self.db_session.query(Lead).filter(Lead.email == lead_data['email']).first()
-        
-        if not existing_lead and lead_data.get('phone'):
-            existing_lead = self.db_session.query(Lead).filter(Lead.phone == lead_data['phone']).first()
-
-        if existing_lead:
-            logger.info(f"Lead already exists: {lead_data.get('email') or lead_data.get('phone')}. Updating...")
-            # Update fields if needed, for now just skip or update timestamp
-            # existing_lead.date_added = datetime.utcnow()
-        else:
-            new_lead = Lead(
-                email=lead_data.get('email'),
-                phone=lead_data.get('phone'),
-                first_name=lead_data.get('first_name'),
-                last_name=lead_data.get('last_name'),
-                company=lead_data.get('company'),
-                role=lead_data.get('role'),
-                niche=self.niche_name,
-                source=lead_data.get('source'),
-                url=lead_data.get('url'),
-                location=lead_data.get('location')
-            )
-            self.db_session.add(new_lead)
-            try:
+        self.processed_count += 1
+        self._pending.append((lead_data, self._build_row(lead_data)))
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+            self._start_flush_timer()
+        if self._flush_due():
+            self._request_flush()
+
+    def _flush_due(self):
+        if not self._pending:
+            return False
+        elapsed_ms = (time.monotonic() - self._pending_since) * 1000
+        return len(self._pending) >= self.batch_size or elapsed_ms >= self.flush_interval_ms
+
+    def _start_flush_timer(self):
+        """
+        Flushes flush_interval_ms after the first lead of a batch was queued,
+        even if no other lead arrives to trigger it (a slow source).
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Not collecting: the next save_lead() or flush() writes it
+        self._flush_timer = loop.call_later(self.flush_interval_ms / 1000, self._request_flush)
+
+    def _request_flush(self):
+        """
+        Writes the queue: in a worker thread when called on the event loop
+        (the API's, for scrape jobs), which never waits on the database, and
+        right here otherwise. One batch is written at a time; leads queued
+        meanwhile go in the next.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_while_due())
+
+    async def _flush_while_due(self):
+        while True:
+            await asyncio.to_thread(self._write, self._take_batch())
+            if not self._flush_due():
+                return
+
+    def _take_batch(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        batch, self._pending, self._pending_since = self._pending, [], None
+        return batch
+
+    def flush(self):
+        """Writes all queued leads now, blocking. On the event loop, use aflush()."""
+        return self._write(self._take_batch())
+
+    async def aflush(self):
+        """Writes all queued leads in a worker thread, after the batch being written (if any)."""
+        if self._flush_task is not None:
+            await self._flush_task
+        return await asyncio.to_thread(self._write, self._take_batch())
+
+    def _write(self, batch):
+        """
+        Writes a batch of queued leads with a single upsert and one commit,
+        leaving out blacklisted ones. If the batch fails it is rolled back
+        as a whole. Returns the number of leads written.
+        """
+        # Do Not Contact: never stored
+        sightings = []
+        for lead_data, row in batch:
+            if blacklist.is_blocked_keys(row['email_key'], row['phone_key']):
+                self.blacklisted_count += 1
+            else:
+                sightings.append((lead_data, row))
+        if not sightings:
+            return 0
+
+        try:
+            with metrics.FLUSH_SECONDS.labels(self.niche_name).time():
+                leads = self._match_leads(sightings)
+                upsert_leads(self.db_session, [row for _, row, _ in leads], self.merge_policy)
                 self.db_session.commit()
-                logger.info(f"Saved new lead: {lead_data.get('email') or lead_data.get('phone')}")
-                self.data.append(lead_data) # Keep in memory for now for the report generator
-            except Exception as e:
-                self.db_session.rollback()
-                logger.error(f"Error saving lead: {e}")
+        except Exception as e:
+            metrics.FLUSHES.labels(self.niche_name, "error").inc()
+            self.db_session.rollback()
+            logger.error(f"Error saving batch of {len(sightings)} leads: {e}")
+            self.errors.append(f"Failed to save {len(sightings)} leads: {e}")
+            return 0
+
+        new_leads = [lead_data for lead_data, _, is_new in leads if is_new]
+        self.data.extend(new_leads) # Keep in memory for now for the report generator
+        metrics.FLUSHES.labels(self.niche_name, "success").inc()
+        metrics.LEADS_SAVED.labels(self.niche_name, "new").inc(len(new_leads))
+        metrics.LEADS_SAVED.labels(self.niche_name, "updated").inc(len(leads) - len(new_leads))
+        logger.info(f"Saved {len(new_leads)} new and refreshed {len(leads) - len(new_leads)} existing leads for {self.niche_name}",
+                    extra={"sample": "lead_flush"})
+        return len(leads)
+
+    def _match_leads(self, batch):
+        """
+        Gives each queued sighting the dedup_key of the lead it is: a stored
+        lead, or an earlier sighting in the batch, with the same email, or
+        the same phone if their emails don't differ (colleagues share a
+        switchboard number). Sightings of one lead are merged into one row
+        (see merge_policy). Only the batch's own keys are looked up, inside
+        lock_lead_writes, so a concurrent collector's insert of the same lead
+        is found. Returns [(lead_data, row, is_new)], one per lead.
+        """
+        email_keys = {row['email_key'] for _, row in batch if row['email_key']}
+        phone_keys = {row['phone_key'] for _, row in batch if row['phone_key']}
+        lock_lead_writes(self.db_session, email_keys | phone_keys)
+
+        by_email = {}
+        by_phone = defaultdict(list)
+        lead_emails = {}  # dedup_key -> the lead's email key
+
+        def add(key, email_key, phone_key):
+            if email_key:
+                by_email.setdefault(email_key, key)
+            if lead_emails.get(key) is None:
+                lead_emails[key] = email_key
+            if phone_key and key not in by_phone[phone_key]:
+                by_phone[phone_key].append(key)
+
+        def match(row):
+            if row['email_key'] in by_email:
+                return by_email[row['email_key']]
+            for key in by_phone.get(row['phone_key'], ()):
+                if row['email_key'] is None or lead_emails[key] is None:
+                    return key
+            return None
+
+        for email_key, phone_key, key in find_leads_by_keys(self.db_session, email_keys, phone_keys):
+            add(key, email_key, phone_key)
+        stored = set(lead_emails)
+
+        leads = {}
+        unkeyed = []
+        for lead_data, row in batch:
+            key = match(row) or row['dedup_key']
+            if key is None:
+                unkeyed.append((lead_data, row, True))  # No email or phone to match on
+                continue
+            if key in leads:
+                merge_lead_row(leads[key][1], row, self.merge_policy)
+            else:
+                if key in stored:
+                    logger.debug(f"Lead already exists: {lead_data.get('email') or lead_data.get('phone')}. Updating...",
+                                 extra={"sample": "lead_update"})
+                row['dedup_key'] = key
+                leads[key] = (lead_data, row)
+            add(key, row['email_key'], row['phone_key'])
+        return [(lead_data, row, key not in stored) for key, (lead_data, row) in leads.items()] + unkeyed
 
     def save_to_csv(self, filename):
         """
@@ -71,11 +287,56 @@ class BaseCollector(ABC):
         if not self.data:
             logger.warning("No data to save.")
             return
-        
+
+        import pandas as pd
+
         df = pd.DataFrame(self.data)
         df.to_csv(filename, index=False)
         logger.info(f"Data saved to {filename}")
 
+    @property
+    def http(self):
+        """This collector's pooled HTTP client, created on first use."""
+        if self._http is None:
+            # httpx is only imported by collectors that fetch real pages
+            from .http_client import HttpClient, default_cache
+
+            self._http = HttpClient(cache=default_cache() if self.cache_pages else None,
+                                    max_connections=self.max_concurrency)
+        return self._http
+
+    async def get_page(self, url, params=None):
+        """
+        GETs a page through the pooled client. An unchanged cached page comes
+        back with not_modified=True and no content: skip parsing it.
+        """
+        return await self.http.get(url, params=params)
+
+    async def fetch_all(self, fetch, items):
+        """
+        Runs the coroutine fetch(item) for every item through the fetch
+        scheduler and yields the leads it returns as they arrive. Failed
+        fetches are logged and recorded in errors; None results are skipped.
+        """
+        fetch_seconds = metrics.FETCH_SECONDS.labels(self.niche_name)
+        fetched = metrics.FETCHES.labels(self.niche_name, "success")
+
+        async def timed_fetch(item):
+            # Only the fetch itself: time spent waiting on the scheduler's limits isn't counted
+            with fetch_seconds.time():
+                lead = await fetch(item)
+            fetched.inc()
+            return lead
+
+        def failed(item, error):
+            metrics.FETCHES.labels(self.niche_name, "error").inc()
+            logger.error(f"{self.niche_name}: fetching {item!r} failed: {error!r}", extra={"sample": "fetch_failed"})
+            self.errors.append(f"Failed to fetch {item!r}: {error}")
+
+        async for lead in self.scheduler.map(timed_fetch, items, host=self.host, on_error=failed):
+            if lead is not None:
+                yield lead
+
     async def random_delay(self, min_seconds=1, max_seconds=3):
         """
         Sleeps for a random amount of time to avoid rate limiting.
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import random
+import weakref
+from rate_limiter import TokenBucket
+from logger import logger
+
+# Defaults for BaseCollector: fetches in flight per collector, and requests
+# per second per host, each delayed by up to FETCH_JITTER_SECONDS more
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "5"))
+FETCH_REQUESTS_PER_SECOND = float(os.getenv("FETCH_REQUESTS_PER_SECOND", "5"))
+FETCH_JITTER_SECONDS = float(os.getenv("FETCH_JITTER_SECONDS", "0.2"))
+
+_DONE = object()
+
+class FetchScheduler:
+    """
+    Runs one source's fetches concurrently: at most max_concurrency are in
+    flight, and each host is kept to requests_per_second by a token bucket,
+    plus a random jitter so requests don't arrive in lockstep.
+
+    Host buckets are shared by every scheduler on the event loop, so
+    collectors fetching from the same site share its budget. The first
+    scheduler to use a host sets its rate.
+    """
+
+    _host_buckets = weakref.WeakKeyDictionary()  # event loop -> {host: TokenBucket}
+
+    def __init__(self, max_concurrency=FETCH_CONCURRENCY, requests_per_second=FETCH_REQUESTS_PER_SECOND,
+                 jitter=FETCH_JITTER_SECONDS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_second = requests_per_second
+        self.jitter = jitter
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    def bucket(self, host):
+        buckets = self._host_buckets.setdefault(asyncio.get_running_loop(), {})
+        if host not in buckets:
+            buckets[host] = TokenBucket(self.requests_per_second)
+        return buckets[host]
+
+    async def fetch(self, fetch, item, host=None):
+        """Runs fetch(item) once a concurrency slot and a token for host are free."""
+        async with self._slots:
+            await self.bucket(host).acquire()
+            if self.jitter:
+                await asyncio.sleep(random.uniform(0, self.jitter))
+            return await fetch(item)
+
+    async def map(self, fetch, items, host=None, on_error=None):
+        """
+        Runs fetch(item) for every item and yields the results as they
+        complete (not in order). A fixed set of workers pulls from items, so
+        memory doesn't grow with their number. A failed item is passed to
+        on_error(item, error) (logged by default) and yields nothing.
+        """
+        pending = iter(items)
+        results = asyncio.Queue(maxsize=self.max_concurrency)
+
+        async def worker():
+            for item in pending:
+                try:
+                    result = await self.fetch(fetch, item, host)
+                except Exception as e:
+                    if on_error is not None:
+                        on_error(item, e)
+                    else:
+                        logger.error(f"Fetch of {item!r} from {host or 'source'} failed: {e!r}", extra={"sample": "fetch_failed"})
+                    continue
+                await results.put(result)
+            await results.put(_DONE)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        try:
+            running = len(workers)
+            while running:
+                result = await results.get()
+                if result is _DONE:
+                    running -= 1
+                else:
+                    yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
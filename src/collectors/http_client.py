@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+from logger import logger
+
+# Connections kept per client; idle ones stay open for reuse
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+# Pages are cached with their validators; the least recently used are
+# evicted once the cache is larger than HTTP_CACHE_MAX_MB
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "http_cache")
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", "512"))
+USER_AGENT = "LeadForge/1.0"
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+@dataclass
+class Page:
+    """A fetched page. not_modified pages (304) carry no content: there is nothing new to parse."""
+    url: str
+    status_code: int
+    content: Optional[bytes] = None
+    not_modified: bool = False
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace") if self.content is not None else None
+
+class HttpCache:
+    """
+    Disk cache of page bodies and their ETag/Last-Modified validators. Each
+    URL is stored as <sha256>.body plus a <sha256>.json of its metadata.
+    The index of entries, in least-recently-used order, is kept in memory
+    and rebuilt from the files' mtimes on start.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> body size
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(str(url).encode("utf-8")).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _load_index(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            try:
+                stat = os.stat(self._path(key, "body"))
+            except FileNotFoundError:
+                os.remove(self._path(key, "json"))
+                continue
+            found.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def validators(self, url):
+        """The metadata stored for url ({'etag', 'last_modified', ...}), or None."""
+        key = self.key(url)
+        if key not in self._entries:
+            return None
+        try:
+            with open(self._path(key, "json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+
+    def read(self, url):
+        """The cached body of url, marking it as recently used. None if it is not cached."""
+        key = self.key(url)
+        try:
+            with open(self._path(key, "body"), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            self._remove(key)
+            return None
+        self.touch(url)
+        return content
+
+    def touch(self, url):
+        key = self.key(url)
+        with self._lock:
+            if key not in self._entries:
+                return
+            self._entries.move_to_end(key)
+        try:
+            os.utime(self._path(key, "body"))
+        except FileNotFoundError:
+            self._remove(key)
+
+    def store(self, url, content, etag=None, last_modified=None):
+        """Caches a page that has a validator; pages without one can't be revalidated and are not cached."""
+        if not etag and not last_modified:
+            return False
+        if len(content) > self.max_bytes:
+            return False
+        key = self.key(url)
+        metadata = {"url": str(url), "etag": etag, "last_modified": last_modified, "size": len(content)}
+        # Write, then rename: a crash never leaves a half-written body behind
+        for suffix, data in (("body", content), ("json", json.dumps(metadata).encode("utf-8"))):
+            path = self._path(key, suffix)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        with self._lock:
+            self._size += len(content) - self._entries.pop(key, 0)
+            self._entries[key] = len(content)
+        self._evict()
+        return True
+
+    def _remove(self, key):
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+        for suffix in ("body", "json"):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        evicted = 0
+        while self._size > self.max_bytes and self._entries:
+            with self._lock:
+                key = next(iter(self._entries))
+            self._remove(key)
+            evicted += 1
+        if evicted:
+            logger.debug(f"HTTP cache evicted {evicted} page(s), {self._size} bytes left")
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def default_cache():
+    """The process-wide page cache in HTTP_CACHE_DIR, created on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
+
+class HttpClient:
+    """
+    Pooled async HTTP client for collectors: connections are kept alive and
+    reused, over HTTP/2 when the h2 package is installed. GET requests send
+    the cached ETag/Last-Modified of the page, so an unchanged page comes
+    back as a bodiless 304 and get() returns it with not_modified=True.
+    """
+
+    def __init__(self, cache=None, max_connections=HTTP_MAX_CONNECTIONS, timeout=HTTP_TIMEOUT, headers=None):
+        self.cache = cache
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        self._client = None
+        # Fetch statistics, for logs and tests
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    async def open(self):
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE, limits=limits, timeout=self.timeout,
+                headers=self.headers, follow_redirects=True,
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            if self.requests:
+                logger.info(
+                    f"HTTP: {self.requests} requests, {self.not_modified} not modified, "
+                    f"{self.bytes_downloaded} bytes downloaded, {self.bytes_saved} bytes saved by the cache"
+                )
+
+    async def get(self, url, params=None, headers=None, revalidate=True):
+        """
+        Fetches url. With a cache and revalidate, the request is conditional
+        on the cached validators. Raises httpx.HTTPStatusError on error statuses.
+        """
+        await self.open()
+        url = str(httpx.URL(url, params=params))
+        request_headers = dict(headers or {})
+        cached = self.cache.validators(url) if self.cache is not None and revalidate else None
+        if cached:
+            if cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = await self._client.get(url, headers=request_headers)
+        self.requests += 1
+        self.bytes_downloaded += len(response.content)
+
+        if response.status_code == 304 and cached:
+            self.not_modified += 1
+            self.bytes_saved += cached.get("size", 0)
+            self.cache.touch(url)
+            return Page(url, 304, not_modified=True)
+
+        response.raise_for_status()
+        if self.cache is not None and response.status_code == 200:
+            self.cache.store(url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return Page(url, response.status_code, response.content)
@@ -1,15 +1,21 @@
 import streamlit as st
 import pandas as pd
 import requests
+import functools
+import io
+import os
 import time
-from database import get_db, Lead
-from sqlalchemy.orm import Session
+from logger import LOG_FILE, tail_log
 import plotly.express as px
 
 st.set_page_config(page_title="LeadForge Dashboard", page_icon="🚀", layout="wide")
 
 # API URL
-API_URL = "http://localhost:8000"
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+# Leads page: page sizes offered, and how long the data version is trusted
+# before the API is asked again (cached pages are kept while it is unchanged)
+LEAD_PAGE_SIZES = (50, 100, 250, 500)
+DATA_VERSION_TTL_SECONDS = 5
 
 # Initialize session state for authentication
 if 'token' not in st.session_state:
@@ -17,9 +23,6 @@ if 'token' not in st.session_state:
 if 'user_email' not in st.session_state:
     st.session_state.user_email = None
 
-def get_db_session():
-    return next(get_db())
-
 def login(email, password):
     """Authenticate user and get JWT token."""
     try:
@@ -44,11 +47,12 @@ def logout():
     st.session_state.token = None
     st.session_state.user_email = None
 
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
 def get_headers():
     """Get headers with authentication token."""
-    if st.session_state.token:
-        return {"Authorization": f"Bearer {st.session_state.token}"}
-    return {}
+    return auth_headers(st.session_state.token)
 
 def fetch_stats():
     try:
@@ -62,11 +66,67 @@ def fetch_stats():
         return {}
     return {}
 
+# The cached readers below take the token as an argument: cache entries are
+# shared by every session, and must not leak between users (or tiers)
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def fetch_data_version(token):
+    response = requests.get(f"{API_URL}/leads/version", headers=auth_headers(token), timeout=10)
+    response.raise_for_status()
+    return response.json()["version"]
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def fetch_niche_totals(token, version):
+    response = requests.get(f"{API_URL}/stats", headers=auth_headers(token), timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(max_entries=500, show_spinner=False)
+def fetch_leads_page(token, version, niche, cursor, limit):
+    """
+    One page of leads, newest first, and the cursor of the next (None on the
+    last page). version only keys the cache: a new one means the data changed.
+    """
+    params = {"limit": limit}
+    if niche:
+        params["niche"] = niche
+    if cursor:
+        params["cursor"] = cursor
+    response = requests.get(f"{API_URL}/leads", params=params, headers=auth_headers(token), timeout=30)
+    response.raise_for_status()
+    return pd.DataFrame(response.json()), response.headers.get("X-Next-Cursor")
+
+def frame_to_csv(df):
+    return df.to_csv(index=False).encode('utf-8')
+
+def export_leads_csv(token, niche):
+    """Every lead (of the niche) as CSV, streamed from the API. Only runs when the download is clicked."""
+    params = {"format": "csv"}
+    if niche:
+        params["niche"] = niche
+    buffer = io.BytesIO()
+    with requests.get(f"{API_URL}/leads", params=params, headers=auth_headers(token), stream=True, timeout=300) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            buffer.write(chunk)
+    return buffer.getvalue()
+
+def reset_lead_pages():
+    # Cursors of the pages visited, the current one last; the first page has none
+    st.session_state.lead_cursors = [None]
+
+def next_lead_page(cursor):
+    st.session_state.lead_cursors.append(cursor)
+
+def previous_lead_page():
+    st.session_state.lead_cursors.pop()
+
 def trigger_scrape(niche):
     try:
         response = requests.post(f"{API_URL}/scrape/{niche}", headers=get_headers())
-        if response.status_code == 200:
-            st.success(f"Scraping started for {niche}!")
+        if response.status_code in (200, 202):
+            job = response.json()
+            st.success(f"{job['message']} (job {job['job_id']})")
         elif response.status_code == 403:
             st.error("Scraping not available on your subscription tier. Please upgrade.")
         elif response.status_code == 401:
@@ -130,35 +190,70 @@ else:
     elif page == "Leads":
         st.title("Lead Database")
         
-        db = get_db_session()
-        
-        # Filters
-        niche_filter = st.selectbox("Filter by Niche", ["All"] + [r[0] for r in db.query(Lead.niche).distinct().all()])
-        
-        query = db.query(Lead)
-        if niche_filter != "All":
-            query = query.filter(Lead.niche == niche_filter)
-        
-        leads = query.order_by(Lead.date_added.desc()).limit(500).all()
-        
-        if leads:
-            data = [lead.to_dict() for lead in leads]
-            df = pd.DataFrame(data)
+        token = st.session_state.token
+
+        try:
+            version = fetch_data_version(token)
+            totals = fetch_niche_totals(token, version)
+        except requests.HTTPError as e:
+            if e.response.status_code == 401:
+                st.error("Session expired. Please login again.")
+                logout()
+            else:
+                st.error(f"Could not load leads: {e}")
+            st.stop()
+        except requests.RequestException as e:
+            st.error(f"Error connecting to API: {e}")
+            st.stop()
+
+        # Filters (a new filter starts again from the first page)
+        col1, col2 = st.columns([3, 1])
+        niche_filter = col1.selectbox("Filter by Niche", ["All"] + list(totals), on_change=reset_lead_pages)
+        page_size = col2.selectbox("Leads per page", LEAD_PAGE_SIZES, index=1, on_change=reset_lead_pages)
+        niche = None if niche_filter == "All" else niche_filter
+        if "lead_cursors" not in st.session_state:
+            reset_lead_pages()
+        cursors = st.session_state.lead_cursors
+
+        try:
+            df, next_cursor = fetch_leads_page(token, version, niche, cursors[-1], page_size)
+        except requests.RequestException as e:
+            st.error(f"Could not load leads: {e}")
+            st.stop()
+
+        total = totals.get(niche, 0) if niche else sum(totals.values())
+        st.caption(f"Page {len(cursors)} · {total:,} leads")
+        if not df.empty:
             st.dataframe(df)
-            
-            # Download
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                "Download CSV",
-                csv,
-                "leads.csv",
-                "text/csv",
-                key='download-csv'
-            )
+        elif len(cursors) > 1:
+            # Past the last lead: the previous page ended exactly on it, or leads were removed
+            st.info("End of results.")
         else:
             st.info("No leads found.")
-        
-        db.close()
+
+        # Shown on an empty page too, so there is always a way back
+        col_prev, col_csv, col_next = st.columns([1, 2, 1])
+        col_prev.button("← Previous", disabled=len(cursors) == 1, on_click=previous_lead_page)
+        col_next.button("Next →", disabled=next_cursor is None, on_click=next_lead_page, args=(next_cursor,))
+
+        if not df.empty:
+            # Downloads are generated when clicked, not on every rerun
+            col_csv.download_button(
+                "Download page as CSV",
+                functools.partial(frame_to_csv, df),
+                "leads_page.csv",
+                "text/csv",
+                key='download-page-csv',
+                on_click="ignore",
+            )
+            col_csv.download_button(
+                "Download all as CSV",
+                functools.partial(export_leads_csv, token, niche),
+                f"{(niche or 'all').lower().replace(' ', '_')}_leads.csv",
+                "text/csv",
+                key='download-csv',
+                on_click="ignore",
+            )
     
     elif page == "Scraper":
         st.title("Scraper Control")
@@ -187,8 +282,6 @@ else:
             pass
             
         try:
-            with open("app.log", "r") as f:
-                lines = f.readlines()
-                st.text_area("Log Output", "".join(lines[-50:]), height=600)
+            st.text_area("Log Output", "\n".join(tail_log(LOG_FILE, 50)), height=600)
         except FileNotFoundError:
             st.error("Log file not found.")
@@ -1,11 +1,27 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, Float, String, Date, DateTime, ForeignKey, Index, UniqueConstraint, delete, func, inspect, or_, select, text
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from datetime import datetime
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from collections import Counter
+import os
+from datetime import date, datetime
+from normalize import normalize_email, normalize_identifier, normalize_phone, dedup_key
+from logger import logger
 
 Base = declarative_base()
 
+# Lead fields exposed through the API and exports
+LEAD_PUBLIC_FIELDS = (
+    'id', 'email', 'phone', 'first_name', 'last_name', 'company', 'role',
+    'niche', 'source', 'url', 'location', 'date_added', 'last_seen',
+)
+
 class Lead(Base):
     __tablename__ = 'leads'
+    __table_args__ = (
+        # Keyset pagination walks (date_added, id) newest first, optionally within a niche
+        Index('ix_leads_niche_date_added_id', 'niche', 'date_added', 'id'),
+        Index('ix_leads_date_added_id', 'date_added', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     email = Column(String, index=True)
@@ -19,22 +35,19 @@ class Lead(Base):
     url = Column(String)
     location = Column(String)
     date_added = Column(DateTime, default=datetime.utcnow)
+    # Indexed so the newest write is found without a scan (see stats.data_version)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Normalized identity columns (see normalize.py). dedup_key is the
+    # email key if there is one, else the phone key, and is what upserts conflict on.
+    email_key = Column(String, index=True)
+    phone_key = Column(String, index=True)
+    dedup_key = Column(String, unique=True, index=True)
+    # Set by the fuzzy dedup engine: id of the lead this one duplicates
+    duplicate_of = Column(Integer, index=True)
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'phone': self.phone,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'company': self.company,
-            'role': self.role,
-            'niche': self.niche,
-            'source': self.source,
-            'url': self.url,
-            'location': self.location,
-            'date_added': self.date_added
-        }
+        return {field: getattr(self, field) for field in LEAD_PUBLIC_FIELDS}
 
 class User(Base):
     __tablename__ = 'users'
@@ -54,7 +67,15 @@ class Source(Base):
     name = Column(String, unique=True)
     url = Column(String)
     status = Column(String)
-    last_scraped = Column(DateTime)
+    last_scraped = Column(DateTime)  # When the last successful run finished
+    # The scheduler's view of the source (see scheduler.py)
+    schedule = Column(String)
+    next_run_at = Column(DateTime)
+    last_started_at = Column(DateTime)
+    last_finished_at = Column(DateTime)
+    last_duration_seconds = Column(Float)
+    last_leads = Column(Integer)
+    last_error = Column(String)
 
 class Export(Base):
     __tablename__ = 'exports'
@@ -63,6 +84,67 @@ class Export(Base):
     filename = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     query_params = Column(String)
+    row_count = Column(Integer)
+    byte_size = Column(Integer)
+    generation_ms = Column(Integer)
+    # Incremental reports: the leads a file covers are niche leads up to max_lead_id.
+    # mode is 'delta' (new since the previous report) or 'snapshot' (everything)
+    niche = Column(String, index=True)
+    format = Column(String)
+    mode = Column(String)
+    max_lead_id = Column(Integer)
+    watermark_at = Column(DateTime)
+
+class EnrichmentCacheEntry(Base):
+    __tablename__ = 'enrichment_cache'
+    __table_args__ = (UniqueConstraint('enricher', 'cache_key'),)
+
+    id = Column(Integer, primary_key=True)
+    enricher = Column(String)
+    cache_key = Column(String)
+    payload = Column(String, nullable=True)  # JSON of the fields the enricher added; NULL = not found
+    expires_at = Column(DateTime, index=True)
+
+class DedupRun(Base):
+    __tablename__ = 'dedup_runs'
+
+    id = Column(Integer, primary_key=True)
+    niche = Column(String, index=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    # Leads up to this id have been compared
+    max_lead_id = Column(Integer)
+    leads_scanned = Column(Integer)
+    new_leads = Column(Integer)
+    candidate_pairs = Column(Integer)
+    duplicates_found = Column(Integer)
+
+class LeadBlockKey(Base):
+    """
+    The dedup engine's blocking keys (phone, email domain, company word) of
+    each lead it has seen, so a run loads only the stored leads that share
+    a key with the new ones.
+    """
+    __tablename__ = 'lead_block_keys'
+
+    block_key = Column(String, primary_key=True)
+    lead_id = Column(Integer, primary_key=True)
+
+class LeadStat(Base):
+    """Lead counts per niche, source and day, maintained alongside lead writes."""
+    __tablename__ = 'lead_stats'
+
+    niche = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)  # '' when unknown
+    day = Column(Date, primary_key=True)
+    lead_count = Column(Integer, nullable=False, default=0)
+
+class LeadTotal(Base):
+    """Lead count per niche; the rollup of lead_stats that GET /stats reads."""
+    __tablename__ = 'lead_totals'
+
+    niche = Column(String, primary_key=True)
+    lead_count = Column(Integer, nullable=False, default=0)
 
 class Blacklist(Base):
     __tablename__ = 'blacklist'
@@ -72,13 +154,427 @@ class Blacklist(Base):
     reason = Column(String)
 
 # Database Setup
-DATABASE_URL = "sqlite:///leads.db"
+def normalize_database_url(url):
+    """
+    The URL with an explicit driver: postgres:// and postgresql:// URLs use
+    psycopg (3), rather than whatever SQLAlchemy defaults to (or rejects).
+    """
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL", "sqlite:///leads.db"))
+
+def async_database_url(url):
+    """The same database through an asyncio driver: aiosqlite for SQLite, asyncpg for Postgres."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2:", "postgresql+psycopg:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg:" + url[len(prefix):]
+    return url
+
+# Connection pool (server databases such as Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite tuning, applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+def is_sqlite(url):
+    return url.startswith("sqlite")
+
+def engine_options(url):
+    """create_engine() keyword arguments for url."""
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _sqlite_pragmas():
+    return (
+        # WAL lets readers (dashboard, /leads) run while a collector writes
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    )
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the API so that queries don't block its event loop
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if is_sqlite(DATABASE_URL):
+    event.listen(engine, "connect", _configure_sqlite_connection)
+    event.listen(async_engine.sync_engine, "connect", _configure_sqlite_connection)
+
+def log_db_settings():
+    """Logs the settings the database actually runs with (a startup self-check)."""
+    logger.info(f"Database: {engine.dialect.name} at {engine.url.render_as_string(hide_password=True)}, {engine.pool.status()}")
+    if not is_sqlite(DATABASE_URL):
+        return
+    with engine.connect() as conn:
+        settings = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                    for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")}
+    logger.info("SQLite settings: " + ", ".join(f"{name}={value}" for name, value in settings.items()))
+    if str(settings["journal_mode"]).lower() != "wal" and engine.url.database not in (None, "", ":memory:"):
+        logger.warning(f"SQLite is not in WAL mode (journal_mode={settings['journal_mode']}); readers and writers will block each other")
+
+# Merge policies applied when an upsert hits an existing lead
+KEEP_FIRST = "keep_first"
+OVERWRITE = "overwrite"
+FILL_IF_NULL = "fill_if_null"
+
+LEAD_MERGE_POLICY = {
+    'email': FILL_IF_NULL,
+    'email_key': FILL_IF_NULL,
+    'phone': FILL_IF_NULL,
+    'phone_key': FILL_IF_NULL,
+    'first_name': FILL_IF_NULL,
+    'last_name': FILL_IF_NULL,
+    'company': OVERWRITE,
+    'role': OVERWRITE,
+    'source': OVERWRITE,
+    'url': OVERWRITE,
+    'location': OVERWRITE,
+    'last_seen': OVERWRITE,
+    'niche': KEEP_FIRST,
+}
+
+UPSERT_CHUNK_ROWS = 1000
+
+def dialect_insert(bind):
+    """Returns the dialect's insert() construct, which supports ON CONFLICT."""
+    dialect = bind.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Upsert is not supported on {dialect}")
+    return insert
+
+def merge_lead_row(target, row, merge_policy=None):
+    """
+    Merges a later sighting of a lead into target (a row not yet written),
+    field by field, the way upsert_leads merges it into a stored lead.
+    """
+    policy = {**LEAD_MERGE_POLICY, **(merge_policy or {})}
+    for field, rule in policy.items():
+        if rule == OVERWRITE:
+            if row.get(field) is not None:
+                target[field] = row[field]
+        elif rule == FILL_IF_NULL:
+            if target.get(field) is None:
+                target[field] = row.get(field)
+        elif rule != KEEP_FIRST:
+            raise ValueError(f"Unknown merge policy '{rule}' for field '{field}'")
+    return target
+
+def lock_lead_writes(session, keys):
+    """
+    Makes writers of the same email/phone keys take turns until the
+    transaction ends. Call it before looking the keys up: a lead another
+    writer is inserting under a different dedup_key (its email, while this
+    sighting only has the phone) is then found instead of inserted twice.
+    Postgres locks the keys; SQLite has one writer, so its write lock is
+    taken up front.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        session.execute(text("UPDATE leads SET id = id WHERE 0 = 1"))
+    elif dialect == 'postgresql' and keys:
+        # Sorted, so two writers never wait on each other's keys
+        session.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(key)) FROM (SELECT unnest(CAST(:keys AS text[])) AS key ORDER BY 1) AS sorted_keys"),
+            {'keys': sorted(keys)},
+        )
+
+def find_leads_by_keys(session, email_keys, phone_keys):
+    """(email_key, phone_key, dedup_key) of the stored leads with any of the keys, oldest first."""
+    email_keys, phone_keys = list(email_keys), list(phone_keys)
+    found = {}
+    for column, keys in ((Lead.email_key, email_keys), (Lead.phone_key, phone_keys)):
+        for start in range(0, len(keys), UPSERT_CHUNK_ROWS):
+            rows = session.execute(
+                select(Lead.id, Lead.email_key, Lead.phone_key, Lead.dedup_key)
+                .where(column.in_(keys[start:start + UPSERT_CHUNK_ROWS]), Lead.dedup_key.isnot(None))
+            )
+            for lead_id, email_key, phone_key, key in rows:
+                found[lead_id] = (email_key, phone_key, key)
+    return [found[lead_id] for lead_id in sorted(found)]
+
+def upsert_leads(session, rows, merge_policy=None):
+    """
+    Inserts lead rows with a single INSERT ... ON CONFLICT (dedup_key) DO UPDATE.
+    Existing leads are merged field by field according to merge_policy
+    (defaults to LEAD_MERGE_POLICY), and so are rows sharing a dedup_key.
+    Lead stats are updated in the same transaction. Does not commit.
+    Returns the number of new leads.
+    """
+    if not rows:
+        return 0
+
+    insert = dialect_insert(session.get_bind())
+
+    # A statement may only touch each conflicting row once (Postgres enforces this)
+    unique_rows = []
+    by_key = {}
+    for row in rows:
+        key = row.get('dedup_key')
+        if key is None:
+            unique_rows.append(row)
+        elif key in by_key:
+            merge_lead_row(by_key[key], row, merge_policy)
+        else:
+            by_key[key] = dict(row)
+            unique_rows.append(by_key[key])
+
+    policy = {**LEAD_MERGE_POLICY, **(merge_policy or {})}
+    # A sighting may move a stored lead to another niche or source: its counts move with it
+    counted_fields_change = any(policy.get(field, KEEP_FIRST) != KEEP_FIRST for field in ('niche', 'source'))
+    inserted, moved_from, moved_to = [], [], []
+    # Stay well under SQLite's bound-parameter limit for very large batches
+    for start in range(0, len(unique_rows), UPSERT_CHUNK_ROWS):
+        chunk = unique_rows[start:start + UPSERT_CHUNK_ROWS]
+        proposed = {row['dedup_key']: row['date_added'] for row in chunk if row.get('dedup_key') is not None}
+        stored = {}
+        if counted_fields_change and proposed:
+            stored = {
+                key: (niche or '', source or '')
+                for key, niche, source in session.execute(
+                    select(Lead.dedup_key, Lead.niche, Lead.source).where(Lead.dedup_key.in_(list(proposed)))
+                )
+            }
+        stmt = _lead_upsert_statement(insert, chunk, policy)
+        stmt = stmt.returning(Lead.dedup_key, Lead.niche, Lead.source, Lead.date_added)
+        for key, niche, source, date_added in session.execute(stmt):
+            # date_added is keep-first, so it only equals the value we sent if the row is new
+            if key is None or proposed.get(key) == date_added:
+                inserted.append((niche, source, date_added))
+            elif key in stored and stored[key] != (niche or '', source or ''):
+                moved_from.append((*stored[key], date_added))
+                moved_to.append((niche, source, date_added))
+
+    bump_lead_stats(session, inserted + moved_to)
+    bump_lead_stats(session, moved_from, sign=-1)
+    return len(inserted)
+
+def delete_leads(session, lead_ids):
+    """Deletes leads by id and takes them off the stats. Does not commit."""
+    lead_ids = list(lead_ids)
+    removed = []
+    for start in range(0, len(lead_ids), UPSERT_CHUNK_ROWS):
+        chunk = lead_ids[start:start + UPSERT_CHUNK_ROWS]
+        removed += session.execute(
+            delete(Lead).where(Lead.id.in_(chunk)).returning(Lead.niche, Lead.source, Lead.date_added)
+        ).all()
+        session.execute(delete(LeadBlockKey).where(LeadBlockKey.lead_id.in_(chunk)))
+    bump_lead_stats(session, removed, sign=-1)
+    return len(removed)
+
+def bump_lead_stats(session, leads, sign=1):
+    """
+    Adds (or with sign=-1 removes) (niche, source, date_added) leads to the
+    lead_stats and lead_totals counters with one upsert per table.
+    """
+    if not leads:
+        return
+    per_day = Counter((niche or '', source or '', date_added.date()) for niche, source, date_added in leads)
+    per_niche = Counter()
+    for (niche, _, _), count in per_day.items():
+        per_niche[niche] += count
+
+    insert = dialect_insert(session.get_bind())
+    stmt = insert(LeadStat).values([
+        {'niche': niche, 'source': source, 'day': day, 'lead_count': sign * count}
+        for (niche, source, day), count in per_day.items()
+    ])
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['niche', 'source', 'day'],
+        set_={'lead_count': LeadStat.lead_count + stmt.excluded.lead_count},
+    ))
+    stmt = insert(LeadTotal).values([
+        {'niche': niche, 'lead_count': sign * count} for niche, count in per_niche.items()
+    ])
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=['niche'],
+        set_={'lead_count': LeadTotal.lead_count + stmt.excluded.lead_count},
+    ))
+
+def rebuild_lead_stats(session):
+    """Recomputes lead_stats and lead_totals from the leads table. Does not commit."""
+    session.execute(delete(LeadStat))
+    session.execute(delete(LeadTotal))
+    per_day = Counter()
+    rows = session.execute(
+        select(Lead.niche, Lead.source, func.date(Lead.date_added), func.count(Lead.id))
+        .group_by(Lead.niche, Lead.source, func.date(Lead.date_added))
+    )
+    for niche, source, day, count in rows:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        per_day[(niche or '', source or '', day)] += count
+
+    per_niche = Counter()
+    for (niche, _, _), count in per_day.items():
+        per_niche[niche] += count
+    if per_day:
+        session.execute(LeadStat.__table__.insert(), [
+            {'niche': niche, 'source': source, 'day': day, 'lead_count': count}
+            for (niche, source, day), count in per_day.items()
+        ])
+        session.execute(LeadTotal.__table__.insert(), [
+            {'niche': niche, 'lead_count': count} for niche, count in per_niche.items()
+        ])
+    return sum(per_niche.values())
+
+def _lead_upsert_statement(insert, rows, policy):
+    stmt = insert(Lead).values(rows)
+    columns = Lead.__table__.c
+    set_ = {}
+    for field, rule in policy.items():
+        if rule == OVERWRITE:
+            # A re-scrape that is missing a field should not blank it out
+            set_[field] = func.coalesce(stmt.excluded[field], columns[field])
+        elif rule == FILL_IF_NULL:
+            set_[field] = func.coalesce(columns[field], stmt.excluded[field])
+        elif rule != KEEP_FIRST:
+            raise ValueError(f"Unknown merge policy '{rule}' for field '{field}'")
+
+    if set_:
+        return stmt.on_conflict_do_update(index_elements=['dedup_key'], set_=set_)
+    return stmt.on_conflict_do_nothing(index_elements=['dedup_key'])
+
+def _add_missing_columns(conn, table):
+    """Adds model columns that an existing table predates (nullable, no default)."""
+    existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(column.name)
+    if added:
+        logger.info(f"Added columns to {table.name}: {', '.join(added)}")
+    return added
+
+def _backfill_lead_keys(conn):
+    """Computes the normalized key columns for leads stored before they existed."""
+    leads = Lead.__table__
+    pending = conn.execute(
+        select(leads.c.id, leads.c.email, leads.c.phone)
+        .where(
+            leads.c.dedup_key.is_(None), leads.c.email_key.is_(None), leads.c.phone_key.is_(None),
+            or_(leads.c.email.isnot(None), leads.c.phone.isnot(None))
+        )
+        .order_by(leads.c.id)
+    ).all()
+    if not pending:
+        return
+
+    taken = {key for (key,) in conn.execute(select(leads.c.dedup_key).where(leads.c.dedup_key.isnot(None)))}
+
+    updates = []
+    collisions = 0
+    for lead_id, email, phone in pending:
+        email_key = normalize_email(email)
+        phone_key = normalize_phone(phone)
+        key = dedup_key(email_key, phone_key)
+        if key in taken:
+            # Older duplicate already owns the key; leave this one unmatched
+            collisions += 1
+            key = None
+        elif key is not None:
+            taken.add(key)
+        updates.append({'lead_id': lead_id, 'email_key': email_key, 'phone_key': phone_key, 'dedup_key': key})
+
+    conn.execute(
+        text("UPDATE leads SET email_key = :email_key, phone_key = :phone_key, dedup_key = :dedup_key WHERE id = :lead_id"),
+        updates
+    )
+    logger.info(f"Backfilled dedup keys for {len(updates)} leads ({collisions} duplicates left unkeyed)")
+
+def _normalize_blacklist(conn):
+    """Stores blacklist identifiers normalized, as add_to_blacklist does, so lookups by normalized value find them."""
+    table = Blacklist.__table__
+    identifier = table.c.identifier
+    # Only rows that can't be normalized already: the list may hold millions
+    rows = conn.execute(
+        select(table.c.id, identifier).where(or_(
+            identifier != func.lower(func.trim(identifier)),
+            ~identifier.like('%@%') & or_(~identifier.like('+%'), *(identifier.like(f'%{char}%') for char in ' -().')),
+        )).order_by(table.c.id)
+    ).all()
+    normalized = {row_id: normalize_identifier(value) for row_id, value in rows}
+    wanted = sorted({value for value in normalized.values() if value})
+    taken = set()
+    for start in range(0, len(wanted), UPSERT_CHUNK_ROWS):
+        taken.update(conn.execute(select(identifier).where(identifier.in_(wanted[start:start + UPSERT_CHUNK_ROWS]))).scalars())
+
+    updates, duplicates = [], []
+    for row_id, value in rows:
+        if normalized[row_id] is None or normalized[row_id] == value:
+            continue
+        if normalized[row_id] in taken:
+            # Another spelling of an identifier already listed
+            duplicates.append(row_id)
+        else:
+            taken.add(normalized[row_id])
+            updates.append({'row_id': row_id, 'identifier': normalized[row_id]})
+    if updates:
+        conn.execute(text("UPDATE blacklist SET identifier = :identifier WHERE id = :row_id"), updates)
+    for start in range(0, len(duplicates), UPSERT_CHUNK_ROWS):
+        conn.execute(delete(table).where(table.c.id.in_(duplicates[start:start + UPSERT_CHUNK_ROWS])))
+    if updates or duplicates:
+        logger.info(f"Normalized {len(updates)} blacklist identifiers ({len(duplicates)} duplicates removed)")
+
 def init_db():
+    log_db_settings()
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if _add_missing_columns(conn, Lead.__table__):
+            conn.execute(text("UPDATE leads SET last_seen = date_added WHERE last_seen IS NULL"))
+        _backfill_lead_keys(conn)
+        _add_missing_columns(conn, Export.__table__)
+        _add_missing_columns(conn, Source.__table__)
+        _normalize_blacklist(conn)
+        # Mock Places results were once cached under the real enricher's name
+        conn.execute(text(
+            "DELETE FROM enrichment_cache WHERE enricher = 'GooglePlacesEnricher' AND payload LIKE '%Google Places (Mock)%'"
+        ))
+    for table in (Lead.__table__, Export.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Seed the counters for databases that predate them
+    with SessionLocal() as db:
+        if db.query(LeadTotal).first() is None and db.query(Lead.id).first() is not None:
+            total = rebuild_lead_stats(db)
+            db.commit()
+            logger.info(f"Built lead stats for {total} existing leads")
 
 def get_db():
     db = SessionLocal()
@@ -86,3 +582,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,28 @@
 from abc import ABC, abstractmethod
+import asyncio
+import random
+from datetime import timedelta
+from rate_limiter import TokenBucket
+from logger import logger
+import metrics
 
 class BaseEnricher(ABC):
+    # Batch enrichment limits, overridable per enricher or per enrich_many call
+    max_concurrency = 10
+    requests_per_second = None  # None = no rate limit
+    max_retries = 3
+    retry_backoff = 0.5  # seconds before the first retry, doubled after each one
+    timeout = 10.0  # seconds allowed per lead and attempt
+    # How long CachedEnricher keeps a result, and a "not found"
+    cache_ttl = timedelta(days=7)
+    negative_cache_ttl = timedelta(days=1)
+    # Name CachedEnricher stores results under (default: the class name).
+    # Modes that give different results, like mock data, need names of their own.
+    cache_name = None
+    # Lead fields the result depends on, if only a few. Lets callers enrich
+    # each distinct combination once instead of every lead.
+    identity_fields = None
+
     @abstractmethod
     def enrich(self, lead_data: dict) -> dict:
         """
@@ -8,3 +30,63 @@ class BaseEnricher(ABC):
         Returns the enriched dictionary.
         """
         pass
+
+    async def aenrich(self, lead_data: dict) -> dict:
+        """
+        Async version of enrich(). Runs enrich() in a worker thread by default;
+        enrichers backed by network calls should override it with native async I/O.
+        """
+        return await asyncio.to_thread(self.enrich, lead_data)
+
+    async def open(self):
+        """Called before a batch, e.g. to open a connection pool."""
+
+    async def close(self):
+        """Called after a batch to release what open() acquired."""
+
+    async def enrich_many(self, leads, max_concurrency=None, requests_per_second=None, max_retries=None, timeout=None) -> list:
+        """
+        Enriches many leads concurrently and returns them in the same order.
+        At most max_concurrency leads are in flight, calls are spread out by a
+        token bucket of requests_per_second, and each lead is retried with
+        exponential backoff. A lead that still fails is returned unchanged.
+        """
+        max_concurrency = max_concurrency or self.max_concurrency
+        max_retries = self.max_retries if max_retries is None else max_retries
+        timeout = timeout or self.timeout
+        bucket = TokenBucket(requests_per_second or self.requests_per_second)
+        name = type(self).__name__
+        attempt_seconds = metrics.ENRICHMENT_SECONDS.labels(name)
+        succeeded = metrics.ENRICHMENT_CALLS.labels(name, "success")
+        failed = metrics.ENRICHMENT_CALLS.labels(name, "error")
+
+        async def enrich_one(lead_data):
+            for attempt in range(max_retries + 1):
+                await bucket.acquire()
+                try:
+                    with attempt_seconds.time():
+                        enriched = await asyncio.wait_for(self.aenrich(dict(lead_data)), timeout)
+                    succeeded.inc()
+                    return enriched
+                except Exception as e:
+                    failed.inc()
+                    if attempt == max_retries:
+                        logger.warning(f"Enrichment failed for {lead_data.get('company')} after {attempt + 1} attempts: {e!r}",
+                                       extra={"sample": "enrichment_failed"})
+                        return lead_data
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt) * random.uniform(0.8, 1.2))
+
+        # A fixed set of workers pulls from one iterator, so memory doesn't grow with the batch
+        results = list(leads)
+        pending = iter(enumerate(results))
+
+        async def worker():
+            for index, lead_data in pending:
+                results[index] = await enrich_one(lead_data)
+
+        await self.open()
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(max_concurrency, len(results)))))
+        finally:
+            await self.close()
+        return results
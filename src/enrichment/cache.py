@@ -0,0 +1,254 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from .base_enricher import BaseEnricher
+from rate_limiter import TokenBucket
+from database import SessionLocal, EnrichmentCacheEntry, dialect_insert
+from normalize import normalize_company, normalize_text
+from logger import logger
+import metrics
+
+# The in-process level is shared by every CachedEnricher for the same enricher,
+# so repeated pipeline runs in one process stay warm.
+_memory_caches = {}
+_memory_lock = threading.Lock()
+
+# Keep the IN (...) lists of cache lookups comfortably small
+DB_LOOKUP_CHUNK = 500
+
+def business_cache_key(lead_data):
+    """Identity of a business for caching: normalized (company, location)."""
+    company = normalize_company(lead_data.get('company'))
+    if not company:
+        return None
+    location = lead_data.get('location')
+    location = "" if location in (None, "N/A") else normalize_text(location)
+    return f"{company}|{location}"
+
+class CachedEnricher(BaseEnricher):
+    """
+    Wraps an enricher with a two-level cache keyed on the business identity:
+    an in-process LRU in front of the enrichment_cache table. Only the fields the
+    enricher adds are cached, for its cache_ttl; "not found" results are cached
+    for its negative_cache_ttl. Failed lookups are never cached.
+    """
+
+    def __init__(self, enricher, ttl=None, negative_ttl=None, max_memory_entries=10000, session_factory=SessionLocal):
+        self.enricher = enricher
+        self.name = enricher.cache_name or type(enricher).__name__
+        self.ttl = ttl or enricher.cache_ttl
+        self.negative_ttl = negative_ttl or enricher.negative_cache_ttl
+        self.max_memory_entries = max_memory_entries
+        self.session_factory = session_factory
+
+        # Batch limits follow the wrapped enricher, except that the rate limit
+        # only applies to cache misses (see aenrich)
+        self.max_concurrency = enricher.max_concurrency
+        self.requests_per_second = None
+        self.max_retries = enricher.max_retries
+        self.retry_backoff = enricher.retry_backoff
+        self.timeout = enricher.timeout
+        self.identity_fields = enricher.identity_fields
+
+        with _memory_lock:
+            self._memory = _memory_caches.setdefault(self.name, OrderedDict())
+        self._in_flight = {}
+        self._upstream_bucket = None
+        self._pending_writes = {}
+        self._db_available = True
+        self.counters = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'db_loads': 0}
+        self._hit_count = metrics.ENRICHMENT_CACHE.labels(self.name, "hit")
+        self._miss_count = metrics.ENRICHMENT_CACHE.labels(self.name, "miss")
+        self._upstream_seconds = metrics.ENRICHMENT_SECONDS.labels(self.name)
+
+    # --- cache levels ---
+
+    def _memory_get(self, key):
+        with _memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= datetime.utcnow():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry
+
+    def _memory_put(self, key, expires_at, payload):
+        with _memory_lock:
+            self._memory[key] = (expires_at, payload)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load_from_db(self, keys):
+        """Copies the unexpired table entries for keys into the memory level (one query per chunk)."""
+        keys = [key for key in keys if key is not None]
+        if not keys or not self._db_available:
+            return
+        now = datetime.utcnow()
+        try:
+            with self.session_factory() as db:
+                for start in range(0, len(keys), DB_LOOKUP_CHUNK):
+                    rows = db.query(EnrichmentCacheEntry.cache_key, EnrichmentCacheEntry.payload, EnrichmentCacheEntry.expires_at).filter(
+                        EnrichmentCacheEntry.enricher == self.name,
+                        EnrichmentCacheEntry.cache_key.in_(keys[start:start + DB_LOOKUP_CHUNK]),
+                        EnrichmentCacheEntry.expires_at > now,
+                    )
+                    for key, payload, expires_at in rows:
+                        self._memory_put(key, expires_at, None if payload is None else json.loads(payload))
+                        self.counters['db_loads'] += 1
+        except SQLAlchemyError as e:
+            self._disable_db(e)
+
+    def _save_to_db(self):
+        """Writes the results gathered since the last save in one transaction."""
+        entries, self._pending_writes = self._pending_writes, {}
+        if not entries or not self._db_available:
+            return
+        rows = [
+            {
+                'enricher': self.name,
+                'cache_key': key,
+                'payload': None if payload is None else json.dumps(payload, default=str),
+                'expires_at': expires_at,
+            }
+            for key, (expires_at, payload) in entries.items()
+        ]
+        try:
+            with self.session_factory() as db:
+                insert = dialect_insert(db.get_bind())
+                for start in range(0, len(rows), DB_LOOKUP_CHUNK):
+                    stmt = insert(EnrichmentCacheEntry).values(rows[start:start + DB_LOOKUP_CHUNK])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=['enricher', 'cache_key'],
+                        set_={'payload': stmt.excluded.payload, 'expires_at': stmt.excluded.expires_at},
+                    )
+                    db.execute(stmt)
+                db.commit()
+        except SQLAlchemyError as e:
+            self._disable_db(e)
+
+    def _disable_db(self, error):
+        logger.warning(f"Enrichment cache table unavailable, using the in-memory cache only: {getattr(error, 'orig', error)}")
+        self._db_available = False
+
+    def _store(self, key, original, enriched):
+        added = {field: value for field, value in enriched.items() if field not in original or original[field] != value}
+        payload = added or None
+        expires_at = datetime.utcnow() + (self.ttl if payload else self.negative_ttl)
+        self._memory_put(key, expires_at, payload)
+        self._pending_writes[key] = (expires_at, payload)
+        return expires_at, payload
+
+    def _hit(self):
+        self.counters['hits'] += 1
+        self._hit_count.inc()
+
+    def _miss(self):
+        self.counters['misses'] += 1
+        self._miss_count.inc()
+
+    @contextmanager
+    def _upstream(self):
+        """Times the wrapped enricher's call for a cache miss and counts its outcome."""
+        with self._upstream_seconds.time():
+            try:
+                yield
+            except Exception:
+                metrics.ENRICHMENT_CALLS.labels(self.name, "error").inc()
+                raise
+        metrics.ENRICHMENT_CALLS.labels(self.name, "success").inc()
+
+    def _apply(self, lead_data, entry):
+        payload = entry[1]
+        if payload is None:
+            self.counters['negative_hits'] += 1
+            return lead_data
+        lead_data.update(payload)
+        return lead_data
+
+    # --- BaseEnricher interface ---
+
+    def enrich(self, lead_data: dict) -> dict:
+        key = business_cache_key(lead_data)
+        if key is None:
+            return self.enricher.enrich(lead_data)
+
+        entry = self._memory_get(key)
+        if entry is None:
+            self._load_from_db([key])
+            entry = self._memory_get(key)
+        if entry is not None:
+            self._hit()
+            return self._apply(lead_data, entry)
+
+        self._miss()
+        original = dict(lead_data)
+        with self._upstream():
+            enriched = self.enricher.enrich(lead_data)
+        self._store(key, original, enriched)
+        self._save_to_db()
+        return enriched
+
+    async def aenrich(self, lead_data: dict) -> dict:
+        key = business_cache_key(lead_data)
+        if key is None:
+            return await self.enricher.aenrich(lead_data)
+
+        entry = self._memory_get(key)
+        if entry is not None:
+            self._hit()
+            return self._apply(lead_data, entry)
+
+        # Leads of the same business share one upstream call
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            entry = await asyncio.shield(in_flight)
+            self._hit()
+            return self._apply(lead_data, entry)
+
+        self._miss()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            original = dict(lead_data)
+            if self._upstream_bucket is not None:
+                await self._upstream_bucket.acquire()
+            with self._upstream():
+                enriched = await self.enricher.aenrich(lead_data)
+            future.set_result(self._store(key, original, enriched))
+            return enriched
+        except BaseException as e:
+            # Waiters retry on their own; never hand them our cancellation
+            future.set_exception(e if isinstance(e, Exception) else RuntimeError(f"Lookup for '{key}' was interrupted"))
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def open(self):
+        await self.enricher.open()
+
+    async def close(self):
+        await self.enricher.close()
+
+    async def enrich_many(self, leads, requests_per_second=None, **kwargs) -> list:
+        """
+        Prefetches the table entries for the whole batch in bulk, enriches the
+        misses through the wrapped enricher, then writes the new results back at once.
+        """
+        leads = list(leads)
+        missing = {key for key in map(business_cache_key, leads) if key is not None and self._memory_get(key) is None}
+        await asyncio.to_thread(self._load_from_db, sorted(missing))
+        self._upstream_bucket = TokenBucket(requests_per_second or self.enricher.requests_per_second)
+        try:
+            return await super().enrich_many(leads, **kwargs)
+        finally:
+            self._upstream_bucket = None
+            await asyncio.to_thread(self._save_to_db)
+            logger.info(f"{self.name} cache: {self.counters['hits']} hits ({self.counters['negative_hits']} not found), {self.counters['misses']} misses")
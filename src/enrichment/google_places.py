@@ -1,18 +1,93 @@
 from .base_enricher import BaseEnricher
+import os
 import random
+from datetime import timedelta
+import httpx
+
+PLACES_API_URL = "https://maps.googleapis.com/maps/api/place"
 
 class GooglePlacesEnricher(BaseEnricher):
+    max_concurrency = 10
+    requests_per_second = 10
+    cache_ttl = timedelta(days=14)
+    identity_fields = ('company', 'location')
+
+    def __init__(self, api_key=None, base_url=None):
+        # Without an API key the enricher falls back to mock data
+        self.api_key = api_key or os.getenv("GOOGLE_PLACES_API_KEY")
+        self.base_url = (base_url or os.getenv("GOOGLE_PLACES_URL") or PLACES_API_URL).rstrip('/')
+        self._client = None
+        if not self.api_key:
+            self.requests_per_second = None  # mock data costs nothing
+            # ...and must never be served from the cache once a key is set
+            self.cache_name = f"{type(self).__name__}:mock"
+
     def enrich(self, lead_data: dict) -> dict:
-        # Mock enrichment logic
-        # In production, this would call the Google Places API
-        
         if not lead_data.get('company'):
             return lead_data
-            
+
+        if not self.api_key:
+            return self._mock_enrich(lead_data)
+
+        response = httpx.get(f"{self.base_url}/findplacefromtext/json", params=self._query(lead_data), timeout=self.timeout)
+        response.raise_for_status()
+        return self._apply_place(lead_data, response.json())
+
+    async def aenrich(self, lead_data: dict) -> dict:
+        if not lead_data.get('company'):
+            return lead_data
+
+        if not self.api_key:
+            return self._mock_enrich(lead_data)
+
+        client = self._client or httpx.AsyncClient(timeout=self.timeout)
+        try:
+            response = await client.get(f"{self.base_url}/findplacefromtext/json", params=self._query(lead_data))
+            response.raise_for_status()
+            return self._apply_place(lead_data, response.json())
+        finally:
+            if client is not self._client:
+                await client.aclose()
+
+    async def open(self):
+        if self.api_key:
+            limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _query(self, lead_data):
+        text = " ".join(str(part) for part in (lead_data.get('company'), lead_data.get('location')) if part and part != "N/A")
+        return {
+            'input': text,
+            'inputtype': 'textquery',
+            'fields': 'name,rating,user_ratings_total,business_status',
+            'key': self.api_key,
+        }
+
+    def _apply_place(self, lead_data, payload):
+        status = payload.get('status')
+        if status == 'ZERO_RESULTS' or not payload.get('candidates'):
+            return lead_data
+        if status not in (None, 'OK'):
+            # OVER_QUERY_LIMIT, UNKNOWN_ERROR etc. are worth retrying
+            raise RuntimeError(f"Places API returned {status}")
+
+        place = payload['candidates'][0]
+        lead_data['rating'] = place.get('rating')
+        lead_data['review_count'] = place.get('user_ratings_total')
+        lead_data['verified_business'] = place.get('business_status') == 'OPERATIONAL'
+        lead_data['enrichment_source'] = "Google Places"
+        return lead_data
+
+    def _mock_enrich(self, lead_data):
         # Simulate finding a rating and address
         lead_data['rating'] = round(random.uniform(3.5, 5.0), 1)
         lead_data['review_count'] = random.randint(5, 500)
         lead_data['verified_business'] = True
         lead_data['enrichment_source'] = "Google Places (Mock)"
-        
+
         return lead_data
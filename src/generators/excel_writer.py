@@ -0,0 +1,73 @@
+from datetime import date, datetime
+import xlsxwriter
+
+# Excel's sheet size limit, header row included
+EXCEL_MAX_ROWS = 1048576
+
+def write(data, output_path):
+    """Writes a DataFrame (or lead dicts) to a one-sheet workbook. Returns the row count."""
+    import pandas as pd
+
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(data)
+    data.to_excel(output_path, index=False)
+    return len(data)
+
+class StreamingWorkbook:
+    """
+    Writes rows as they come through xlsxwriter's constant_memory mode, so
+    memory use does not grow with the row count. A full sheet continues on a
+    new one ("Leads 2", ...).
+    """
+
+    def __init__(self, output_path, columns, max_rows_per_sheet=EXCEL_MAX_ROWS):
+        self.columns = columns
+        self.max_rows_per_sheet = max_rows_per_sheet
+        # Scraped text is data: never turn it into formulas or hyperlinks
+        self.workbook = xlsxwriter.Workbook(output_path, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+        })
+        self.date_format = self.workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        self.header_format = self.workbook.add_format({'bold': True})
+        self.sheet = None
+        self.sheet_row = max_rows_per_sheet
+        self.sheets = 0
+        self.row_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _add_sheet(self):
+        self.sheets += 1
+        self.sheet = self.workbook.add_worksheet("Leads" if self.sheets == 1 else f"Leads {self.sheets}")
+        self.sheet.write_row(0, 0, self.columns, self.header_format)
+        self.sheet_row = 1
+
+    def write_row(self, values):
+        if self.sheet_row >= self.max_rows_per_sheet:
+            self._add_sheet()
+        for col, value in enumerate(values):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                self.sheet.write_string(self.sheet_row, col, value)
+            elif isinstance(value, (datetime, date)):
+                self.sheet.write_datetime(self.sheet_row, col, value, self.date_format)
+            elif isinstance(value, bool):
+                self.sheet.write_boolean(self.sheet_row, col, value)
+            elif isinstance(value, (int, float)):
+                self.sheet.write_number(self.sheet_row, col, value)
+            else:
+                self.sheet.write_string(self.sheet_row, col, str(value))
+        self.sheet_row += 1
+        self.row_count += 1
+
+    def close(self):
+        if self.sheet is None:
+            self._add_sheet()
+        self.workbook.close()
@@ -0,0 +1,138 @@
+from fpdf import FPDF
+import os
+import tempfile
+
+# (header, width in mm, how to read the cell from a lead record)
+PDF_COLUMNS = (
+    ("Name", 35, lambda lead: " ".join(str(part) for part in (lead.get("first_name"), lead.get("last_name")) if _present(part))),
+    ("Company", 38, lambda lead: lead.get("company")),
+    ("Location", 28, lambda lead: lead.get("location")),
+    ("Phone", 30, lambda lead: lead.get("phone")),
+    ("Email", 47, lambda lead: lead.get("email")),
+    ("Score", 12, lambda lead: lead.get("score")),
+)
+
+# Page layout (A4 portrait, mm). Pages are filled to a fixed number of rows,
+# so any page can be rendered on its own and chunks merge seamlessly.
+PAGE_HEIGHT = 297
+MARGIN = 10
+TITLE_HEIGHT = 20
+HEADER_HEIGHT = 8
+ROW_HEIGHT = 7
+FOOTER_HEIGHT = 10
+ROWS_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN - HEADER_HEIGHT - FOOTER_HEIGHT) // ROW_HEIGHT)
+ROWS_ON_FIRST_PAGE = int((PAGE_HEIGHT - 2 * MARGIN - TITLE_HEIGHT - HEADER_HEIGHT - FOOTER_HEIGHT) // ROW_HEIGHT)
+
+def _present(value):
+    return value is not None and value == value and str(value) not in ("", "N/A")
+
+def _text(value):
+    if not _present(value):
+        return ""
+    # The core fonts only cover Latin-1
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+def format_rows(records):
+    """The cell texts of each record, in PDF_COLUMNS order."""
+    return [tuple(_text(read(lead)) for _, _, read in PDF_COLUMNS) for lead in records]
+
+def paginate(rows):
+    """Splits rows into pages: a shorter first page (it carries the title), then full pages."""
+    pages = [rows[:ROWS_ON_FIRST_PAGE]]
+    for start in range(ROWS_ON_FIRST_PAGE, len(rows), ROWS_PER_PAGE):
+        pages.append(rows[start:start + ROWS_PER_PAGE])
+    return pages
+
+class LeadReportPDF(FPDF):
+    def __init__(self, title, first_page_number=1, total_pages=None):
+        super().__init__(orientation="P", unit="mm", format="A4")
+        self.report_title = title
+        self.first_page_number = first_page_number
+        self.total_pages = total_pages
+        self.set_margins(MARGIN, MARGIN, MARGIN)
+        self.set_auto_page_break(False)
+
+    def page_number(self):
+        return self.first_page_number + self.page_no() - 1
+
+    def header(self):
+        if self.page_number() == 1:
+            self.set_font("helvetica", style="B", size=16)
+            self.cell(0, TITLE_HEIGHT - 5, self.report_title, align="C", new_x="LMARGIN", new_y="NEXT")
+            self.ln(5)
+        # Column headers repeat on every page
+        self.set_font("helvetica", style="B", size=9)
+        self.set_fill_color(230, 230, 230)
+        for header, width, _ in PDF_COLUMNS:
+            self.cell(width, HEADER_HEIGHT, header, border=1, fill=True)
+        self.ln()
+        self.set_font("helvetica", size=8)
+
+    def footer(self):
+        self.set_y(-MARGIN - FOOTER_HEIGHT + 2)
+        self.set_font("helvetica", size=8)
+        suffix = f" of {self.total_pages}" if self.total_pages else ""
+        self.cell(0, FOOTER_HEIGHT - 2, f"Page {self.page_number()}{suffix}", align="C")
+
+    def fit(self, text, width):
+        """Clips text that doesn't fit width instead of letting it run into the next cell."""
+        # get_string_width() is slow; the row font never changes, so measure each character once
+        char_widths = self._char_widths
+        total = 0
+        for index, char in enumerate(text):
+            char_width = char_widths.get(char)
+            if char_width is None:
+                char_width = char_widths[char] = self.get_string_width(char)
+            total += char_width
+            if total > width - 2:
+                return text[:max(index - 1, 0)] + "."
+        return text
+
+    def add_rows(self, rows):
+        self._char_widths = {}
+        for row in rows:
+            for (_, width, _), text in zip(PDF_COLUMNS, row):
+                self.cell(width, ROW_HEIGHT, self.fit(text, width), border=1)
+            self.ln()
+
+def render_pages(pages, output_path, title, first_page_number=1, total_pages=None):
+    """Renders a run of pages (lists of formatted rows) to output_path. Safe to run in a worker process."""
+    pdf = LeadReportPDF(title, first_page_number, total_pages)
+    for rows in pages or [[]]:
+        pdf.add_page()
+        pdf.add_rows(rows)
+    pdf.output(output_path)
+    return output_path
+
+def render_pdf(rows, output_path, title, executor=None, chunk_pages=50):
+    """
+    Renders formatted rows to output_path. With an executor (a process pool),
+    reports longer than chunk_pages are rendered in page-aligned chunks in
+    parallel and merged; shorter ones render in a single worker.
+    """
+    pages = paginate(rows)
+    if executor is None:
+        return render_pages(pages, output_path, title, total_pages=len(pages))
+    if len(pages) <= chunk_pages:
+        return executor.submit(render_pages, pages, output_path, title, 1, len(pages)).result()
+
+    from pypdf import PdfWriter
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_path) or None) as workdir:
+        futures = [
+            executor.submit(
+                render_pages, pages[start:start + chunk_pages], os.path.join(workdir, f"part_{start:08d}.pdf"),
+                title, start + 1, len(pages),
+            )
+            for start in range(0, len(pages), chunk_pages)
+        ]
+        writer = PdfWriter()
+        for future in futures:
+            writer.append(future.result())
+        with open(output_path, "wb") as output:
+            writer.write(output)
+    return output_path
+
+def write(records, output_path, title="Lead Report", executor=None, chunk_pages=50):
+    """The "pdf" report format (see registry.REPORT_FORMATS): renders lead records to output_path."""
+    return render_pdf(format_rows(records), output_path, title, executor=executor, chunk_pages=chunk_pages)
@@ -1,62 +1,181 @@
-from fpdf import FPDF
-import pandas as pd
+import json
 import os
+import sys
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from database import Export, Lead, LEAD_PUBLIC_FIELDS
+from logger import logger
+from blacklist import blacklist
+from registry import REPORT_FORMATS
+import metrics
+
+# Excel's sheet size limit, header row included (see excel_writer)
+EXCEL_MAX_ROWS = 1048576
+# Leads fetched from the database per round trip when streaming an export
+EXPORT_CHUNK_ROWS = 5000
+# Export.mode of incremental reports
+DELTA = "delta"
+SNAPSHOT = "snapshot"
+# PDF pages rendered per worker task when a report is split across processes
+PDF_CHUNK_PAGES = int(os.getenv("PDF_CHUNK_PAGES", "50"))
+
+def _is_frame(data):
+    # Without pandas imported, data can't be a DataFrame: no need to import it to check
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(data, pd.DataFrame)
 
 class ReportGenerator:
-    def __init__(self, output_dir="reports"):
+    def __init__(self, output_dir="reports", db_session=None):
         self.output_dir = output_dir
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-    def generate_pdf(self, data, title="Lead Report"):
-        """
-        Generates a PDF report from the data.
-        """
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        # Title
-        pdf.set_font("Arial", style="B", size=16)
-        pdf.cell(200, 10, txt=title, ln=True, align='C')
-        pdf.ln(10)
-        
-        # Table Header
-        pdf.set_font("Arial", style="B", size=10)
-        col_width = 40
-        headers = ["Name", "Agency", "Area", "Phone"]
-        
-        for header in headers:
-            pdf.cell(col_width, 10, header, border=1)
-        pdf.ln()
-        
-        # Table Data
-        pdf.set_font("Arial", size=10)
-        if isinstance(data, pd.DataFrame):
-            records = data.to_dict('records')
+        # When given, every generated file is recorded in the exports table
+        self.db = db_session
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _record_export(self, output_path, params, row_count, started, watermark=None):
+        seconds = time.perf_counter() - started
+        byte_size = os.path.getsize(output_path)
+        report_format = params.get("format")
+        metrics.REPORT_SECONDS.labels(report_format).observe(seconds)
+        metrics.REPORT_ROWS.labels(report_format).inc(row_count)
+        metrics.REPORT_BYTES.labels(report_format).inc(byte_size)
+        if self.db is None:
+            return
+        self.db.add(Export(
+            filename=os.path.basename(output_path),
+            query_params=json.dumps(params),
+            row_count=row_count,
+            byte_size=byte_size,
+            generation_ms=int(seconds * 1000),
+            format=report_format,
+            **(watermark or {}),
+        ))
+        self.db.commit()
+
+    # --- incremental reports ---
+
+    def last_watermark(self, niche):
+        """Highest lead id already covered by a delta or snapshot report of niche (0 if none)."""
+        return self.db.query(func.max(Export.max_lead_id)).filter(
+            Export.niche == niche, Export.mode.in_((DELTA, SNAPSHOT))
+        ).scalar() or 0
+
+    def _watermark(self, niche, mode, rows):
+        """The Export fields recording that a report covers rows (the last one being the newest)."""
+        return {
+            'niche': niche,
+            'mode': mode,
+            'max_lead_id': rows[-1]['id'],
+            'watermark_at': rows[-1]['date_added'],
+        }
+
+    def delta_leads(self, niche):
+        """
+        The niche's leads added since its last delta or snapshot report, oldest
+        first, with the watermark to record on the reports built from them.
+        Returns ([], None) when there is nothing new.
+        """
+        since_id = self.last_watermark(niche)
+        query = select(*(getattr(Lead, column) for column in LEAD_PUBLIC_FIELDS), Lead.duplicate_of).where(
+            Lead.niche == niche, Lead.id > since_id
+        ).order_by(Lead.id)
+        records = [dict(row._mapping) for row in self.db.execute(query)]
+        if not records:
+            return [], None
+        logger.info(f"{len(records)} new {niche} leads since lead {since_id}")
+        watermark = self._watermark(niche, DELTA, records)
+        # The watermark covers blacklisted leads and known duplicates too; they are never reported
+        unique = [record for record in records if record.pop('duplicate_of') is None]
+        return blacklist.filter(unique), watermark
+
+    def compact(self, niche):
+        """
+        Merges the niche's delta reports into one full snapshot: every lead up
+        to now, streamed to Excel. Later deltas continue from the snapshot.
+        """
+        stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        filename = f"{niche.lower().replace(' ', '_')}_leads_snapshot_{stamp}.xlsx"
+        return self.stream_excel(niche=niche, filename=filename, mode=SNAPSHOT)
+
+    def generate_pdf(self, data, title="Lead Report", executor=None, watermark=None, filename=None):
+        """
+        Generates a PDF report from the data (a DataFrame or lead dicts).
+        Pass a process pool as executor to render off this process, and
+        large reports in parallel chunks. watermark (from delta_leads) is
+        recorded with the export.
+        """
+        started = time.perf_counter()
+        if _is_frame(data):
+            records = data[~blacklist.frame_mask(data)].to_dict('records')
         else:
-            records = data
-
-        for row in records:
-            pdf.cell(col_width, 10, str(row.get("name", "")), border=1)
-            pdf.cell(col_width, 10, str(row.get("agency", "")), border=1)
-            pdf.cell(col_width, 10, str(row.get("area", "")), border=1)
-            pdf.cell(col_width, 10, str(row.get("phone", "")), border=1)
-            pdf.ln()
-            
-        output_path = os.path.join(self.output_dir, f"{title.replace(' ', '_')}.pdf")
-        pdf.output(output_path)
+            records = blacklist.filter(data)
+
+        output_path = os.path.join(self.output_dir, filename or f"{title.replace(' ', '_')}.pdf")
+        write_pdf = REPORT_FORMATS.resolve("pdf")
+        write_pdf(records, output_path, title=title, executor=executor, chunk_pages=PDF_CHUNK_PAGES)
+        self._record_export(output_path, {"format": "pdf", "title": title}, len(records), started, watermark)
         print(f"PDF Report generated: {output_path}")
         return output_path
 
-    def generate_excel(self, data, filename="leads.xlsx"):
+    def generate_excel(self, data, filename="leads.xlsx", watermark=None):
         """
-        Generates an Excel report.
+        Generates an Excel report. watermark (from delta_leads) is recorded with the export.
         """
+        started = time.perf_counter()
         output_path = os.path.join(self.output_dir, filename)
-        if isinstance(data, pd.DataFrame):
-            data.to_excel(output_path, index=False)
+        if _is_frame(data):
+            data = data[~blacklist.frame_mask(data)]
         else:
-            pd.DataFrame(data).to_excel(output_path, index=False)
+            data = blacklist.filter(data)
+        row_count = REPORT_FORMATS.resolve("xlsx")(data, output_path)
+        self._record_export(output_path, {"format": "xlsx"}, row_count, started, watermark)
         print(f"Excel Report generated: {output_path}")
         return output_path
+
+    def stream_excel(self, niche=None, filename=None, columns=LEAD_PUBLIC_FIELDS,
+                     chunk_rows=EXPORT_CHUNK_ROWS, max_rows_per_sheet=EXCEL_MAX_ROWS, mode=None):
+        """
+        Exports leads (without known duplicates) straight from the database,
+        chunk_rows at a time, through an excel_writer.StreamingWorkbook, so
+        memory use does not grow with the row count.
+        Requires a db_session. Returns the output path. With mode=SNAPSHOT
+        the export becomes the niche's incremental report watermark.
+        """
+        if self.db is None:
+            raise ValueError("stream_excel needs a ReportGenerator with a db_session")
+
+        started = time.perf_counter()
+        if filename is None:
+            filename = f"{(niche or 'all').lower().replace(' ', '_')}_leads.xlsx"
+        output_path = os.path.join(self.output_dir, filename)
+
+        if mode is not None and not niche:
+            raise ValueError("Incremental exports are per niche")
+        query = select(*(getattr(Lead, column) for column in columns)).where(Lead.duplicate_of.is_(None)).order_by(Lead.id)
+        if niche:
+            query = query.where(Lead.niche == niche)
+        watermark = None
+        if mode is not None:
+            # Pin the export to the leads that exist now
+            newest = self.db.execute(
+                select(Lead.id, Lead.date_added).where(Lead.niche == niche).order_by(Lead.id.desc()).limit(1)
+            ).first()
+            if newest is not None:
+                watermark = self._watermark(niche, mode, [dict(newest._mapping)])
+                query = query.where(Lead.id <= newest.id)
+
+        from .excel_writer import StreamingWorkbook
+
+        # One refresh for the whole export, not one check of the table per row
+        blacklist.refresh()
+        with StreamingWorkbook(output_path, columns, max_rows_per_sheet) as workbook:
+            result = self.db.execute(query.execution_options(yield_per=chunk_rows))
+            for rows in result.partitions():
+                for values in rows:
+                    if not blacklist.is_blocked(values._mapping, refresh=False):
+                        workbook.write_row(values)
+        row_count = workbook.row_count
+
+        self._record_export(output_path, {"format": "xlsx", "niche": niche, "streamed": True}, row_count, started, watermark)
+        logger.info(f"Streamed {row_count} leads to {output_path} ({workbook.sheets} sheet(s))")
+        return output_path
@@ -0,0 +1,198 @@
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from database import SessionLocal
+from logger import logger
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+@dataclass
+class Job:
+    id: str
+    niche_key: str
+    niche_name: str
+    collector_cls: type = field(repr=False)
+    num_samples: int = 20
+    requested_by: Optional[str] = None
+    # Everyone given this job: its submitter, and those whose requests coalesced onto it
+    requesters: set = field(default_factory=set)
+    status: str = QUEUED
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    processed: int = 0
+    leads_saved: int = 0
+    errors: list = field(default_factory=list)
+    collector: object = field(default=None, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def progress(self) -> float:
+        """Fraction of the requested samples processed so far (0.0 - 1.0)."""
+        if self.status == COMPLETED:
+            return 1.0
+        if not self.num_samples:
+            return 0.0
+        processed = self.collector.processed_count if self.collector is not None else self.processed
+        return min(processed / self.num_samples, 1.0)
+
+    def to_dict(self):
+        leads_saved = self.leads_saved
+        errors = list(self.errors)
+        if self.collector is not None and self.status == RUNNING:
+            leads_saved = len(self.collector.data)
+            errors = self.collector.errors + errors
+        return {
+            'job_id': self.id,
+            'niche': self.niche_name,
+            'status': self.status,
+            'progress': round(self.progress(), 3),
+            'leads_saved': leads_saved,
+            'errors': errors,
+            'requested_by': self.requested_by,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+class JobManager:
+    """
+    Runs scrape jobs on a fixed pool of asyncio workers.
+    Each job gets its own database session, and a niche only ever has one
+    queued or running job: triggering it again returns the existing one.
+    """
+
+    def __init__(self, max_workers=2, history_size=200):
+        self.max_workers = max_workers
+        self.history_size = history_size
+        self.jobs = {}
+        self._active_by_niche = {}
+        self._queue = None
+        self._workers = []
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+        logger.info(f"Job manager started with {self.max_workers} workers")
+
+    async def stop(self):
+        """Cancels every queued and running job, waits for them to clean up, then stops the workers."""
+        self._stopping = True
+        running = [job.task for job in self._active_by_niche.values() if job.task is not None]
+        for job in list(self._active_by_niche.values()):
+            self.cancel(job.id)
+        await asyncio.gather(*running, return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Job manager stopped")
+
+    def submit(self, niche_key, collector_cls, niche_name, num_samples=20, requested_by=None):
+        """
+        Queues a scrape for a niche. Returns (job, created); created is False
+        when an active job for the niche already existed and was returned instead.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job manager is not running")
+
+        active = self._active_by_niche.get(niche_key)
+        if active is not None and active.status in ACTIVE_STATUSES:
+            if requested_by:
+                active.requesters.add(requested_by)
+            return active, False
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            niche_key=niche_key,
+            niche_name=niche_name,
+            collector_cls=collector_cls,
+            num_samples=num_samples,
+            requested_by=requested_by,
+            requesters={requested_by} if requested_by else set(),
+        )
+        self.jobs[job.id] = job
+        self._active_by_niche[niche_key] = job
+        self._queue.put_nowait(job)
+        self._prune()
+        logger.info(f"Queued scrape job {job.id} for {niche_name}")
+        return job, True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns the job, or None if unknown."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def _worker(self, worker_id):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != QUEUED:
+                    continue  # cancelled while waiting
+                job.task = asyncio.create_task(self._run(job))
+                try:
+                    await job.task
+                except asyncio.CancelledError:
+                    # A cancelled job ends here; a stopping worker goes on stopping
+                    if self._stopping or not job.task.cancelled():
+                        raise
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job.status = RUNNING
+        job.started_at = datetime.utcnow()
+        logger.info(f"Starting scrape job {job.id} for {job.niche_name}")
+
+        db = SessionLocal()
+        try:
+            job.collector = job.collector_cls(db)
+            await job.collector.collect(num_samples=job.num_samples)
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+            logger.info(f"Scrape job {job.id} for {job.niche_name} cancelled")
+            raise
+        except Exception as e:
+            job.errors.append(str(e))
+            self._finish(job, FAILED)
+            logger.error(f"Scrape job {job.id} for {job.niche_name} failed: {e}")
+        else:
+            self._finish(job, COMPLETED)
+            logger.info(f"Scrape job {job.id} for {job.niche_name} finished: {job.leads_saved} new leads")
+        finally:
+            db.close()
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = datetime.utcnow()
+        if job.collector is not None:
+            job.processed = job.collector.processed_count
+            job.leads_saved = len(job.collector.data)
+            job.errors = job.collector.errors + job.errors
+            job.collector = None
+        if self._active_by_niche.get(job.niche_key) is job:
+            del self._active_by_niche[job.niche_key]
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond history_size."""
+        finished = [job for job in self.jobs.values() if job.status not in ACTIVE_STATUSES]
+        for job in finished[:max(0, len(self.jobs) - self.history_size)]:
+            del self.jobs[job.id]
@@ -1,29 +1,202 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" or "json" (one JSON object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# The log file is rotated when it reaches LOG_MAX_MB, and every
+# LOG_ROTATE_HOURS (counted from local midnight; 0 = size only), keeping
+# LOG_BACKUP_COUNT old files (app.log.1 is the newest)
+LOG_MAX_MB = float(os.getenv("LOG_MAX_MB", "50"))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+# Messages logged with extra={"sample": key} (per lead, per item) pass at
+# most LOG_SAMPLE_BURST times per key every LOG_SAMPLE_WINDOW_SECONDS
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "10"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "10"))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, the extra= fields and any exception."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        """
+        Makes the record safe to hand to the listener thread like QueueHandler
+        does, but keeps the traceback in exc_text rather than in the message,
+        so each formatter lays it out its own way.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits messages tagged with extra={"sample": key}: the first `burst`
+    of each key pass in every `window` seconds and the rest are dropped. The
+    next message of the key that passes says how many were dropped.
+    Untagged messages always pass.
+    """
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._windows = {}  # key -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or self.burst <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state is not None else 0
+                state = self._windows[key] = [now, 0, suppressed]
+            if state[1] >= self.burst:
+                state[2] += 1
+                return False
+            state[1] += 1
+            suppressed, state[2] = state[2], 0
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+            record.suppressed = suppressed
+        return True
+
+class RotatingLogFile(RotatingFileHandler):
+    """
+    A RotatingFileHandler that also rolls over every interval_seconds, at
+    boundaries counted from local midnight. A file last written before the
+    current boundary is rotated on the first write, so short CLI runs rotate
+    too.
+    """
+
+    def __init__(self, filename, max_bytes, interval_seconds, backup_count):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=max(1, backup_count), encoding="utf-8", delay=True)
+        self.interval = interval_seconds
+        self.rollover_at = None
+        if self.interval > 0:
+            started = os.path.getmtime(self.baseFilename) if os.path.exists(self.baseFilename) else time.time()
+            self.rollover_at = self._next_boundary(started)
+
+    def _next_boundary(self, moment):
+        midnight = datetime.fromtimestamp(moment).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        return midnight + ((moment - midnight) // self.interval + 1) * self.interval
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval > 0:
+            self.rollover_at = self._next_boundary(time.time())
+
+def _handlers(rotate=True):
+    """
+    The console and log file handlers. Only the main process rotates the
+    file (rotate=False): a forked process appends to whichever file is
+    current, reopening it after the main process rotates it.
+    """
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    console = logging.StreamHandler(sys.stdout)
+    if rotate:
+        log_file = RotatingLogFile(LOG_FILE, int(LOG_MAX_MB * 1024 * 1024), LOG_ROTATE_HOURS * 3600, LOG_BACKUP_COUNT)
+    else:
+        log_file = WatchedFileHandler(LOG_FILE, encoding="utf-8", delay=True)
+    for handler in (console, log_file):
+        handler.setFormatter(formatter)
+    return console, log_file
 
 def setup_logger(name="LeadForge"):
+    """
+    The application logger. Callers only put records on a queue; a
+    background thread formats them and writes the console and the rotating
+    log file, so logging never waits on the disk.
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-
-    # Create handlers
-    c_handler = logging.StreamHandler(sys.stdout)
-    f_handler = logging.FileHandler('app.log')
-    
-    c_handler.setLevel(logging.INFO)
-    f_handler.setLevel(logging.INFO)
-
-    # Create formatters and add it to handlers
-    c_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    f_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    c_handler.setFormatter(c_format)
-    f_handler.setFormatter(f_format)
-
-    # Add handlers to the logger
-    if not logger.handlers:
-        logger.addHandler(c_handler)
-        logger.addHandler(f_handler)
+    logger.setLevel(LOG_LEVEL)
+    if logger.handlers:
+        return logger
 
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    # Drop sampled-out records before they are queued
+    queue_handler.addFilter(SamplingFilter())
+    logger.addHandler(queue_handler)
+
+    handlers = _handlers()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Written out before the interpreter exits
+    atexit.register(listener.stop)
+
+    def restart_in_child():
+        # A forked process (the PDF workers) doesn't inherit the thread that
+        # drains the queue, and may exit with os._exit() before a thread of
+        # its own would have written its records: it writes them directly
+        logger.removeHandler(queue_handler)
+        logger.addFilter(SamplingFilter())
+        for handler in _handlers(rotate=False):
+            logger.addHandler(handler)
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=restart_in_child)
     return logger
 
+def tail_log(path=LOG_FILE, lines=50, block_size=8192):
+    """
+    The last `lines` lines of a log file, read backwards from its end a block
+    at a time, so the cost depends on the lines asked for, not the file size.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # One newline more than lines: the first, partial line is dropped
+        while position > 0 and data.count(b"\n") <= lines:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    text = data.decode("utf-8", errors="replace").splitlines()
+    return text[-lines:] if lines > 0 else []
+
 logger = setup_logger()
@@ -1,63 +1,147 @@
-from collectors.real_estate_collector import RealEstateCollector
-from collectors.tutor_collector import TutorCollector
-from collectors.service_provider_collector import ServiceProviderCollector
-from processors.data_processor import DataProcessor
+from processors.dedup import DedupEngine
 from generators.report_generator import ReportGenerator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
 import os
+import time
 from database import init_db, SessionLocal
+from registry import NICHES, niche_label
 from logger import logger
 import asyncio
+import metrics
 
-async def run_niche(collector_class, niche_name, db_session):
+# How many niches may run at the same time
+NICHE_CONCURRENCY = int(os.getenv("NICHE_CONCURRENCY", "3"))
+# Processes that render PDF reports (shared by all niches)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+
+def start_pdf_pool(max_workers=PDF_WORKERS):
+    """
+    Starts the PDF rendering processes. Called before the pipeline starts
+    its worker threads, so no lock of theirs can be held at the fork; the
+    logger's listener thread is running, but a forked worker logs directly
+    to the console and log file (see logger.setup_logger) instead.
+    """
+    pool = ProcessPoolExecutor(max_workers=max(1, max_workers))
+    pool.submit(int).result()
+    return pool
+
+def process_and_report(niche_name, pdf_executor=None):
+    """
+    Cleans, scores and renders reports of the niche's leads added since its
+    last report, and records them as the new watermark. Runs in a worker
+    thread so it doesn't hold up the other niches; the PDF is rendered in
+    pdf_executor's processes.
+    """
+    with SessionLocal() as db:
+        # Mark fuzzy duplicates first so reports leave them out
+        DedupEngine(db).run(niche=niche_name)
+
+        generator = ReportGenerator(db_session=db)
+        raw_data, watermark = generator.delta_leads(niche_name)
+        if not raw_data:
+            logger.warning(f"No new {niche_name} leads since the last report.")
+            return 0
+
+        # 2. Processing (pandas and the enrichers load here, not at startup)
+        from processors.data_processor import DataProcessor
+
+        processor = DataProcessor(raw_data)
+        cleaned_df = processor.clean_data()
+        scored_df = processor.score_leads()
+
+        logger.info(f"Processed {len(scored_df)} leads for {niche_name}.")
+
+        # 3. Reporting
+        name = f"{niche_name.lower().replace(' ', '_')}_leads_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        generator.generate_pdf(scored_df, title=f"{niche_name} Leads", executor=pdf_executor, watermark=watermark, filename=f"{name}.pdf")
+        generator.generate_excel(scored_df, filename=f"{name}.xlsx", watermark=watermark)
+    return len(scored_df)
+
+def compact_reports():
+    """Writes a full snapshot report of every niche (see ReportGenerator.compact)."""
+    with SessionLocal() as db:
+        generator = ReportGenerator(db_session=db)
+        for key in NICHES.names():
+            generator.compact(niche_label(key))
+
+async def run_niche(collector_class, niche_name, num_samples=20, pdf_executor=None):
+    """
+    Runs the full pipeline for one niche on its own database session.
+    Returns the number of leads that made it into the reports.
+    """
     logger.info(f"--- Processing {niche_name} ---")
-    
-    # 1. Collection
-    collector = collector_class(db_session)
-    await collector.collect(num_samples=20)
-    raw_data = collector.data
-    
-    if not raw_data:
-        logger.warning(f"No data collected for {niche_name}.")
-        return
-
-    # 2. Processing
-    processor = DataProcessor(raw_data)
-    cleaned_df = processor.clean_data()
-    scored_df = processor.score_leads()
-    
-    logger.info(f"Processed {len(scored_df)} leads.")
-    
-    # 3. Reporting
-    generator = ReportGenerator()
-    generator.generate_pdf(scored_df, title=f"{niche_name} Leads")
-    generator.generate_excel(scored_df, filename=f"{niche_name.lower().replace(' ', '_')}_leads.xlsx")
-
-async def main_async():
+    start = time.perf_counter()
+    status, leads = "failed", None
+    try:
+        # 1. Collection
+        db_session = SessionLocal()
+        try:
+            collector = collector_class(db_session)
+            await collector.collect(num_samples=num_samples)
+        finally:
+            db_session.close()
+
+        leads = await asyncio.to_thread(process_and_report, niche_name, pdf_executor)
+        status = "success"
+        return leads
+    except asyncio.CancelledError:
+        status = "interrupted"
+        raise
+    finally:
+        metrics.pipeline_finished(niche_name, status, time.perf_counter() - start, leads)
+
+async def _run_niche_isolated(semaphore, collector_cls, niche_name, pdf_executor=None):
+    """Runs one niche under the concurrency limit, capturing its outcome and timing."""
+    async with semaphore:
+        start = time.perf_counter()
+        result = {"niche": niche_name, "status": "success", "leads": 0, "error": None}
+        try:
+            result["leads"] = await run_niche(collector_cls, niche_name, pdf_executor=pdf_executor)
+        except Exception as e:
+            logger.error(f"Error processing {niche_name}: {e}")
+            result["status"] = "failed"
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        return result
+
+async def main_async(max_concurrency=NICHE_CONCURRENCY):
     logger.info("Starting LeadForge System...")
-    
+
     # Initialize Database
     init_db()
-    db = SessionLocal()
-    
-    niches = [
-        (RealEstateCollector, "Real Estate"),
-        (TutorCollector, "Tutors"),
-        (ServiceProviderCollector, "Service Providers")
-    ]
-    
+
+    pdf_pool = start_pdf_pool()
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
     try:
-        for collector_cls, name in niches:
-            try:
-                await run_niche(collector_cls, name, db)
-            except Exception as e:
-                logger.error(f"Error processing {name}: {e}")
+        results = await asyncio.gather(
+            *(_run_niche_isolated(semaphore, NICHES.resolve(key), niche_label(key), pdf_pool) for key in NICHES.names())
+        )
     finally:
-        db.close()
-    
-    logger.info("All niches processed.")
+        pdf_pool.shutdown()
+
+    logger.info(f"All niches processed in {time.perf_counter() - start:.2f}s (concurrency {max_concurrency}).")
+    for result in results:
+        if result["status"] == "success":
+            logger.info(f"  {result['niche']}: {result['leads']} leads in {result['seconds']}s")
+        else:
+            logger.error(f"  {result['niche']}: failed after {result['seconds']}s - {result['error']}")
+    return results
 
 def main():
-    asyncio.run(main_async())
+    parser = argparse.ArgumentParser(description="LeadForge pipeline")
+    parser.add_argument("--compact", action="store_true", help="Also write a full snapshot report of every niche")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main_async())
+        if args.compact:
+            compact_reports()
+    finally:
+        # No one scrapes a batch run: hand its metrics over before exiting
+        metrics.export_batch()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+import os
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest, push_to_gateway, write_to_textfile
+from logger import logger
+
+# Batch runs (main.py) have no /metrics endpoint to scrape: when they end
+# they write their metrics to METRICS_TEXTFILE (for node_exporter's textfile
+# collector) and/or push them to the Pushgateway at METRICS_PUSHGATEWAY (host:port)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+METRICS_PUSHGATEWAY = os.getenv("METRICS_PUSHGATEWAY")
+METRICS_JOB = os.getenv("METRICS_JOB", "leadforge")
+
+# Buckets (seconds) for whole stages and reports, which take far longer than a request
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+PIPELINE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+# Collection
+FETCH_SECONDS = Histogram("leadforge_collector_fetch_seconds", "Time to fetch one collector item", ["niche"])
+FETCHES = Counter("leadforge_collector_fetches", "Collector fetches by outcome (success, error)", ["niche", "outcome"])
+FLUSH_SECONDS = Histogram("leadforge_lead_flush_seconds", "Time to write one batch of leads (upsert and commit)", ["niche"])
+FLUSHES = Counter("leadforge_lead_flushes", "Lead batch writes by outcome (success, error)", ["niche", "outcome"])
+LEADS_SAVED = Counter("leadforge_leads_saved", "Leads written, new or updating a stored lead", ["niche", "kind"])
+
+# Enrichment. The CachedEnricher series time each lead through the cache;
+# the wrapped enricher's series time only the upstream calls of cache misses
+ENRICHMENT_SECONDS = Histogram("leadforge_enrichment_seconds", "Time of one enrichment attempt", ["enricher"])
+ENRICHMENT_CALLS = Counter("leadforge_enrichment_calls", "Enrichment attempts by outcome (success, error)", ["enricher", "outcome"])
+ENRICHMENT_CACHE = Counter("leadforge_enrichment_cache_lookups", "Enrichment cache lookups by result (hit, miss)", ["enricher", "result"])
+
+# Processing and reports
+PROCESSOR_SECONDS = Histogram("leadforge_processor_stage_seconds", "Time of a DataProcessor stage (prepare, enrich, score)",
+                              ["stage"], buckets=STAGE_BUCKETS)
+PROCESSOR_ROWS = Counter("leadforge_processor_rows", "Rows through a DataProcessor stage", ["stage"])
+REPORT_SECONDS = Histogram("leadforge_report_render_seconds", "Time to generate one report", ["format"], buckets=STAGE_BUCKETS)
+REPORT_ROWS = Counter("leadforge_report_rows", "Leads written to reports", ["format"])
+REPORT_BYTES = Counter("leadforge_report_bytes", "Size of the reports generated", ["format"])
+
+# Pipeline runs (main.py, the scheduler)
+PIPELINE_SECONDS = Histogram("leadforge_pipeline_run_seconds", "Duration of a niche's pipeline run", ["niche"], buckets=PIPELINE_BUCKETS)
+PIPELINE_RUNS = Counter("leadforge_pipeline_runs", "Pipeline runs by status (success, failed, interrupted)", ["niche", "status"])
+PIPELINE_LAST_SUCCESS = Gauge("leadforge_pipeline_last_success_timestamp_seconds", "When the niche's last successful run ended", ["niche"])
+PIPELINE_LAST_LEADS = Gauge("leadforge_pipeline_last_leads", "Leads reported by the niche's last successful run", ["niche"])
+
+# API
+HTTP_SECONDS = Histogram("leadforge_http_request_seconds", "HTTP request latency, until the response is sent", ["method", "route"])
+HTTP_REQUESTS = Counter("leadforge_http_requests", "HTTP requests by status code", ["method", "route", "status"])
+
+def pipeline_finished(niche, status, seconds, leads=None):
+    PIPELINE_SECONDS.labels(niche).observe(seconds)
+    PIPELINE_RUNS.labels(niche, status).inc()
+    if status == "success":
+        PIPELINE_LAST_SUCCESS.labels(niche).set_to_current_time()
+        PIPELINE_LAST_LEADS.labels(niche).set(leads or 0)
+
+def render():
+    """The metrics in the Prometheus text format, and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def export_batch():
+    """Writes METRICS_TEXTFILE and pushes to METRICS_PUSHGATEWAY, when set. Failures are logged, never raised."""
+    if METRICS_TEXTFILE:
+        try:
+            write_to_textfile(METRICS_TEXTFILE, REGISTRY)
+        except OSError as e:
+            logger.error(f"Could not write metrics to {METRICS_TEXTFILE}: {e}")
+    if METRICS_PUSHGATEWAY:
+        try:
+            push_to_gateway(METRICS_PUSHGATEWAY, job=METRICS_JOB, registry=REGISTRY)
+        except Exception as e:
+            logger.error(f"Could not push metrics to {METRICS_PUSHGATEWAY}: {e}")
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request until its response is sent
+    (streamed ones included). Requests are labelled with the route template
+    (/jobs/{job_id}), never the raw path, so ids don't create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route, str(status)).inc()
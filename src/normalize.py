@@ -0,0 +1,77 @@
+import re
+
+# Leads are South African unless the number says otherwise
+DEFAULT_COUNTRY_CODE = "27"
+
+def normalize_email(email):
+    """Lowercased, trimmed email used for deduplication. None if empty."""
+    if not email:
+        return None
+    email = str(email).strip().lower()
+    return email or None
+
+def normalize_phone(phone, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Normalizes a phone number to E.164 (e.g. '+27821234567').
+    Returns None if the number has too few or too many digits.
+    """
+    if not phone:
+        return None
+    raw = str(phone).strip()
+    digits = re.sub(r'\D', '', raw)
+
+    if raw.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]
+
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+def dedup_key(email_key, phone_key):
+    """The identity a lead is deduplicated on: its email, else its phone."""
+    return email_key or phone_key
+
+def normalize_identifier(identifier):
+    """Blacklist identifiers are normalized emails or E.164 phone numbers."""
+    if identifier is None:
+        return None
+    identifier = str(identifier).strip()
+    if "@" in identifier:
+        return normalize_email(identifier)
+    return normalize_phone(identifier)
+
+# Legal-form words that don't distinguish one business from another
+COMPANY_SUFFIXES = {"pty", "ltd", "limited", "inc", "cc", "llc", "co", "company", "npc", "soc"}
+
+def normalize_text(value):
+    """Lowercase with punctuation and repeated whitespace collapsed. '' if empty."""
+    if value is None:
+        return ""
+    return " ".join(re.sub(r'[^0-9a-z]+', ' ', str(value).lower()).split())
+
+def company_tokens(company):
+    """Normalized words of a company name, without legal suffixes like '(Pty) Ltd'."""
+    return [token for token in normalize_text(company).split() if token not in COMPANY_SUFFIXES]
+
+def normalize_company(company):
+    return " ".join(company_tokens(company))
+
+def normalize_phone_series(phones, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Vectorized normalize_phone() for a pandas Series.
+    Returns a string Series of E.164 numbers, <NA> where the number is invalid.
+    """
+    raw = phones.astype("string").str.strip()
+    digits = raw.str.replace(r'\D', '', regex=True)
+    international = raw.str.startswith('+').fillna(False)
+    exit_code = ~international & digits.str.startswith('00').fillna(False)
+    national = ~international & ~exit_code & digits.str.startswith('0').fillna(False)
+
+    digits = digits.mask(exit_code, digits.str[2:])
+    digits = digits.mask(national, country_code + digits.str[1:])
+    valid = digits.str.len().between(8, 15).fillna(False)
+    return ('+' + digits).where(valid)
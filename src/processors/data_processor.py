@@ -1,73 +1,132 @@
 import pandas as pd
-import re
+import asyncio
+import time
+from enrichment.cache import CachedEnricher
 from enrichment.google_places import GooglePlacesEnricher
+from normalize import normalize_phone_series
+import metrics
 
 class DataProcessor:
     def __init__(self, raw_data):
         self.raw_data = raw_data
         self.df = pd.DataFrame(raw_data)
-        self.enricher = GooglePlacesEnricher()
+        self.enricher = CachedEnricher(GooglePlacesEnricher())
 
-    def clean_data(self):
+    def clean_data(self, enrich=True):
         """
         Basic cleaning: remove duplicates, handle missing values.
         """
+        if self._prepare().empty or not enrich:
+            return self.df
+        asyncio.run(self._enrich())
+        return self.df
+
+    async def aclean_data(self, enrich=True):
+        """
+        Same as clean_data(), for callers that are already inside an event loop.
+        """
+        if self._prepare().empty or not enrich:
+            return self.df
+        await self._enrich()
+        return self.df
+
+    def _observe(self, stage, started):
+        """Records a stage's duration and the rows it left in the stage metrics."""
+        metrics.PROCESSOR_SECONDS.labels(stage).observe(time.perf_counter() - started)
+        metrics.PROCESSOR_ROWS.labels(stage).inc(len(self.df))
+
+    def _prepare(self):
         if self.df.empty:
             return self.df
-            
-        # Remove duplicates based on email
-        self.df.drop_duplicates(subset=['email'], keep='first', inplace=True)
-        
-        # Fill missing values
-        self.df.fillna("N/A", inplace=True)
-
-        # Basic validation (e.g., ensure phone number has digits)
-        self.df = self.df[self.df['phone'].apply(self._is_valid_phone)]
-        
-        # Enrichment Step
-        # Apply enrichment to each row (convert to dict, enrich, update df)
-        # Note: In a real scenario with API calls, we'd batch this or run async
-        enriched_data = [self.enricher.enrich(row.to_dict()) for _, row in self.df.iterrows()]
-        self.df = pd.DataFrame(enriched_data)
-        
+        started = time.perf_counter()
+
+        # Remove duplicates based on email (leads without one are all kept)
+        if 'email' in self.df.columns:
+            self.df = self.df[self.df['email'].isna() | ~self.df['email'].duplicated()]
+
+        # Normalize and validate phones once; scoring reuses these columns
+        self._add_phone_columns()
+        self.df = self.df[self.df['phone_valid']]
+
+        # Fill missing text values; numeric columns keep their dtype
+        text_columns = self.df.select_dtypes(include=["object", "string"]).columns
+        self.df = self.df.fillna({column: "N/A" for column in text_columns})
+        self._observe("prepare", started)
         return self.df
 
-    def _is_valid_phone(self, phone):
+    def _add_phone_columns(self):
+        if 'phone' not in self.df.columns:
+            self.df['phone_e164'] = pd.Series(pd.NA, index=self.df.index, dtype="string")
+            self.df['phone_valid'] = False
+            return
+        digit_count = self.df['phone'].astype("string").str.count(r'\d').fillna(0)
+        self.df['phone_e164'] = normalize_phone_series(self.df['phone'])
+        self.df['phone_valid'] = digit_count >= 10
+
+    async def _enrich(self):
         """
-        Simple check if phone contains at least 10 digits.
+        Enriches the frame and joins the fields the enricher adds as new columns.
+        When the enricher's result only depends on a few fields (identity_fields),
+        each distinct combination of them is enriched once.
         """
-        digits = re.sub(r'\D', '', str(phone))
-        return len(digits) >= 10
+        started = time.perf_counter()
+        identity = list(self.enricher.identity_fields or [])
+        if identity and all(field in self.df.columns for field in identity):
+            records = self.df[identity].drop_duplicates().to_dict('records')
+            enriched = pd.DataFrame(await self.enricher.enrich_many(records))
+            added = [column for column in enriched.columns if column not in self.df.columns]
+            if added:
+                self.df = self.df.join(enriched.set_index(identity)[added], on=identity)
+        else:
+            records = self.df.to_dict('records')
+            enriched = pd.DataFrame(await self.enricher.enrich_many(records), index=self.df.index)
+            added = [column for column in enriched.columns if column not in self.df.columns]
+            self.df = self.df.join(enriched[added])
+        self._observe("enrich", started)
 
     def score_leads(self):
         """
         Adds a score column to the dataframe based on multiple factors.
+        Every rule is a column expression, so this is a handful of vectorized passes.
         """
         if self.df.empty:
             return self.df
-            
-        # Base score
-        self.df['score'] = 0
-        
+        started = time.perf_counter()
+
+        if 'phone' in self.df.columns and 'phone_valid' not in self.df.columns:
+            self._add_phone_columns()
+        df = self.df
+        score = pd.Series(0, index=df.index, dtype="int64")
+
         # Factor 1: Contact Info Completeness (Max 50)
-        if 'phone' in self.df.columns:
-             self.df.loc[self.df['phone'].apply(self._is_valid_phone), 'score'] += 30
-        if 'email' in self.df.columns:
-            self.df.loc[self.df['email'].notna(), 'score'] += 20
-            
+        if 'phone' in df.columns:
+            score += df['phone_valid'].astype("int64") * 30
+        if 'email' in df.columns:
+            score += df['email'].notna().astype("int64") * 20
+
         # Factor 2: Activity/Quality Indicators (Max 50)
-        if 'listings_count' in self.df.columns:
-             # Real Estate specific
-             self.df.loc[self.df['listings_count'] > 20, 'score'] += 25
-             self.df.loc[self.df['listings_count'] > 10, 'score'] += 10
-             
-        if 'hourly_rate' in self.df.columns:
+        if 'listings_count' in df.columns:
+            # Real Estate specific
+            listings = self._numeric(df['listings_count'])
+            score += (listings > 20).astype("int64") * 25
+            score += (listings > 10).astype("int64") * 10
+
+        if 'hourly_rate' in df.columns:
             # Tutor specific - higher rate might imply more experience/serious pro
-            self.df.loc[self.df['hourly_rate'] > 250, 'score'] += 25
-            
-        if 'rating' in self.df.columns:
+            score += (self._numeric(df['hourly_rate']) > 250).astype("int64") * 25
+
+        if 'rating' in df.columns:
             # Service Provider specific
-            self.df.loc[self.df['rating'] >= 4.5, 'score'] += 25
-            self.df.loc[self.df['reviews_count'] > 20, 'score'] += 25
+            score += (self._numeric(df['rating']) >= 4.5).astype("int64") * 25
+            reviews_column = 'review_count' if 'review_count' in df.columns else 'reviews_count'
+            if reviews_column in df.columns:
+                score += (self._numeric(df[reviews_column]) > 20).astype("int64") * 25
 
+        df['score'] = score
+        self._observe("score", started)
         return self.df
+
+    @staticmethod
+    def _numeric(column):
+        """Numeric view of a column; 'N/A' and other text become NaN (never match a rule)."""
+        return pd.to_numeric(column, errors='coerce')
@@ -0,0 +1,320 @@
+import argparse
+import re
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+from database import SessionLocal, DedupRun, Lead, LeadBlockKey, dialect_insert, init_db
+from normalize import company_tokens, normalize_text
+from logger import logger
+
+# Mailbox providers shared by unrelated people: their domain says nothing
+FREE_MAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "yahoo.co.za", "hotmail.com", "outlook.com",
+    "live.com", "icloud.com", "mweb.co.za", "webmail.co.za", "telkomsa.net", "vodamail.co.za",
+}
+# Shared mailboxes that say nothing about the person behind them
+ROLE_MAILBOXES = {
+    "info", "contact", "admin", "office", "sales", "enquiries", "enquiry", "hello",
+    "reception", "bookings", "support", "mail", "accounts", "help",
+}
+# Trailing phone digits compared across formats (+27 82..., 082..., 0027 82...)
+PHONE_SUFFIX_DIGITS = 9
+# Each lead is compared with this many neighbours within a block, sorted by
+# name, so large blocks (a big agency, a common word) stay linear
+WINDOW = 10
+# Company tokens shorter than this are too generic to block on
+MIN_TOKEN_LENGTH = 3
+# Pair score from which two leads are the same contact
+MATCH_THRESHOLD = 0.8
+# Keys or ids per IN (...) query
+QUERY_CHUNK = 500
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # The oldest lead is the cluster's canonical one
+            self.parent[max(first, second)] = min(first, second)
+
+def _grams(text):
+    """What _similarity compares a string by: its digits and its character trigrams."""
+    if not text:
+        return None
+    padded = f"  {text} "
+    return re.sub(r"\D", "", text), {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+def _similarity(first, second):
+    """Trigram similarity of two _grams; numbered variants ('agent1', 'agent2') never match."""
+    if not first or not second or first[0] != second[0]:
+        return 0.0
+    return _jaccard(first[1], second[1])
+
+def _overlap(first, second):
+    """Share of the smaller set found in the other: 'seeff' vs 'seeff cape town' is 1.0."""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / min(len(first), len(second))
+
+class LeadProfile:
+    """
+    The normalized fields of a lead that blocking and scoring look at. Trigrams
+    are computed once here, as each lead is scored against up to 2 * WINDOW
+    neighbours per block.
+    """
+    __slots__ = ("id", "email_key", "phone_key", "phone_suffix", "domain", "mailbox", "mailbox_grams",
+                 "company", "company_tokens", "company_grams", "name", "name_tokens", "name_grams",
+                 "location", "duplicate_of")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.email_key = row.email_key
+        self.phone_key = row.phone_key
+        self.duplicate_of = row.duplicate_of
+        digits = re.sub(r"\D", "", row.phone_key or "")
+        self.phone_suffix = digits[-PHONE_SUFFIX_DIGITS:] if len(digits) >= PHONE_SUFFIX_DIGITS else None
+        mailbox, _, domain = (row.email_key or "").partition("@")
+        self.mailbox = normalize_text(mailbox) if mailbox not in ROLE_MAILBOXES else ""
+        self.mailbox_grams = _grams(self.mailbox)
+        self.domain = domain if domain and domain not in FREE_MAIL_DOMAINS else None
+        self.company_tokens = set(company_tokens(row.company))
+        self.company = " ".join(sorted(self.company_tokens))
+        self.company_grams = _grams(self.company)
+        self.name = normalize_text(f"{row.first_name or ''} {row.last_name or ''}")
+        self.name_tokens = set(self.name.split())
+        self.name_grams = _grams(self.name)
+        self.location = normalize_text(row.location)
+
+    def blocking_keys(self):
+        if self.phone_suffix:
+            yield "phone:" + self.phone_suffix
+        if self.domain:
+            yield "domain:" + self.domain
+        for token in self.company_tokens:
+            if len(token) >= MIN_TOKEN_LENGTH:
+                yield "company:" + token
+
+    def sort_key(self):
+        return (self.name or self.mailbox, self.company, self.id)
+
+def score_pair(first: LeadProfile, second: LeadProfile):
+    """
+    How likely two leads are the same contact, from 0 to 1. A shared email
+    decides it, and so does a shared phone unless their emails differ (an
+    agency's switchboard number is shared by its agents); otherwise
+    company, person and place are weighed.
+    """
+    if first.email_key and first.email_key == second.email_key:
+        return 1.0
+    emails_differ = first.email_key and second.email_key
+    if first.phone_suffix and first.phone_suffix == second.phone_suffix and not emails_differ:
+        return 1.0
+
+    company = 0.0
+    if first.company_grams and second.company_grams and first.company_grams[0] == second.company_grams[0]:
+        # Branch numbers ('Plumber Pros 2', 'Plumber Pros 4') tell companies apart
+        company = max(_overlap(first.company_tokens, second.company_tokens),
+                      _similarity(first.company_grams, second.company_grams))
+    if first.domain and first.domain == second.domain:
+        company = max(company, 0.9)
+
+    # Different mailbox formats (john.smith@, jsmith@) still share most of their trigrams with the name
+    person = max(
+        _jaccard(first.name_tokens, second.name_tokens),
+        _similarity(first.mailbox_grams, second.mailbox_grams),
+        _similarity(first.name_grams, second.mailbox_grams),
+        _similarity(second.name_grams, first.mailbox_grams),
+    )
+
+    place = 1.0 if first.location and first.location == second.location else 0.0
+    return 0.5 * company + 0.4 * person + 0.1 * place
+
+class DedupEngine:
+    """
+    Finds leads that are the same contact under different emails, phone
+    formats or company spellings, without comparing all pairs:
+
+    1. Blocking: leads sharing a phone suffix, a (non free-mail) email
+       domain or a company word land in the same block.
+    2. Sorted neighbourhood: within a block, sorted by name, each lead is
+       compared with its WINDOW nearest neighbours only.
+    3. Pairs scoring MATCH_THRESHOLD or more are clustered (union-find) and
+       every lead but the oldest gets duplicate_of set to the oldest's id.
+
+    Runs are incremental: only leads added since the last run (see
+    dedup_runs) and the stored leads sharing a block with them are loaded,
+    found through the blocking keys each run records (lead_block_keys), and
+    only pairs involving a new lead are scored.
+    """
+
+    def __init__(self, db: Session, window=WINDOW, threshold=MATCH_THRESHOLD):
+        self.db = db
+        self.window = window
+        self.threshold = threshold
+
+    def last_watermark(self, niche=None):
+        scope = DedupRun.niche == niche if niche else DedupRun.niche.is_(None)
+        return self.db.query(func.max(DedupRun.max_lead_id)).filter(scope).scalar() or 0
+
+    def _query(self, niche):
+        query = self.db.query(
+            Lead.id, Lead.email_key, Lead.phone_key, Lead.first_name, Lead.last_name,
+            Lead.company, Lead.location, Lead.duplicate_of,
+        )
+        if niche:
+            query = query.filter(Lead.niche == niche)
+        return query
+
+    def _load(self, niche, since_id=0):
+        """
+        The profiles to compare: the leads newer than since_id (all of them
+        when it is 0), and the older ones sharing a blocking key with them.
+        """
+        profiles = [LeadProfile(row) for row in self._query(niche).filter(Lead.id > since_id).yield_per(10000)]
+        if not since_id:
+            return profiles
+
+        keys = sorted({key for profile in profiles for key in profile.blocking_keys()})
+        earlier_ids = set()
+        for start in range(0, len(keys), QUERY_CHUNK):
+            earlier_ids.update(lead_id for (lead_id,) in self.db.query(LeadBlockKey.lead_id).filter(
+                LeadBlockKey.block_key.in_(keys[start:start + QUERY_CHUNK]), LeadBlockKey.lead_id <= since_id
+            ))
+        earlier_ids = sorted(earlier_ids)
+        earlier = []
+        for start in range(0, len(earlier_ids), QUERY_CHUNK):
+            earlier += [LeadProfile(row) for row in self._query(niche).filter(Lead.id.in_(earlier_ids[start:start + QUERY_CHUNK]))]
+        return earlier + profiles
+
+    def _index(self, profiles):
+        """Records the profiles' blocking keys in lead_block_keys (existing ones are kept)."""
+        rows = [{'block_key': key, 'lead_id': profile.id} for profile in profiles for key in set(profile.blocking_keys())]
+        insert = dialect_insert(self.db.get_bind())
+        for start in range(0, len(rows), QUERY_CHUNK):
+            self.db.execute(insert(LeadBlockKey).values(rows[start:start + QUERY_CHUNK]).on_conflict_do_nothing())
+
+    def _index_all(self):
+        """Indexes every stored lead: databases deduplicated before lead_block_keys existed."""
+        logger.info("Dedup: indexing the blocking keys of stored leads")
+        batch = []
+        for row in self._query(None).yield_per(10000):
+            batch.append(LeadProfile(row))
+            if len(batch) >= 10000:
+                self._index(batch)
+                batch = []
+        self._index(batch)
+
+    def candidate_pairs(self, profiles, since_id=0):
+        """Yields each pair of (blocked, nearby) profiles once, if at least one is newer than since_id."""
+        blocks = defaultdict(list)
+        for profile in profiles:
+            for key in profile.blocking_keys():
+                blocks[key].append(profile)
+
+        seen = set()
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            members.sort(key=LeadProfile.sort_key)
+            for i, first in enumerate(members):
+                for second in members[i + 1:i + 1 + self.window]:
+                    if first.id <= since_id and second.id <= since_id:
+                        continue
+                    pair = (first.id, second.id) if first.id < second.id else (second.id, first.id)
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield first, second
+
+    def run(self, niche=None, full=False):
+        """Finds and records duplicates among leads new since the last run (or all, with full=True)."""
+        run = DedupRun(niche=niche, started_at=datetime.utcnow())
+        since_id = 0 if full else self.last_watermark(niche)
+        if since_id and self.db.query(LeadBlockKey.lead_id).first() is None:
+            self._index_all()
+        profiles = self._load(niche, since_id)
+        new_profiles = [profile for profile in profiles if profile.id > since_id]
+        run.leads_scanned = len(profiles)
+        run.new_leads = len(new_profiles)
+        run.max_lead_id = max((profile.id for profile in profiles), default=since_id)
+
+        clusters = UnionFind()
+        if not full:
+            # Keep the clusters earlier runs found
+            for profile in profiles:
+                if profile.duplicate_of is not None:
+                    clusters.union(profile.id, profile.duplicate_of)
+
+        pairs = matches = 0
+        if run.new_leads:
+            for first, second in self.candidate_pairs(profiles, since_id):
+                pairs += 1
+                if score_pair(first, second) >= self.threshold:
+                    matches += 1
+                    clusters.union(first.id, second.id)
+
+        # Earlier clusters merged into an older one: their leads that weren't
+        # loaded (only the canonical lead's id is known) are moved over too
+        moved = []
+        if not full:
+            for root in {profile.duplicate_of or profile.id for profile in profiles}:
+                canonical = clusters.find(root)
+                if canonical != root:
+                    moved.append({'old_id': root, 'new_id': canonical})
+        if moved:
+            leads = Lead.__table__
+            self.db.connection().execute(
+                update(leads).where((leads.c.duplicate_of == bindparam('old_id')) | (leads.c.id == bindparam('old_id')))
+                .values(duplicate_of=bindparam('new_id')),
+                moved,
+            )
+
+        changes = []
+        for profile in profiles:
+            canonical = clusters.find(profile.id)
+            duplicate_of = canonical if canonical != profile.id else None
+            if duplicate_of != profile.duplicate_of:
+                changes.append({'lead_id': profile.id, 'duplicate_of': duplicate_of})
+        if changes:
+            self.db.connection().execute(
+                update(Lead.__table__).where(Lead.__table__.c.id == bindparam('lead_id')),
+                changes,
+            )
+        self._index(profiles if full else new_profiles)
+
+        run.candidate_pairs = pairs
+        run.duplicates_found = sum(1 for change in changes if change['duplicate_of'] is not None)
+        run.finished_at = datetime.utcnow()
+        self.db.add(run)
+        self.db.commit()
+        logger.info(
+            f"Dedup{' ' + niche if niche else ''}: {run.new_leads} new, {run.leads_scanned} leads loaded, "
+            f"{pairs} candidate pairs, {matches} matches, {run.duplicates_found} leads marked as duplicates"
+        )
+        return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Find fuzzy duplicate leads")
+    parser.add_argument("--niche", help="Only compare leads of this niche")
+    parser.add_argument("--full", action="store_true", help="Compare all leads again, not only new ones")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        DedupEngine(db).run(niche=args.niche, full=args.full)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import importlib
+import threading
+
+class LazyRegistry:
+    """
+    Named implementations registered as "module:attribute" strings and
+    imported on first lookup, so that importing the registry (the API, the
+    CLI) doesn't import every collector or report backend and the libraries
+    behind them.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._targets = {}
+        self._meta = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, target, **meta):
+        self._targets[name] = target
+        self._meta[name] = meta
+        self._resolved.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._targets
+
+    def names(self):
+        return list(self._targets)
+
+    def meta(self, name):
+        if name not in self._targets:
+            raise KeyError(f"Unknown {self.kind} {name!r}. Available: {self.names()}")
+        return self._meta[name]
+
+    def resolve(self, name):
+        """Imports (once) and returns what name is registered as."""
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        target = self._targets.get(name)
+        if target is None:
+            raise KeyError(f"Unknown {self.kind} {name!r}. Available: {self.names()}")
+        with self._lock:
+            if name not in self._resolved:
+                module_name, _, attribute = target.partition(":")
+                value = importlib.import_module(module_name)
+                for part in filter(None, attribute.split(".")):
+                    value = getattr(value, part)
+                self._resolved[name] = value
+            return self._resolved[name]
+
+# Niches by key, with the collector that scrapes them
+NICHES = LazyRegistry("niche")
+NICHES.register("real_estate", "collectors.real_estate_collector:RealEstateCollector", label="Real Estate")
+NICHES.register("tutors", "collectors.tutor_collector:TutorCollector", label="Tutors")
+NICHES.register("service_providers", "collectors.service_provider_collector:ServiceProviderCollector", label="Service Providers")
+
+def niche_key(niche):
+    """The registry key of a niche given by key or label ('Real Estate' -> 'real_estate')."""
+    return niche.strip().lower().replace(" ", "_")
+
+def niche_label(key):
+    return NICHES.meta(key)["label"]
+
+# Report formats: write(records, output_path, **options) for each file type
+REPORT_FORMATS = LazyRegistry("report format")
+REPORT_FORMATS.register("pdf", "generators.pdf_renderer:write", extension=".pdf")
+REPORT_FORMATS.register("xlsx", "generators.excel_writer:write", extension=".xlsx")
@@ -1,33 +1,326 @@
-import schedule
+import argparse
+import asyncio
+import os
+import random
+import signal
 import time
-import subprocess
-import sys
-from datetime import datetime
-
-def job():
-    print(f"[{datetime.now()}] Starting scheduled lead generation job...")
-    # Run the main script as a subprocess
-    try:
-        subprocess.run([sys.executable, "src/main.py"], check=True)
-        print(f"[{datetime.now()}] Job completed successfully.")
-    except subprocess.CalledProcessError as e:
-        print(f"[{datetime.now()}] Job failed with error: {e}")
-
-def run_scheduler():
-    print("Scheduler started. Running job every day at 06:00 (and once now for testing).")
-    
-    # Schedule the job
-    schedule.every().day.at("06:00").do(job)
-    
-    # Also run immediately for demonstration purposes if needed, 
-    # but typically a scheduler waits. 
-    # For this verification, we might want to trigger it manually or just let it wait.
-    # Let's run it once immediately to prove it works.
-    job()
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+from datetime import datetime, timedelta
+from database import init_db, SessionLocal, Source
+from logger import logger
+import metrics
+from main import NICHE_CONCURRENCY, run_niche, start_pdf_pool
+from registry import NICHES, niche_label
+
+# Each niche runs on SCHEDULE_<NICHE> (e.g. SCHEDULE_REAL_ESTATE), else on
+# SCHEDULE_DEFAULT: a cron expression ("0 6 * * *", local time), an alias
+# (@hourly, @daily, @weekly) or an interval ("every 30m", "every 6h")
+SCHEDULE_DEFAULT = os.getenv("SCHEDULE_DEFAULT", "0 6 * * *")
+# Runs start up to this many seconds after their scheduled time
+SCHEDULE_JITTER_SECONDS = int(os.getenv("SCHEDULE_JITTER_SECONDS", "300"))
+# When a niche is due while its previous run is still going: "skip" the new
+# run, or "queue" it to start as soon as the previous one ends
+SCHEDULE_OVERLAP = os.getenv("SCHEDULE_OVERLAP", "skip")
+# On shutdown, how long running pipelines get to finish before they are cancelled
+SCHEDULER_SHUTDOWN_TIMEOUT = int(os.getenv("SCHEDULER_SHUTDOWN_TIMEOUT", "300"))
+
+# Source.status values
+RUNNING = "running"
+SUCCESS = "success"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+}
+
+class CronSchedule:
+    """
+    A five-field cron expression: minute, hour, day of month, month, day of
+    week (0 or 7 = Sunday). Fields take *, numbers, ranges (1-5), steps
+    (*/15, 0-30/10) and lists of those. As in cron, when both day fields are
+    restricted a day matching either one fires.
+    """
+
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def __str__(self):
+        return self.expression
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (int(value) for value in span.split("-", 1))
+            else:
+                start = int(span)
+                end = high if step > 1 else start
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"Invalid cron field {field!r} (allowed {low}-{high})")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        in_month = moment.day in self.days
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return in_week
+        if self.any_weekday:
+            return in_month
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """The first matching minute after moment."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skips whole months, days and hours that can't match, so this takes
+        # a few hundred steps at most; the limit catches dates like Feb 30
+        limit = candidate + timedelta(days=5 * 366)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+class IntervalSchedule:
+    """Fires every `seconds`, counted from the previous scheduled time."""
+
+    UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    @classmethod
+    def parse(cls, text):
+        """'every 30m' style: a number and a unit (s, m, h or d)."""
+        value = text.strip().lower().removeprefix("every").strip()
+        if not value or value[-1] not in cls.UNITS:
+            raise ValueError(f"Invalid interval {text!r} (expected e.g. 'every 30m')")
+        return cls(float(value[:-1]) * cls.UNITS[value[-1]])
+
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+def parse_schedule(text):
+    text = text.strip()
+    if text.lower().startswith("every"):
+        return IntervalSchedule.parse(text)
+    schedule = CronSchedule(CRON_ALIASES.get(text, text))
+    schedule.next_after(datetime.now())  # rejects expressions that never fire
+    return schedule
+
+def schedule_for(niche_name):
+    key = "SCHEDULE_" + niche_name.upper().replace(" ", "_")
+    return parse_schedule(os.getenv(key, SCHEDULE_DEFAULT))
+
+class ScheduledNiche:
+    def __init__(self, collector_cls, niche_name, schedule):
+        self.collector_cls = collector_cls
+        self.niche_name = niche_name
+        self.schedule = schedule
+        self.task = None  # The pipeline run in progress
+        self.queued = False
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+class SchedulerService:
+    """
+    Long-lived scheduler: runs each niche's pipeline on its own schedule,
+    inside this process, so imports, the database pool and the PDF workers
+    are set up once rather than for every run.
+
+    Each run is recorded on the niche's row in the sources table (status,
+    last_scraped, last run timing, leads and error, next_run_at). SIGINT or
+    SIGTERM stops scheduling and gives running pipelines shutdown_timeout
+    seconds to finish; a second signal cancels them at once.
+    """
+
+    def __init__(self, niches=None, jitter=SCHEDULE_JITTER_SECONDS, overlap=SCHEDULE_OVERLAP,
+                 max_concurrency=NICHE_CONCURRENCY, shutdown_timeout=SCHEDULER_SHUTDOWN_TIMEOUT):
+        if overlap not in ("skip", "queue"):
+            raise ValueError(f"overlap must be 'skip' or 'queue', not {overlap!r}")
+        self.niches = niches if niches is not None else [
+            ScheduledNiche(NICHES.resolve(key), niche_label(key), schedule_for(niche_label(key))) for key in NICHES.names()
+        ]
+        self.jitter = jitter
+        self.overlap = overlap
+        self.max_concurrency = max(1, max_concurrency)
+        self.shutdown_timeout = shutdown_timeout
+        self.pdf_pool = None
+        self._stopping = None
+        self._semaphore = None
+
+    def stop(self):
+        """Stops scheduling new runs; the second call also cancels the running ones."""
+        if self._stopping.is_set():
+            logger.warning("Scheduler: cancelling running pipelines")
+            for niche in self.niches:
+                if niche.running:
+                    niche.task.cancel()
+            return
+        logger.info("Scheduler: shutting down, waiting for running pipelines...")
+        self._stopping.set()
+
+    async def run(self, run_now=False):
+        init_db()
+        # Forked before the pipelines start any threads
+        self.pdf_pool = start_pdf_pool()
+        self._stopping = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not on Windows, or not the main thread
+
+        for niche in self.niches:
+            logger.info(f"Scheduler: {niche.niche_name} runs {niche.schedule}")
+            await self._record(niche, schedule=str(niche.schedule))
+        loops = [asyncio.create_task(self._schedule_loop(niche, run_now)) for niche in self.niches]
+        try:
+            await self._stopping.wait()
+        finally:
+            for task in loops:
+                task.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+            await self._drain()
+            self.pdf_pool.shutdown(cancel_futures=True)
+            logger.info("Scheduler stopped")
+
+    async def _drain(self):
+        running = [niche.task for niche in self.niches if niche.running]
+        if not running:
+            return
+        _, pending = await asyncio.wait(running, timeout=self.shutdown_timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+    async def _schedule_loop(self, niche, run_now):
+        planned = datetime.now() if run_now else niche.schedule.next_after(datetime.now())
+        while True:
+            due = planned + timedelta(seconds=random.uniform(0, self.jitter) if self.jitter else 0)
+            delay = (due - datetime.now()).total_seconds()
+            await self._record(niche, next_run_at=datetime.utcnow() + timedelta(seconds=max(delay, 0)))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._trigger(niche)
+            planned = niche.schedule.next_after(planned)
+            if planned < datetime.now():
+                # Slots missed while the process was busy are skipped
+                planned = niche.schedule.next_after(datetime.now())
+
+    def _trigger(self, niche):
+        if niche.running:
+            if self.overlap == "queue":
+                if not niche.queued:
+                    logger.info(f"Scheduler: {niche.niche_name} is still running, next run queued")
+                niche.queued = True
+            else:
+                logger.warning(f"Scheduler: {niche.niche_name} is still running, skipping this run")
+            return
+        niche.task = asyncio.create_task(self._run(niche))
+
+    async def _run(self, niche):
+        while True:
+            niche.queued = False
+            await self._run_once(niche)
+            if not niche.queued or self._stopping.is_set():
+                niche.queued = False
+                return
+
+    async def _run_once(self, niche):
+        async with self._semaphore:
+            started = datetime.utcnow()
+            start = time.perf_counter()
+            await self._record(niche, status=RUNNING, last_started_at=started, last_error=None)
+
+            async def finished(**fields):
+                await self._record(
+                    niche, last_finished_at=datetime.utcnow(),
+                    last_duration_seconds=round(time.perf_counter() - start, 2), **fields,
+                )
+
+            try:
+                leads = await run_niche(niche.collector_cls, niche.niche_name, pdf_executor=self.pdf_pool)
+            except asyncio.CancelledError:
+                # Shielded: a second cancellation must not lose the record
+                await asyncio.shield(finished(status=INTERRUPTED))
+                logger.warning(f"Scheduler: {niche.niche_name} run interrupted")
+                raise
+            except Exception as e:
+                await finished(status=FAILED, last_error=str(e))
+                logger.error(f"Scheduler: {niche.niche_name} run failed: {e}")
+            else:
+                await finished(status=SUCCESS, last_scraped=datetime.utcnow(), last_leads=leads)
+                logger.info(f"Scheduler: {niche.niche_name} run finished with {leads} leads in {time.perf_counter() - start:.2f}s")
+            finally:
+                # The scheduler has no /metrics either: export after every run
+                await asyncio.to_thread(metrics.export_batch)
+
+    async def _record(self, niche, **fields):
+        """
+        Saves fields on the niche's sources row, creating it on first use. The
+        write runs in a worker thread: pipelines share this event loop, and a
+        busy SQLite database could otherwise stall them all.
+        """
+        await asyncio.to_thread(self._write_record, niche, fields)
+
+    def _write_record(self, niche, fields):
+        try:
+            with SessionLocal() as db:
+                source = db.query(Source).filter(Source.name == niche.niche_name).first()
+                if source is None:
+                    source = Source(name=niche.niche_name)
+                    db.add(source)
+                for field, value in fields.items():
+                    setattr(source, field, value)
+                db.commit()
+        except Exception as e:
+            # Bookkeeping must never take the scheduler down
+            logger.error(f"Scheduler: could not record {niche.niche_name} status: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="LeadForge scheduler")
+    parser.add_argument("--run-now", action="store_true", help="Run every niche once at startup, then on schedule")
+    parser.add_argument("--overlap", choices=("skip", "queue"), default=SCHEDULE_OVERLAP,
+                        help="What to do when a niche is due while it is still running")
+    args = parser.parse_args()
+
+    asyncio.run(SchedulerService(overlap=args.overlap).run(run_now=args.run_now))
 
 if __name__ == "__main__":
-    run_scheduler()
+    main()
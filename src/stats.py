@@ -0,0 +1,82 @@
+import argparse
+import hashlib
+from datetime import date, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import SessionLocal, Lead, LeadStat, LeadTotal, init_db, rebuild_lead_stats
+from blacklist import blacklist
+
+BUCKETS = ("day", "week", "month")
+
+def niche_totals(db: Session) -> dict:
+    """Lead count per niche, read from the lead_totals rollup (one row per niche)."""
+    return {niche: count for niche, count in db.query(LeadTotal.niche, LeadTotal.lead_count).order_by(LeadTotal.niche) if count}
+
+def data_version(db: Session) -> str:
+    """
+    A token that changes whenever the leads served by the API may have: a
+    lead added, refreshed (last_seen) or deleted, or the blacklist changed.
+    Built from indexed maxima and the counter tables, so it costs the same
+    at any number of leads. Clients cache lead pages until it changes.
+    """
+    # One max() per query: that's what SQLite answers from the index alone
+    newest_id = db.query(func.max(Lead.id)).scalar()
+    last_write = db.query(func.max(Lead.last_seen)).scalar()
+    total = db.query(func.sum(LeadTotal.lead_count)).scalar()
+    parts = (newest_id, last_write, total, *blacklist.version)
+    return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:16]
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def breakdown(db: Session, bucket="day", niche=None, since=None, until=None, by_source=False):
+    """
+    Lead counts per time bucket (day, week starting Monday, or month) and niche,
+    optionally also per source, from lead_stats. Oldest bucket first.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'")
+
+    query = db.query(LeadStat.niche, LeadStat.source, LeadStat.day, LeadStat.lead_count)
+    if niche:
+        query = query.filter(LeadStat.niche == niche)
+    if since:
+        query = query.filter(LeadStat.day >= since)
+    if until:
+        query = query.filter(LeadStat.day <= until)
+
+    counts = {}
+    for row_niche, source, day, count in query:
+        key = (bucket_start(day, bucket), row_niche, source if by_source else None)
+        counts[key] = counts.get(key, 0) + count
+
+    result = []
+    for (period, row_niche, source), count in sorted(counts.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or '')):
+        if not count:
+            continue
+        entry = {'period': period, 'niche': row_niche, 'count': count}
+        if by_source:
+            entry['source'] = source or None
+        result.append(entry)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Lead statistics maintenance")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the counters from the leads table")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        if args.rebuild:
+            total = rebuild_lead_stats(db)
+            db.commit()
+            print(f"Rebuilt lead stats for {total} leads.")
+        for niche, count in niche_totals(db).items():
+            print(f"{niche}: {count}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+import httpx
+import uvicorn
+from sqlalchemy import event
+from api import app
+from database import engine
+
+print("--- Testing Non-Blocking Logins and Async Database Access ---")
+LOGINS = 6
+
+with socket.socket() as probe:
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+threading.Thread(target=server.run, daemon=True).start()
+deadline = time.monotonic() + 10
+while not server.started and time.monotonic() < deadline:
+    time.sleep(0.05)
+
+sync_statements = []
+event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: sync_statements.append(statement))
+
+async def login(client):
+    response = await client.post("/token", data={"username": "admin@leadforge.com", "password": "admin"})
+    return response.json()["access_token"]
+
+async def probe_health(client, stop, latencies):
+    """How long /health takes while the logins run: the event loop's responsiveness."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.02)
+
+async def main():
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        await login(client)  # Warm up the connection and the admin's row
+
+        # A burst of logins: bcrypt runs on the hashing pool while other requests are served
+        stop, latencies = asyncio.Event(), []
+        prober = asyncio.create_task(probe_health(client, stop, latencies))
+        started = time.perf_counter()
+        tokens = await asyncio.gather(*(login(client) for _ in range(LOGINS)))
+        burst = time.perf_counter() - started
+        stop.set()
+        await prober
+
+        # Request handlers query through the async engine
+        sync_statements.clear()
+        headers = {"Authorization": f"Bearer {tokens[0]}"}
+        responses = [await client.get(path, headers=headers) for path in ("/stats", "/stats/breakdown", "/jobs")]
+        responses.append(await client.post("/api-keys", headers=headers))
+        return burst, latencies, tokens, [response.status_code for response in responses]
+
+burst, latencies, tokens, codes = asyncio.run(main())
+server.should_exit = True
+print(f"{LOGINS} concurrent logins in {burst:.2f}s; /health during them: {len(latencies)} requests, "
+      f"slowest {max(latencies) * 1000:.0f} ms")
+print(f"API requests: status {codes}, {len(sync_statements)} statements on the synchronous engine")
+login_ok = all(tokens) and len(latencies) >= 3 and max(latencies) < max(0.2, burst / LOGINS)
+async_ok = codes == [200, 200, 200, 201] and not sync_statements
+
+if login_ok and async_ok:
+    print("\nSUCCESS: Logins hash passwords off the event loop, and the API queries through the async engine.")
+else:
+    print(f"\nFAILURE: Async API checks failed: login {login_ok}, async {async_ok}")
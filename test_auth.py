@@ -0,0 +1,75 @@
+import os
+import tempfile
+from datetime import timedelta
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from api import app
+from auth import create_access_token, get_password_hash, hash_api_key
+from database import async_engine, SessionLocal, User
+
+print("--- Testing Cached Principals and API Keys ---")
+
+user_queries = []
+event.listen(async_engine.sync_engine, "before_cursor_execute",
+             lambda conn, cursor, statement, *args: user_queries.append(statement) if "FROM users" in statement else None)
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+with TestClient(app) as client:
+    with SessionLocal() as db:
+        db.add(User(email="free@test.com", hashed_password=get_password_hash("test123"), is_active=1,
+                    is_superuser=0, subscription_tier="Free"))
+        db.commit()
+    token = client.post("/token", data={"username": "free@test.com", "password": "test123"}).json()["access_token"]
+
+    # Repeat requests resolve the user once
+    user_queries.clear()
+    codes = {client.get("/stats", headers=bearer(token)).status_code for _ in range(20)}
+    print(f"20 requests with one token: status {codes}, {len(user_queries)} user lookups")
+    cache_ok = codes == {200} and len(user_queries) == 1
+
+    # API keys: shown once, stored hashed, replaced by the next one
+    issued = client.post("/api-keys", headers=bearer(token)).json()["api_key"]
+    with SessionLocal() as db:
+        stored = db.query(User.api_key).filter(User.email == "free@test.com").scalar()
+    with_key = client.get("/stats", headers={"X-API-Key": issued}).status_code
+    reissued = client.post("/api-keys", headers={"X-API-Key": issued}).json()["api_key"]
+    old_key = client.get("/stats", headers={"X-API-Key": issued}).status_code
+    new_key = client.get("/stats", headers={"X-API-Key": reissued}).status_code
+    print(f"API keys: issued {issued[:3]}..., stored hashed {stored == hash_api_key(issued)}, "
+          f"status with it {with_key}, after reissue: old {old_key}, new {new_key}")
+    key_ok = issued.startswith("lf_") and stored == hash_api_key(issued) and with_key == 200 \
+        and old_key == 401 and new_key == 200
+
+    # Account changes through the ORM take effect on the next request, cached or not
+    tier_before = client.post("/scrape/tutors", headers=bearer(token)).status_code
+    with SessionLocal() as db:
+        db.query(User).filter(User.email == "free@test.com").one().subscription_tier = "Pro"
+        db.commit()
+    upgraded = client.get("/leads", headers=bearer(token)).status_code, client.delete("/jobs/none", headers=bearer(token)).status_code
+    with SessionLocal() as db:
+        db.query(User).filter(User.email == "free@test.com").one().is_active = 0
+        db.commit()
+    deactivated = client.get("/stats", headers=bearer(token)).status_code, \
+        client.get("/stats", headers={"X-API-Key": reissued}).status_code
+    print(f"Account changes: scrape on Free {tier_before}, after upgrading (leads, cancel) {upgraded}, "
+          f"after deactivating (token, key) {deactivated}")
+    changes_ok = tier_before == 403 and upgraded == (200, 404) and deactivated == (403, 403)
+
+    # Missing, bad and expired credentials are rejected
+    expired = create_access_token({"sub": "admin@leadforge.com"}, expires_delta=timedelta(seconds=-1))
+    rejected = [client.get("/stats", headers=headers).status_code
+                for headers in ({}, bearer("not-a-token"), bearer(expired), {"X-API-Key": "lf_unknown"})]
+    print(f"No, bad or expired credentials: {rejected}")
+    rejected_ok = rejected == [401] * 4
+
+if cache_ok and key_ok and changes_ok and rejected_ok:
+    print("\nSUCCESS: Users are resolved once per credential, API keys work and rotate, and account changes apply at once.")
+else:
+    print(f"\nFAILURE: Auth checks failed: cache {cache_ok}, keys {key_ok}, changes {changes_ok}, rejected {rejected_ok}")
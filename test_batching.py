@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+import tempfile
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, Lead
+from logger import logger
+
+print("--- Testing Write-Behind Lead Batches ---")
+init_db()
+
+def stored(niche):
+    with SessionLocal() as db:
+        return db.query(Lead).filter(Lead.niche == niche).count()
+
+def lead(i):
+    return {"email": f"batch{i}@example.com", "phone": f"+2783{i:07d}", "company": f"Company {i}"}
+
+messages = []
+
+class ListHandler(logging.Handler):
+    def emit(self, record):
+        messages.append(record.getMessage())
+
+logger.addHandler(ListHandler())
+
+class SteadyCollector(BaseCollector):
+    requests_per_second = None
+    first_lead = 0
+
+    def __init__(self, db_session, niche_name="Batch Test", **kwargs):
+        super().__init__(niche_name, db_session, **kwargs)
+        self.stored_during = []
+
+    async def collect(self, num_samples=25):
+        for i in range(self.first_lead, self.first_lead + num_samples):
+            self.save_lead(lead(i))
+            await asyncio.sleep(0.05)  # Batches are written in a worker thread meanwhile
+            self.stored_during.append(stored(self.niche_name))
+
+# Size: a batch is written as soon as it is full, the rest when collection ends
+with SessionLocal() as db:
+    steady = SteadyCollector(db, batch_size=10, flush_interval_ms=60000)
+    asyncio.run(steady.collect(num_samples=25))
+print(f"Stored while collecting: {steady.stored_during[8:11]}...{steady.stored_during[-1]}, after: {stored('Batch Test')}")
+size_ok = steady.stored_during[8] == 0 and steady.stored_during[9] == 10 and steady.stored_during[-1] == 20 \
+    and stored("Batch Test") == 25
+
+class SlowCollector(BaseCollector):
+    """A source that goes quiet: nothing else is saved after the first leads."""
+
+    def __init__(self, db_session):
+        super().__init__("Slow Source", db_session, batch_size=1000, flush_interval_ms=100)
+
+    async def collect(self, num_samples=3):
+        for i in range(num_samples):
+            self.save_lead(lead(100 + i))
+        await asyncio.sleep(0.4)
+        self.stored_while_quiet = stored(self.niche_name)
+
+# Time: the deadline flushes the batch without waiting for another lead
+with SessionLocal() as db:
+    slow = SlowCollector(db)
+    asyncio.run(slow.collect())
+print(f"Slow source: {slow.stored_while_quiet} of 3 leads stored 400 ms after the last one")
+timer_ok = slow.stored_while_quiet == 3
+
+class ChildCollector(SteadyCollector):
+    """Extends its parent's collect() with super()."""
+    first_lead = 200
+
+    async def collect(self, num_samples=5):
+        await super().collect(num_samples=num_samples)
+        self.save_lead(lead(300))
+
+# A subclass calling super().collect() is flushed and reported once
+messages.clear()
+with SessionLocal() as db:
+    child = ChildCollector(db, niche_name="Child Test", batch_size=1000)
+    asyncio.run(child.collect())
+completed = [message for message in messages if "collection complete" in message]
+print(f"Child collector: {stored('Child Test')} leads stored, completion logged {len(completed)} time(s)")
+nested_ok = stored("Child Test") == 6 and len(completed) == 1
+
+if size_ok and timer_ok and nested_ok:
+    print("\nSUCCESS: Leads are written in batches, on size or on the flush deadline, and flushed once per collection.")
+else:
+    print(f"\nFAILURE: Batch checks failed: size {size_ok}, timer {timer_ok}, nested {nested_ok}")
@@ -0,0 +1,109 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from fastapi.testclient import TestClient
+from api import app
+from blacklist import add_to_blacklist, blacklist, BlacklistService
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, Blacklist, Lead
+
+print("--- Testing the Do Not Contact List ---")
+LEADS = 3000
+BLOCKED = {7, 1500, 2999}
+
+class ListCollector(BaseCollector):
+    def __init__(self, db_session):
+        super().__init__("Blacklist Test", db_session, batch_size=500)
+
+    async def collect(self, leads=()):
+        for lead in leads:
+            self.save_lead(lead)
+
+def lead(i):
+    return {"email": f"person{i}@example.com", "phone": f"+2782{i:07d}", "company": f"Company {i}"}
+
+sessions = []
+
+def counting_sessions():
+    """The blacklist's session factory, recording whether each session was opened on an event loop."""
+    try:
+        asyncio.get_running_loop()
+        sessions.append("event loop")
+    except RuntimeError:
+        sessions.append("worker thread")
+    return SessionLocal()
+
+with TestClient(app) as client:
+    token = client.post("/token", data={"username": "admin@leadforge.com", "password": "admin"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Ingest: blacklisted leads are never stored, whatever the format of their number
+    with SessionLocal() as db:
+        add_to_blacklist(db, "person7@EXAMPLE.com ")
+        add_to_blacklist(db, "082 000 1500")
+        db.commit()
+        blacklist.refresh(force=True)
+        collector = ListCollector(db)
+        asyncio.run(collector.collect([lead(i) for i in range(LEADS)]))
+        stored = db.query(Lead).count()
+    print(f"Ingest: {stored} of {LEADS} leads stored, {collector.blacklisted_count} blacklisted")
+    ingest_ok = stored == LEADS - 2 and collector.blacklisted_count == 2
+
+    # Export: a lead blacklisted after it was stored is left out of every /leads format
+    with SessionLocal() as db:
+        add_to_blacklist(db, "person2999@example.com")
+        db.commit()
+    blacklist.session_factory = counting_sessions
+    blacklist.refresh_seconds = 0  # Every refresh would query: any refresh while streaming shows up
+    csv_leads = list(csv.DictReader(io.StringIO(client.get("/leads", params={"format": "csv"}, headers=headers).text)))
+    csv_sessions, sessions[:] = list(sessions), []
+    ndjson = [json.loads(line) for line in client.get("/leads", params={"format": "ndjson"}, headers=headers).text.splitlines()]
+    page = client.get("/leads", params={"limit": 5000}, headers=headers).json()
+    emails = [{row["email"] for row in rows} for rows in (csv_leads, ndjson, page)]
+    print(f"Export: {[len(rows) for rows in (csv_leads, ndjson, page)]} leads (csv, ndjson, json); "
+          f"blacklist sessions during the CSV stream: {csv_sessions}")
+    export_ok = all(len(found) == LEADS - 3 and not found & {f"person{i}@example.com" for i in BLOCKED} for found in emails) \
+        and csv_sessions == ["worker thread"]
+
+    # Bloom filter: positives are confirmed with the table, off the event loop
+    blacklist.bloom_threshold = 1
+    with SessionLocal() as db:
+        add_to_blacklist(db, "someone.else@example.com")  # The next load switches to a Bloom filter
+        db.commit()
+    blacklist.refresh(force=True)
+    sessions.clear()
+    bloom_csv = list(csv.DictReader(io.StringIO(client.get("/leads", params={"format": "csv"}, headers=headers).text)))
+    print(f"Bloom filter: in memory {blacklist.in_memory}, {len(bloom_csv)} leads exported, "
+          f"sessions on the event loop: {sessions.count('event loop')}, in worker threads: {sessions.count('worker thread')}")
+    bloom_ok = not blacklist.in_memory and len(bloom_csv) == LEADS - 3 and "event loop" not in sessions \
+        and sessions.count("worker thread") >= 2
+
+# Rows stored as typed (not through add_to_blacklist) block on the Bloom filter path too, and are normalized on startup
+RAW = ["082 000 0100", "(082) 000-0100", " Person101@Example.com"]
+with SessionLocal() as db:
+    db.add_all([Blacklist(identifier=identifier) for identifier in RAW])
+    db.commit()
+blacklist.refresh(force=True)
+before = [blacklist.is_blocked(lead(i)) for i in (100, 101)]
+init_db()
+with SessionLocal() as db:
+    rows = sorted(identifier for (identifier,) in db.query(Blacklist.identifier).filter(Blacklist.identifier.in_(
+        ["+27820000100", "person101@example.com", *RAW])))
+fresh = BlacklistService(bloom_threshold=1)
+after = [fresh.is_blocked(lead(i)) for i in (100, 101, 102)]
+print(f"Unnormalized rows: blocked {before} before a restart, stored as {rows} after, blocked {after} (in memory {fresh.in_memory})")
+raw_ok = before == [True, True] and rows == ["+27820000100", "person101@example.com"] and after == [True, True, False] \
+    and not fresh.in_memory
+
+if ingest_ok and export_ok and bloom_ok and raw_ok:
+    print("\nSUCCESS: Blacklisted leads are never stored or exported, and streams check memory, not the table, on the event loop.")
+else:
+    print(f"\nFAILURE: Blacklist checks failed: ingest {ingest_ok}, export {export_ok}, bloom {bloom_ok}, raw {raw_ok}")
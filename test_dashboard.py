@@ -0,0 +1,98 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+
+# A database of the test's own, and an API on a free port, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+with socket.socket() as probe:
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+os.environ["API_URL"] = f"http://127.0.0.1:{port}"
+
+import requests
+import uvicorn
+from streamlit.testing.v1 import AppTest
+from api import app
+from blacklist import add_to_blacklist, blacklist
+from collectors.base_collector import BaseCollector
+from database import SessionLocal
+
+print("--- Testing the Dashboard's Lead Pages ---")
+LEADS = 100
+
+class ListCollector(BaseCollector):
+    def __init__(self, db_session):
+        super().__init__("Dashboard Test", db_session, batch_size=500)
+
+    async def collect(self, leads=()):
+        for lead in leads:
+            self.save_lead(lead)
+
+def save(leads):
+    with SessionLocal() as db:
+        collector = ListCollector(db)
+        for lead in leads:
+            collector.save_lead(lead)
+        collector.flush()
+
+server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+threading.Thread(target=server.run, daemon=True).start()
+deadline = time.monotonic() + 10
+while not server.started and time.monotonic() < deadline:
+    time.sleep(0.05)
+
+api = os.environ["API_URL"]
+token = requests.post(f"{api}/token", data={"username": "admin@leadforge.com", "password": "admin"}).json()["access_token"]
+headers = {"Authorization": f"Bearer {token}"}
+
+def version():
+    return requests.get(f"{api}/leads/version", headers=headers).json()["version"]
+
+# Data version: unchanged until leads are saved or the blacklist changes
+empty = version()
+save([{"email": f"page{i}@example.com", "phone": f"+2781{i:07d}", "company": f"Company {i}"} for i in range(LEADS)])
+saved = version()
+with SessionLocal() as db:
+    add_to_blacklist(db, "someone@example.com")
+    db.commit()
+blacklist.refresh(force=True)
+blacklisted = version()
+print(f"Data version: empty {empty}, after saving {saved}, after blacklisting {blacklisted}, again {version()}")
+version_ok = len({empty, saved, blacklisted}) == 3 and version() == blacklisted
+
+# Pages: 100 leads at 50 a page fill two pages exactly, so the second still offers Next
+at = AppTest.from_file("src/dashboard.py", default_timeout=30)
+at.session_state["token"] = token
+at.session_state["user_email"] = "admin@leadforge.com"
+at.run()
+at.sidebar.radio[0].set_value("Leads").run()
+at.selectbox[1].set_value(50).run()
+
+def button(label):
+    return next(b for b in at.button if b.label == label)
+
+button("Next →").click().run()
+second_rows = len(at.dataframe[0].value)
+button("Next →").click().run()
+past_end = {
+    "messages": [info.value for info in at.info],
+    "tables": len(at.dataframe),
+    "previous": not button("← Previous").disabled,
+    "next": not button("Next →").disabled,
+}
+button("← Previous").click().run()
+back_rows = len(at.dataframe[0].value) if at.dataframe else 0
+print(f"Pages: second has {second_rows} leads; past the end: {past_end}; back: {back_rows} leads")
+pages_ok = not at.exception and second_rows == 50 and past_end == {
+    "messages": ["End of results."], "tables": 0, "previous": True, "next": False,
+} and back_rows == 50
+
+server.should_exit = True
+
+if version_ok and pages_ok:
+    print("\nSUCCESS: The data version tracks lead and blacklist changes, and the page past the last lead leads back.")
+else:
+    print(f"\nFAILURE: Dashboard checks failed: version {version_ok}, pages {pages_ok}")
@@ -0,0 +1,116 @@
+import random
+import re
+import time
+import pandas as pd
+from enrichment.base_enricher import BaseEnricher
+from normalize import normalize_phone
+from processors.data_processor import DataProcessor
+
+print("--- Testing Vectorized Cleaning and Scoring ---")
+
+def reference(raw_data):
+    """Row-by-row cleaning and scoring: what the vectorized columns must match."""
+    seen, rows = set(), []
+    for lead in raw_data:
+        if lead.get("email") is not None:
+            if lead["email"] in seen:
+                continue
+            seen.add(lead["email"])
+        if len(re.sub(r"\D", "", str(lead.get("phone") or ""))) < 10:
+            continue
+        rows.append(lead)
+
+    def number(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("nan")
+
+    scores = []
+    for lead in rows:
+        # A valid phone, and an email (missing ones are filled with 'N/A' before scoring)
+        score = 30 + 20
+        listings = number(lead.get("listings_count"))
+        score += (25 if listings > 20 else 0) + (10 if listings > 10 else 0)
+        score += 25 if number(lead.get("hourly_rate")) > 250 else 0
+        score += 25 if number(lead.get("rating")) >= 4.5 else 0
+        score += 25 if number(lead.get("review_count")) > 20 else 0
+        scores.append(score)
+    return [normalize_phone(lead["phone"]) for lead in rows], scores
+
+def synthetic(count, seed=7):
+    rng = random.Random(seed)
+    phones = ["082 {:03d} {:04d}", "+27 82 {:03d} {:04d}", "0027 82 {:03d}{:04d}", "12{:01d}{:02d}"]
+    leads = []
+    for i in range(count):
+        leads.append({
+            # Repeated emails, and leads without one (never collapsed together)
+            "email": None if i % 7 == 0 else f"lead{rng.randint(0, count // 2)}@example.com",
+            "phone": rng.choice(phones).format(rng.randint(0, 999), rng.randint(0, 9999)),
+            "company": f"Company {rng.randint(0, 50)}",
+            "location": rng.choice(["Cape Town", "Durban", None]),
+            "listings_count": rng.choice([5, 15, 25, None]),
+            "hourly_rate": rng.choice([200, 300, "N/A"]),
+            "rating": rng.choice([4.0, 4.8, None]),
+            "review_count": rng.choice([10, 30, None]),
+        })
+    return leads
+
+# Same result as row-by-row processing
+small = synthetic(2000)
+processor = DataProcessor(small)
+processor.clean_data(enrich=False)
+frame = processor.score_leads()
+phones, scores = reference(small)
+print(f"Small frame: {len(frame)} of {len(small)} leads kept ({len(phones)} by reference), "
+      f"{sum(frame['email'] == 'N/A')} without an email, listings_count dtype {frame['listings_count'].dtype}")
+match_ok = frame["phone_e164"].tolist() == phones and frame["score"].tolist() == scores \
+    and frame["listings_count"].dtype == "float64"
+
+def apply_per_row(frame):
+    """The per-row DataFrame.apply() calls the processor used to make, for timing."""
+    frame = frame[frame["phone"].apply(lambda phone: len(re.sub(r"\D", "", str(phone))) >= 10)]
+    frame["phone_e164"] = frame["phone"].apply(normalize_phone)
+    return frame.apply(lambda row: (pd.to_numeric(row["rating"], errors="coerce") or 0) >= 4.5, axis=1)
+
+# Large frames: column expressions, not a Python call per row
+large = synthetic(200000)
+started = time.perf_counter()
+processor = DataProcessor(large)
+processor.clean_data(enrich=False)
+frame = processor.score_leads()
+vectorized = time.perf_counter() - started
+started = time.perf_counter()
+apply_per_row(pd.DataFrame(large))
+per_row = time.perf_counter() - started
+print(f"200k leads: {vectorized:.2f}s vectorized, {per_row:.2f}s with per-row apply()")
+speed_ok = frame["score"].tolist() == reference(large)[1] and vectorized * 2 < per_row
+
+class CountingEnricher(BaseEnricher):
+    """Depends on company and location only, like Google Places."""
+    identity_fields = ("company", "location")
+
+    def __init__(self):
+        self.calls = 0
+
+    def enrich(self, lead_data):
+        self.calls += 1
+        lead_data["rating"] = 4.5 if lead_data["company"].endswith("1") else 3.0
+        lead_data["enrichment_source"] = "Counting"
+        return lead_data
+
+# Enrichment: once per business, joined back onto every one of its leads
+processor = DataProcessor([{key: value for key, value in lead.items() if key not in ("rating", "review_count")}
+                           for lead in small])
+processor.enricher = CountingEnricher()
+frame = processor.clean_data()
+businesses = len(frame[["company", "location"]].drop_duplicates())
+print(f"Enrichment: {processor.enricher.calls} calls for {len(frame)} leads of {businesses} businesses")
+enrich_ok = processor.enricher.calls == businesses and len(frame) == len(phones) \
+    and (frame["enrichment_source"] == "Counting").all() \
+    and (frame["rating"] == frame["company"].str.endswith("1").map({True: 4.5, False: 3.0})).all()
+
+if match_ok and speed_ok and enrich_ok:
+    print("\nSUCCESS: Cleaning and scoring match row-by-row results, run as column expressions, and enrich each business once.")
+else:
+    print(f"\nFAILURE: DataProcessor checks failed: match {match_ok}, speed {speed_ok}, enrich {enrich_ok}")
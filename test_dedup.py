@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, DedupRun, Lead
+from processors.dedup import DedupEngine
+
+print("--- Testing Fuzzy Duplicate Detection ---")
+init_db()
+
+class ListCollector(BaseCollector):
+    def __init__(self, db_session, niche_name):
+        super().__init__(niche_name, db_session, batch_size=1000, flush_interval_ms=60000)
+
+    async def collect(self, leads=()):
+        for lead in leads:
+            self.save_lead(lead)
+
+def save(niche, leads):
+    with SessionLocal() as db:
+        collector = ListCollector(db, niche)
+        for lead in leads:
+            collector.save_lead(lead)
+        collector.flush()
+
+def lead_id(email):
+    with SessionLocal() as db:
+        return db.query(Lead.id).filter(Lead.email_key == email).scalar()
+
+def duplicate_of(email):
+    with SessionLocal() as db:
+        return db.query(Lead.duplicate_of).filter(Lead.email_key == email).scalar()
+
+def dedup(niche):
+    with SessionLocal() as db:
+        run = DedupEngine(db).run(niche=niche)
+        return run.leads_scanned, run.new_leads
+
+# Clusters from earlier runs: a new lead joining two of them moves the younger
+# cluster over, including the members this run didn't load
+save("Repoint Test", [
+    {"email": "peter@dailybugle.co.za", "phone": "0821000001", "first_name": "Peter", "last_name": "Parker", "company": "Daily Bugle"},
+    {"email": "peter.parker@dailybugle.co.za", "phone": "0821000002", "first_name": "Peter", "last_name": "Parker", "company": "Daily Bugle"},
+    {"email": "spidey@gmail.com", "phone": "0821000003", "first_name": "Spider", "last_name": "Man", "company": "Web Slingers"},
+])
+with SessionLocal() as db:
+    # As an earlier run (before lead_block_keys existed) would have left it
+    db.query(Lead).filter(Lead.email_key == "spidey@gmail.com").update({"duplicate_of": lead_id("peter.parker@dailybugle.co.za")})
+    db.add(DedupRun(niche="Repoint Test", max_lead_id=db.query(Lead.id).order_by(Lead.id.desc()).limit(1).scalar()))
+    db.commit()
+save("Repoint Test", [
+    {"email": "parker@dailybugle.co.za", "phone": "0821000004", "first_name": "Peter", "last_name": "Parker", "company": "Daily Bugle"},
+])
+scanned, new = dedup("Repoint Test")
+oldest = lead_id("peter@dailybugle.co.za")
+clusters = [duplicate_of(email) for email in ("peter.parker@dailybugle.co.za", "spidey@gmail.com", "parker@dailybugle.co.za")]
+print(f"Joined clusters: {scanned} leads loaded, duplicate_of {clusters} (oldest lead {oldest})")
+repoint_ok = scanned == 3 and new == 1 and clusters == [oldest] * 3 and duplicate_of("peter@dailybugle.co.za") is None
+
+# Incremental runs load the new leads and the stored ones sharing a block with them, not the whole niche
+FILLER = 500
+save("Dedup Test", [
+    {"email": f"filler{i}@gmail.com", "phone": f"+2783{i:07d}", "first_name": f"Filler{i}", "company": f"Filler{i} Holdings"}
+    for i in range(FILLER)
+] + [
+    {"email": "john.smith@seeff.co.za", "phone": "0824440001", "first_name": "John", "last_name": "Smith",
+     "company": "Seeff Properties", "location": "Cape Town"},
+    {"email": "ann@harcourts.co.za", "phone": "0215550000", "first_name": "Ann", "last_name": "Lee",
+     "company": "Harcourts", "location": "Cape Town"},
+])
+first_scanned, _ = dedup("Dedup Test")
+save("Dedup Test", [
+    # The same person under another mailbox and number: found by name and company domain
+    {"email": "jsmith@seeff.co.za", "phone": "0824440002", "first_name": "John", "last_name": "Smith",
+     "company": "Seeff", "location": "Cape Town"},
+    # A colleague on the agency's switchboard number: a different email, so not a duplicate
+    {"email": "bob@remax.co.za", "phone": "021 555 0000", "first_name": "Bob", "last_name": "Naidoo",
+     "company": "RE/MAX", "location": "Durban"},
+])
+scanned, new = dedup("Dedup Test")
+print(f"Incremental run: {new} new, {scanned} leads loaded of {FILLER + 4} (first run loaded {first_scanned})")
+incremental_ok = first_scanned == FILLER + 2 and new == 2 and scanned == 4
+
+fuzzy, switchboard = duplicate_of("jsmith@seeff.co.za"), duplicate_of("bob@remax.co.za")
+print(f"Fuzzy match: duplicate_of {fuzzy} (John Smith is {lead_id('john.smith@seeff.co.za')}); "
+      f"switchboard colleague: duplicate_of {switchboard}")
+match_ok = fuzzy == lead_id("john.smith@seeff.co.za") and switchboard is None
+
+if repoint_ok and incremental_ok and match_ok:
+    print("\nSUCCESS: Duplicates are found from new leads and their blocks only, and shared numbers don't merge people.")
+else:
+    print(f"\nFAILURE: Dedup checks failed: repoint {repoint_ok}, incremental {incremental_ok}, match {match_ok}")
@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from blacklist import add_to_blacklist, blacklist
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, Export, Lead
+from generators.report_generator import ReportGenerator, DELTA, SNAPSHOT
+
+print("--- Testing Incremental Reports ---")
+init_db()
+
+class ListCollector(BaseCollector):
+    def __init__(self, db_session, niche_name):
+        super().__init__(niche_name, db_session, batch_size=1000)
+
+    async def collect(self, leads=()):
+        for lead in leads:
+            self.save_lead(lead)
+
+def save(niche, numbers):
+    with SessionLocal() as db:
+        collector = ListCollector(db, niche)
+        for i in numbers:
+            collector.save_lead({"email": f"delta{i}@example.com", "phone": f"+2782{i:07d}", "company": f"Company {i}"})
+        collector.flush()
+
+def report(niche):
+    """What a nightly run does: the niche's new leads, written to PDF and Excel with their watermark."""
+    with SessionLocal() as db:
+        generator = ReportGenerator(output_dir=workdir, db_session=db)
+        records, watermark = generator.delta_leads(niche)
+        if records:
+            generator.generate_pdf(records, title=f"{niche} Leads", watermark=watermark, filename=f"{niche}.pdf")
+            generator.generate_excel(records, filename=f"{niche}.xlsx", watermark=watermark)
+        return sorted(int(record["email"][5:].split("@")[0]) for record in records), watermark
+
+def max_id(niche):
+    with SessionLocal() as db:
+        return db.query(Lead.id).filter(Lead.niche == niche).order_by(Lead.id.desc()).limit(1).scalar()
+
+# First run: everything; then only what is new, per niche
+save("Tutors", range(0, 50))
+save("Plumbers", range(100, 110))
+first, first_mark = report("Tutors")
+nothing, no_mark = report("Tutors")
+save("Tutors", range(50, 60))
+save("Tutors", range(0, 5))  # Re-seen: not new
+second, second_mark = report("Tutors")
+plumbers, _ = report("Plumbers")
+print(f"Deltas: first {len(first)} leads (watermark {first_mark['max_lead_id']}), then {len(nothing)}, "
+      f"then {second[:3]}... ({len(second)}); Plumbers {len(plumbers)}")
+delta_ok = first == list(range(50)) and first_mark["mode"] == DELTA and first_mark["max_lead_id"] == 50 \
+    and nothing == [] and no_mark is None and second == list(range(50, 60)) and plumbers == list(range(100, 110))
+
+# Duplicates and blacklisted leads are never reported, but the watermark moves past them
+save("Tutors", range(60, 70))
+with SessionLocal() as db:
+    db.query(Lead).filter(Lead.email_key == "delta60@example.com").update({"duplicate_of": 1})
+    add_to_blacklist(db, "delta61@example.com")
+    db.commit()
+blacklist.refresh(force=True)
+third, third_mark = report("Tutors")
+print(f"With a duplicate and a blacklisted lead: {len(third)} reported, watermark {third_mark['max_lead_id']}")
+skipped_ok = third == list(range(62, 70)) and third_mark["max_lead_id"] == max_id("Tutors")
+
+# A snapshot covers everything so far; the next delta continues after it
+save("Tutors", range(70, 75))
+with SessionLocal() as db:
+    ReportGenerator(output_dir=workdir, db_session=db).compact("Tutors")
+after_snapshot, _ = report("Tutors")
+save("Tutors", range(75, 80))
+fourth, _ = report("Tutors")
+with SessionLocal() as db:
+    exports = db.query(Export.mode, Export.format, Export.max_lead_id).filter(Export.niche == "Tutors").order_by(Export.id).all()
+print(f"After a snapshot: {len(after_snapshot)} then {fourth}; Tutors exports: {[tuple(export) for export in exports]}")
+snapshot_ok = after_snapshot == [] and fourth == list(range(75, 80)) \
+    and [mode for mode, _, _ in exports] == [DELTA] * 6 + [SNAPSHOT] + [DELTA] * 2 \
+    and all(exports[i][2] == exports[i + 1][2] for i in range(0, 6, 2))
+
+if delta_ok and skipped_ok and snapshot_ok:
+    print("\nSUCCESS: Reports cover the leads new since the niche's last export, and snapshots reset the watermark.")
+else:
+    print(f"\nFAILURE: Incremental report checks failed: delta {delta_ok}, skipped {skipped_ok}, snapshot {snapshot_ok}")
@@ -1,6 +1,16 @@
+import os
+import tempfile
+
+# A database of the test's own (for the enrichment cache), set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from database import init_db
 from processors.data_processor import DataProcessor
 from enrichment.google_places import GooglePlacesEnricher
 
+init_db()
+
 # Mock data
 raw_data = [
     {"email": "test@example.com", "phone": "1234567890", "company": "Test Corp"},
@@ -23,3 +33,65 @@ if 'rating' in cleaned_df.columns and 'enrichment_source' in cleaned_df.columns:
     print("\nSUCCESS: Enrichment fields found in processed data.")
 else:
     print("\nFAILURE: Enrichment fields missing.")
+
+print("\n--- Testing Batch Enrichment Against a Stub Places Server ---")
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+STUB_LATENCY = 0.2
+requests_seen = []
+
+class StubPlacesHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)['input'][0]
+        requests_seen.append(query)
+        time.sleep(STUB_LATENCY)
+        if query.startswith("Flaky") and requests_seen.count(query) == 1:
+            self.send_response(500)
+            self.end_headers()
+            return
+        if query.startswith("Ghost"):
+            payload = {"candidates": [], "status": "ZERO_RESULTS"}
+        else:
+            payload = {"candidates": [{"rating": 4.7, "user_ratings_total": 42, "business_status": "OPERATIONAL"}], "status": "OK"}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StubPlacesHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+stub_enricher = GooglePlacesEnricher(api_key="test-key", base_url=f"http://127.0.0.1:{server.server_port}")
+stub_enricher.retry_backoff = 0.05
+batch = [{"company": f"Company {i}", "location": "Cape Town"} for i in range(20)]
+batch += [{"company": "Flaky Co"}, {"company": "Ghost Co"}, {"company": None}]
+
+start = time.perf_counter()
+results = asyncio.run(stub_enricher.enrich_many(batch, max_concurrency=10, requests_per_second=100))
+elapsed = time.perf_counter() - start
+server.shutdown()
+
+serial_time = STUB_LATENCY * len(requests_seen)
+print(f"Enriched {len(results)} leads with {len(requests_seen)} requests in {elapsed:.2f}s (serial would take ~{serial_time:.1f}s)")
+
+checks = [
+    [r["company"] for r in results] == [b["company"] for b in batch],
+    all(r.get("enrichment_source") == "Google Places" for r in results[:21]),
+    "rating" not in results[21] and "rating" not in results[22],
+    requests_seen.count("Flaky Co") == 2,
+    elapsed < serial_time / 3,
+]
+if all(checks):
+    print("\nSUCCESS: Batch enrichment is concurrent, ordered and retries failures.")
+else:
+    print(f"\nFAILURE: Batch enrichment checks failed: {checks}")
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+import httpx
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from database import init_db, SessionLocal, EnrichmentCacheEntry
+from enrichment.base_enricher import BaseEnricher
+from enrichment.cache import CachedEnricher, business_cache_key
+from enrichment.google_places import GooglePlacesEnricher
+
+print("--- Testing the Enrichment Cache ---")
+init_db()
+
+class CountingEnricher(BaseEnricher):
+    """A Places-like lookup: 50 ms a call, no result for 'Ghost' businesses, a failure for 'Flaky' ones."""
+    max_retries = 0
+    cache_ttl = timedelta(minutes=5)
+
+    def __init__(self):
+        self.calls = []
+
+    def enrich(self, lead_data):
+        raise NotImplementedError
+
+    async def aenrich(self, lead_data):
+        self.calls.append(business_cache_key(lead_data))
+        await asyncio.sleep(0.05)
+        if lead_data["company"].startswith("Flaky"):
+            raise RuntimeError("upstream error")
+        if not lead_data["company"].startswith("Ghost"):
+            lead_data["rating"] = 4.5
+        return lead_data
+
+class ShortLivedEnricher(CountingEnricher):
+    cache_ttl = timedelta(milliseconds=200)
+
+BUSINESSES = 10
+# Three spellings of each business: suffixes, case and whitespace don't change its identity
+batch = [{"company": company.format(i), "location": location}
+         for i in range(BUSINESSES)
+         for company, location in (("Acme {} (Pty) Ltd", "Cape Town"), ("ACME {}", "cape town "), ("acme {}", "Cape  Town"))]
+batch += [{"company": "Ghost Co", "location": None}, {"company": "Flaky Co", "location": None}]
+
+# Cold: one call per business, however many leads share it
+upstream = CountingEnricher()
+cached = CachedEnricher(upstream)
+results = asyncio.run(cached.enrich_many(batch))
+print(f"Cold batch: {len(batch)} leads, {len(upstream.calls)} upstream calls, counters {cached.counters}")
+cold_ok = len(upstream.calls) == BUSINESSES + 2 and all(result.get("rating") == 4.5 for result in results[:3 * BUSINESSES]) \
+    and "rating" not in results[-2] and "rating" not in results[-1]
+
+# Warm: found and "not found" results come from memory; the failure is asked again
+upstream.calls.clear()
+results = asyncio.run(cached.enrich_many(batch))
+print(f"Warm batch: {len(upstream.calls)} upstream calls ({upstream.calls}), counters {cached.counters}")
+warm_ok = upstream.calls == ["flaky|"] and cached.counters["negative_hits"] == 1 \
+    and all(result.get("rating") == 4.5 for result in results[:3 * BUSINESSES])
+
+# Another process: the memory level is empty, the table answers in one bulk load
+cached._memory.clear()
+fresh_upstream = CountingEnricher()
+fresh = CachedEnricher(fresh_upstream)
+started = time.perf_counter()
+results = asyncio.run(fresh.enrich_many(batch[:-1]))
+elapsed = time.perf_counter() - started
+print(f"New process: {len(fresh_upstream.calls)} upstream calls, {fresh.counters['db_loads']} entries loaded "
+      f"from the table in {elapsed * 1000:.0f} ms")
+persist_ok = not fresh_upstream.calls and fresh.counters["db_loads"] == BUSINESSES + 1 \
+    and all(result.get("rating") == 4.5 for result in results[:3 * BUSINESSES])
+
+# Expiry: a result past its TTL is looked up again
+short_upstream = ShortLivedEnricher()
+short = CachedEnricher(short_upstream)
+asyncio.run(short.enrich_many(batch[:3]))
+asyncio.run(short.enrich_many(batch[:3]))
+time.sleep(0.25)
+asyncio.run(short.enrich_many(batch[:3]))
+print(f"Expiry: {len(short_upstream.calls)} upstream calls over three batches, the last after the TTL")
+expiry_ok = len(short_upstream.calls) == 2
+
+# Mock data, without an API key, is cached apart from real results: setting a key doesn't serve it
+places_calls = []
+
+def places(request):
+    places_calls.append(request.url.params["input"])
+    return httpx.Response(200, json={"status": "OK", "candidates": [
+        {"rating": 4.1, "user_ratings_total": 12, "business_status": "OPERATIONAL"}]})
+
+async def open_mock_transport():
+    keyed._client = httpx.AsyncClient(transport=httpx.MockTransport(places))
+
+with SessionLocal() as db:
+    # Mock data cached by an older version, under the real enricher's name, is dropped on startup
+    db.add(EnrichmentCacheEntry(enricher="GooglePlacesEnricher", cache_key="places|durban", expires_at=datetime.utcnow() + timedelta(days=1),
+                                payload='{"rating": 3.9, "enrichment_source": "Google Places (Mock)"}'))
+    db.commit()
+init_db()
+mock = CachedEnricher(GooglePlacesEnricher(api_key=""))
+mocked = asyncio.run(mock.enrich_many([{"company": "Places Co", "location": "Durban"}]))
+keyed = GooglePlacesEnricher(api_key="test-key")
+keyed.open = open_mock_transport
+real = asyncio.run(CachedEnricher(keyed).enrich_many([{"company": "Places Co", "location": "Durban"}]))
+print(f"Mock then real: {mocked[0]['enrichment_source']!r} cached as {mock.name!r}, "
+      f"then {real[0]['enrichment_source']!r} after {len(places_calls)} Places call(s)")
+mock_ok = mock.name == "GooglePlacesEnricher:mock" and mocked[0]["enrichment_source"] == "Google Places (Mock)" \
+    and places_calls == ["Places Co Durban"] and real[0]["enrichment_source"] == "Google Places" and real[0]["rating"] == 4.1
+
+if cold_ok and warm_ok and persist_ok and expiry_ok and mock_ok:
+    print("\nSUCCESS: Enrichment is cached by business identity, in memory and in the table, until its TTL; failures aren't cached.")
+else:
+    print(f"\nFAILURE: Enrichment cache checks failed: cold {cold_ok}, warm {warm_ok}, persist {persist_ok}, "
+          f"expiry {expiry_ok}, mock {mock_ok}")
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from collectors.base_collector import BaseCollector
+from collectors.fetch_scheduler import FetchScheduler
+from database import init_db
+from logger import logger
+
+print("--- Testing the Concurrent, Rate-Limited Fetch Scheduler ---")
+init_db()
+
+class Source:
+    """Pages that take `latency` seconds, recording how many are fetched at once."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.started = []
+
+    async def fetch(self, item):
+        self.started.append(time.monotonic())
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if item == "broken":
+                raise RuntimeError("page gone")
+            return item
+        finally:
+            self.in_flight -= 1
+
+async def collect(scheduler, source, items, host=None, on_error=None):
+    return [result async for result in scheduler.map(source.fetch, items, host=host, on_error=on_error)]
+
+async def concurrency():
+    # Five pages in flight at a time, results as they complete
+    source = Source(latency=0.1)
+    started = time.perf_counter()
+    results = await collect(FetchScheduler(max_concurrency=5, requests_per_second=None, jitter=0), source, range(30))
+    return sorted(results) == list(range(30)), source.most_in_flight, time.perf_counter() - started
+
+async def rate_limits():
+    # 10 requests per second per host, shared by every scheduler fetching from it; other hosts are separate
+    first, second, other = Source(), Source(), Source()
+    started = time.perf_counter()
+    await asyncio.gather(
+        collect(FetchScheduler(10, requests_per_second=10, jitter=0), first, range(15), host="shared.example.com"),
+        collect(FetchScheduler(10, requests_per_second=10, jitter=0), second, range(15), host="shared.example.com"),
+        collect(FetchScheduler(10, requests_per_second=10, jitter=0), other, range(10), host="other.example.com"),
+    )
+    shared = max(first.started + second.started) - started
+    separate = max(other.started) - started
+    return shared, separate
+
+async def failures():
+    # A failed page is reported and skipped; the others still arrive
+    errors = []
+    results = await collect(FetchScheduler(3, None, jitter=0), Source(), ["a", "broken", "b"],
+                            on_error=lambda item, error: errors.append((item, str(error))))
+    return sorted(results), errors
+
+async def early_exit():
+    # A consumer that stops reading leaves no fetch running
+    source = Source(latency=0.05)
+    async for _ in FetchScheduler(4, None, jitter=0).map(source.fetch, range(100)):
+        break
+    await asyncio.sleep(0.1)
+    return len(source.started), source.in_flight, len([task for task in asyncio.all_tasks() if task is not asyncio.current_task()])
+
+class PagedCollector(BaseCollector):
+    host = "pages.example.com"
+    max_concurrency = 4
+    requests_per_second = None
+
+    def __init__(self):
+        super().__init__("Fetch Test")
+
+    async def collect(self, num_samples=12):
+        async for lead in self.fetch_all(self.fetch_page, range(num_samples)):
+            self.save_lead(lead)
+
+    async def fetch_page(self, i):
+        await asyncio.sleep(0.1)
+        if i == 3:
+            raise RuntimeError("listing page gone")
+        return None if i == 4 else {"email": f"page{i}@example.com"}
+
+all_ok, most_in_flight, elapsed = asyncio.run(concurrency())
+print(f"Concurrency: 30 pages of 100 ms in {elapsed:.2f}s, at most {most_in_flight} in flight")
+concurrency_ok = all_ok and most_in_flight == 5 and elapsed < 1.0
+
+shared, separate = asyncio.run(rate_limits())
+print(f"Rate limits: 30 requests to a shared 10/s host took {shared:.2f}s, 10 to another host {separate:.2f}s")
+rate_ok = 1.8 < shared < 2.6 and separate < 0.3
+
+results, errors = asyncio.run(failures())
+started, in_flight, tasks = asyncio.run(early_exit())
+print(f"Failures: results {results}, errors {errors}; early exit: {started} fetches started, "
+      f"{in_flight} still in flight, {tasks} tasks left")
+errors_ok = results == ["a", "b"] and errors == [("broken", "page gone")] and started <= 8 and in_flight == 0 and tasks == 0
+
+class RecordList(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+# Without a database session, the per-lead warning is tagged for sampling like other per-lead messages
+records = RecordList()
+logger.addHandler(records)
+collector = PagedCollector()
+started = time.perf_counter()
+asyncio.run(collector.collect())
+elapsed = time.perf_counter() - started
+logger.removeHandler(records)
+no_session = [getattr(record, "sample", None) for record in records.records if "no database session" in record.getMessage()]
+print(f"Collector: {collector.processed_count} leads from 12 pages in {elapsed:.2f}s (1.2s one at a time), "
+      f"errors {collector.errors}; no-session warnings tagged {set(no_session)}")
+collector_ok = collector.processed_count == 10 and len(collector.errors) == 1 and "listing page gone" in collector.errors[0] \
+    and elapsed < 1.0 and len(no_session) == 10 and set(no_session) == {"lead_no_session"}
+
+if concurrency_ok and rate_ok and errors_ok and collector_ok:
+    print("\nSUCCESS: Fetches run concurrently within per-host rate limits, survive failures and stop with their consumer.")
+else:
+    print(f"\nFAILURE: Fetch scheduler checks failed: concurrency {concurrency_ok}, rate {rate_ok}, "
+          f"errors {errors_ok}, collector {collector_ok}")
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collectors.base_collector import BaseCollector
+from collectors.http_client import HttpCache, HttpClient
+
+print("--- Testing Conditional Requests Against a Stub Listing Server ---")
+PAGE_SIZE = 20000
+LAST_MODIFIED = formatdate(0, usegmt=True)
+responses = {200: 0, 304: 0}
+bytes_sent = [0]
+connections = set()
+
+class StubListingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        connections.add(self.client_address)
+        body = (self.path * (PAGE_SIZE // len(self.path) + 1))[:PAGE_SIZE].encode()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        # Odd pages validate by ETag, even ones by Last-Modified
+        by_etag = int(self.path.rsplit("/", 1)[-1]) % 2
+        if (by_etag and self.headers.get("If-None-Match") == etag) or \
+           (not by_etag and self.headers.get("If-Modified-Since") == LAST_MODIFIED):
+            responses[304] += 1
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        responses[200] += 1
+        bytes_sent[0] += len(body)
+        self.send_response(200)
+        self.send_header("ETag" if by_etag else "Last-Modified", etag if by_etag else LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StubListingHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_port}"
+cache_dir = tempfile.mkdtemp()
+
+class StubListingCollector(BaseCollector):
+    host = "127.0.0.1"
+    requests_per_second = None
+    parsed = 0
+
+    def __init__(self, cache):
+        super().__init__("Stub Listings")
+        self._http = HttpClient(cache=cache, max_connections=self.max_concurrency)
+
+    async def collect(self, num_samples=10):
+        async for lead in self.fetch_all(self.fetch_listing, range(num_samples)):
+            self.data.append(lead)
+
+    async def fetch_listing(self, i):
+        page = await self.get_page(f"{base_url}/listing/{i}")
+        if page.not_modified:
+            return None
+        self.parsed += 1
+        return {"company": f"Listing {i}", "size": len(page.content)}
+
+def run(cache):
+    collector = StubListingCollector(cache)
+    http = collector.http
+    asyncio.run(collector.collect(num_samples=10))
+    return collector, http
+
+cache = HttpCache(cache_dir, max_bytes=10 * 1024 * 1024)
+first, first_http = run(cache)
+second, second_http = run(HttpCache(cache_dir, max_bytes=10 * 1024 * 1024))  # index rebuilt from disk
+server.shutdown()
+
+print(f"First run: {first.parsed} pages parsed, {first_http.bytes_downloaded} bytes downloaded")
+print(f"Second run: {second.parsed} pages parsed, {second_http.not_modified} not modified, "
+      f"{second_http.bytes_saved} bytes saved, {second_http.bytes_downloaded} bytes downloaded")
+print(f"Server: {responses[200]} full responses, {responses[304]} not modified, "
+      f"{bytes_sent[0]} body bytes, {len(connections)} connections for {sum(responses.values())} requests")
+
+checks = [
+    first.parsed == 10 and len(first.data) == 10,
+    second.parsed == 0 and len(second.data) == 0,
+    responses == {200: 10, 304: 10},
+    second_http.bytes_saved == 10 * PAGE_SIZE and second_http.bytes_downloaded == 0,
+    len(connections) < sum(responses.values()),
+]
+if all(checks):
+    print("\nSUCCESS: Unchanged pages are revalidated with 304s and skipped, over pooled connections.")
+else:
+    print(f"\nFAILURE: Conditional request checks failed: {checks}")
+
+print("\n--- Testing LRU Eviction ---")
+lru = HttpCache(tempfile.mkdtemp(), max_bytes=3 * 1000)
+for name in ("a", "b", "c"):
+    lru.store(f"http://x/{name}", b"x" * 1000, etag=name)
+lru.read("http://x/a")  # a is now more recently used than b
+lru.store("http://x/d", b"x" * 1000, etag="d")
+cached = [name for name in "abcd" if lru.validators(f"http://x/{name}")]
+print(f"Cached after adding a 4th page: {cached}, {lru.size} bytes")
+
+if cached == ["a", "c", "d"] and lru.size == 3000:
+    print("\nSUCCESS: The least recently used page was evicted.")
+else:
+    print("\nFAILURE: Unexpected cache contents.")
+
+shutil.rmtree(cache_dir, ignore_errors=True)
+shutil.rmtree(lru.directory, ignore_errors=True)
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import tempfile
+import time
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from fastapi.testclient import TestClient
+import api
+from auth import get_password_hash
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, Lead, User
+from jobs import JobManager, CANCELLED, COMPLETED, RUNNING
+
+print("--- Testing Background Scrape Jobs ---")
+init_db()
+
+def stored(niche):
+    with SessionLocal() as db:
+        return db.query(Lead).filter(Lead.niche == niche).count()
+
+class PacedCollector(BaseCollector):
+    """Saves one lead every `pace` seconds, like a collector waiting on pages."""
+    niche = "Paced Jobs"
+    pace = 0.02
+    requests_per_second = None
+
+    def __init__(self, db_session=None):
+        super().__init__(self.niche, db_session, batch_size=10)
+
+    async def collect(self, num_samples=20):
+        for i in range(num_samples):
+            await asyncio.sleep(self.pace)
+            self.save_lead({"email": f"{self.niche.lower().replace(' ', '.')}{i}@example.com", "phone": f"+2786{i:07d}"})
+
+class SlowJobCollector(PacedCollector):
+    niche = "Slow Jobs"
+    pace = 0.1
+
+class BulkCollector(PacedCollector):
+    """Thousands of leads in large batches: the database writes must not hold up the event loop."""
+    niche = "Bulk Jobs"
+
+    def __init__(self, db_session=None):
+        BaseCollector.__init__(self, self.niche, db_session, batch_size=2000)
+
+    async def collect(self, num_samples=20000):
+        for i in range(num_samples):
+            if i % 200 == 0:
+                await asyncio.sleep(0)
+            self.save_lead({"email": f"bulk{i}@example.com", "phone": f"+2787{i:07d}", "company": f"Bulk {i}"})
+
+async def wait_for_status(job, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while job.status not in statuses and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return job.status
+
+async def loop_lag(stop, lags):
+    """Records how late 10 ms sleeps wake up: how long the event loop was blocked."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+async def main():
+    manager = JobManager(max_workers=2)
+    await manager.start()
+
+    # Submitting a niche that has an active job returns that job
+    job, created = manager.submit("paced", PacedCollector, "Paced Jobs", num_samples=20)
+    again, created_again = manager.submit("paced", PacedCollector, "Paced Jobs", num_samples=20)
+    coalesce_ok = created and not created_again and again is job
+    status = await wait_for_status(job, (COMPLETED,))
+    print(f"Job {status}: coalesced {not created_again}, progress {job.progress()}, {job.leads_saved} leads, "
+          f"{stored('Paced Jobs')} stored")
+    complete_ok = coalesce_ok and status == COMPLETED and job.progress() == 1.0 and job.leads_saved == 20 \
+        and stored("Paced Jobs") == 20
+
+    # Cancelling a running job keeps the leads it had collected
+    slow, _ = manager.submit("slow", SlowJobCollector, "Slow Jobs", num_samples=100)
+    await wait_for_status(slow, (RUNNING,))
+    await asyncio.sleep(0.55)
+    manager.cancel(slow.id)
+    status = await wait_for_status(slow, (CANCELLED,))
+    print(f"Cancelled job: {status} after {slow.processed} leads, {stored('Slow Jobs')} stored")
+    cancel_ok = status == CANCELLED and 0 < slow.processed < 100 and stored("Slow Jobs") == slow.processed
+
+    # The event loop keeps serving while a job writes large batches
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(loop_lag(stop, lags))
+    bulk, _ = manager.submit("bulk", BulkCollector, "Bulk Jobs", num_samples=20000)
+    started = time.perf_counter()
+    await wait_for_status(bulk, (COMPLETED,), timeout=120)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    print(f"Bulk job: {stored('Bulk Jobs')} leads in {elapsed:.2f}s, longest event loop stall {max(lags) * 1000:.0f} ms")
+    responsive_ok = stored("Bulk Jobs") == 20000 and max(lags) < 0.25
+
+    # Stopping the manager with a job running returns (and cancels the job)
+    running, _ = manager.submit("slow", SlowJobCollector, "Slow Jobs", num_samples=100)
+    await wait_for_status(running, (RUNNING,))
+    await asyncio.sleep(0.25)
+    try:
+        await asyncio.wait_for(manager.stop(), 3)
+        stopped = True
+    except asyncio.TimeoutError:
+        stopped = False
+    print(f"Stop with a running job: returned {stopped}, job {running.status}")
+    stop_ok = stopped and running.status == CANCELLED
+
+    return complete_ok, cancel_ok, responsive_ok, stop_ok
+
+checks = asyncio.run(main())
+
+# Over the API, users see and cancel their own jobs only; superusers see them all
+with TestClient(api.app) as client:
+    with SessionLocal() as db:
+        for email, tier in (("pro1@test.com", "Pro"), ("pro2@test.com", "Pro"), ("free@test.com", "Free")):
+            db.add(User(email=email, hashed_password=get_password_hash("test123"), is_active=1, is_superuser=0, subscription_tier=tier))
+        db.commit()
+
+    def login(email, password="test123"):
+        token = client.post("/token", data={"username": email, "password": password}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    pro1, pro2, free, admin = (login("pro1@test.com"), login("pro2@test.com"), login("free@test.com"),
+                               login("admin@leadforge.com", "admin"))
+    own, _ = api.job_manager.submit("owned", SlowJobCollector, "Owned Jobs", num_samples=100, requested_by="pro1@test.com")
+    shared, _ = api.job_manager.submit("shared", SlowJobCollector, "Shared Jobs", num_samples=100, requested_by="pro2@test.com")
+    api.job_manager.submit("shared", SlowJobCollector, "Shared Jobs", num_samples=100, requested_by="pro1@test.com")
+
+    def listed(headers):
+        return [(job["niche"], job["requested_by"]) for job in client.get("/jobs", headers=headers).json()]
+
+    lists = {name: listed(headers) for name, headers in (("pro1", pro1), ("pro2", pro2), ("free", free), ("admin", admin))}
+    codes = [client.get(f"/jobs/{own.id}", headers=pro2).status_code, client.get(f"/jobs/{own.id}", headers=free).status_code,
+             client.delete(f"/jobs/{own.id}", headers=pro2).status_code, client.delete(f"/jobs/{shared.id}", headers=pro2).status_code,
+             client.get(f"/jobs/{shared.id}", headers=pro1).status_code, client.delete(f"/jobs/{own.id}", headers=pro1).status_code,
+             client.delete(f"/jobs/{shared.id}", headers=admin).status_code]
+    print(f"Jobs listed: {lists}; others' jobs, a shared job, own jobs: {codes}")
+    owner_ok = sorted(lists["pro1"]) == [("Owned Jobs", "pro1@test.com"), ("Shared Jobs", None)] \
+        and lists["pro2"] == [("Shared Jobs", "pro2@test.com")] and lists["free"] == [] \
+        and sorted(lists["admin"]) == [("Owned Jobs", "pro1@test.com"), ("Shared Jobs", "pro2@test.com")] \
+        and codes == [404, 404, 404, 403, 200, 200, 200]
+checks += (owner_ok,)
+
+if all(checks):
+    print("\nSUCCESS: Jobs run, coalesce and cancel in the background without stalling the event loop, and stop cleanly; "
+          "users only see and cancel their own.")
+else:
+    print(f"\nFAILURE: Job checks failed (complete, cancel, responsive, stop, owner): {checks}")
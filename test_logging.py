@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+# The application log of the test's own, rotated at 4 KB, set before the logger is imported
+workdir = tempfile.mkdtemp()
+app_log = os.path.join(workdir, "app.log")
+os.environ.update({"LOG_FILE": app_log, "LOG_MAX_MB": str(4 / 1024), "LOG_ROTATE_HOURS": "0"})
+
+from logger import JsonFormatter, RotatingLogFile, SamplingFilter, logger, tail_log
+
+print("--- Testing Sampled, Rotating and Tail-Efficient Logging ---")
+
+def make_logger(name, handler):
+    test_logger = logging.getLogger(name)
+    test_logger.propagate = False
+    test_logger.addHandler(handler)
+    test_logger.setLevel(logging.INFO)
+    return test_logger
+
+# Sampling: 3 per window pass, the rest are counted and reported by the next one that passes
+records = []
+
+class ListHandler(logging.Handler):
+    def emit(self, record):
+        records.append(record.getMessage())
+
+sampled = ListHandler()
+sampled.addFilter(SamplingFilter(burst=3, window=0.2))
+sample_logger = make_logger("test.sampling", sampled)
+for i in range(100):
+    sample_logger.info(f"Saved lead {i}", extra={"sample": "lead"})
+sample_logger.info("Collection complete")  # not tagged: never sampled
+time.sleep(0.25)
+sample_logger.info("Saved lead 100", extra={"sample": "lead"})
+print(f"Sampling: {len(records)} of 102 messages kept, last: {records[-1]!r}")
+sampling_ok = len(records) == 5 and records[-1] == "Saved lead 100 (97 similar messages suppressed)"
+
+# Size rotation: 1 KB files, 2 backups
+size_path = os.path.join(workdir, "size.log")
+size_handler = RotatingLogFile(size_path, max_bytes=1024, interval_seconds=0, backup_count=2)
+size_logger = make_logger("test.size", size_handler)
+for i in range(100):
+    size_logger.info(f"line {i:03d} " + "x" * 40)
+size_handler.close()
+rotated = sorted(name for name in os.listdir(workdir) if name.startswith("size.log"))
+print(f"Size rotation: {rotated}, largest {max(os.path.getsize(os.path.join(workdir, name)) for name in rotated)} bytes")
+size_ok = rotated == ["size.log", "size.log.1", "size.log.2"] and all(
+    os.path.getsize(os.path.join(workdir, name)) <= 1024 for name in rotated
+)
+
+# Time rotation: a file last written two days ago is rotated on the first write
+time_path = os.path.join(workdir, "time.log")
+with open(time_path, "w") as f:
+    f.write("yesterday's line\n")
+two_days_ago = time.time() - 2 * 86400
+os.utime(time_path, (two_days_ago, two_days_ago))
+time_handler = RotatingLogFile(time_path, max_bytes=0, interval_seconds=86400, backup_count=3)
+time_handler.setFormatter(JsonFormatter())
+time_logger = make_logger("test.time", time_handler)
+time_logger.info("today's line", extra={"niche": "Tutors"})
+time_handler.close()
+with open(time_path) as f:
+    entry = json.loads(f.read())
+print(f"Time rotation: backup exists {os.path.exists(time_path + '.1')}, JSON line: {entry}")
+time_ok = os.path.exists(time_path + ".1") and entry["message"] == "today's line" and entry["niche"] == "Tutors"
+
+# Tail: the last lines of a large file, without reading all of it
+big_path = os.path.join(workdir, "big.log")
+with open(big_path, "w") as f:
+    for i in range(500000):
+        f.write(f"2026-01-01 00:00:00 - LeadForge - INFO - message number {i}\n")
+started = time.perf_counter()
+tail = tail_log(big_path, 50)
+tail_ms = (time.perf_counter() - started) * 1000
+started = time.perf_counter()
+with open(big_path) as f:
+    expected = [line.rstrip("\n") for line in f.readlines()[-50:]]
+readlines_ms = (time.perf_counter() - started) * 1000
+print(f"Tail of a {os.path.getsize(big_path) // (1024 * 1024)} MB log: {tail_ms:.2f} ms (readlines: {readlines_ms:.0f} ms)")
+tail_ok = tail == expected and tail_ms < readlines_ms / 10 and tail_log(big_path, 0) == []
+
+# Forked workers (the PDF pool): records written before os._exit(), and only the main process rotates
+logger.info("Before the fork")
+time.sleep(0.1)
+pid = os.fork()
+if pid == 0:
+    for i in range(100):
+        logger.info(f"Child line {i:03d} " + "x" * 40)
+    os._exit(0)
+os.waitpid(pid, 0)
+with open(app_log) as f:
+    child_lines = sum("Child line" in line for line in f)
+child_rotated = os.path.exists(app_log + ".1")
+logger.info("After the fork")
+deadline = time.monotonic() + 2
+while not os.path.exists(app_log + ".1") and time.monotonic() < deadline:
+    time.sleep(0.01)
+print(f"Forked worker: {child_lines} of 100 lines written, rotated by the worker {child_rotated}, "
+      f"by the main process afterwards {os.path.exists(app_log + '.1')}")
+fork_ok = child_lines == 100 and not child_rotated and os.path.exists(app_log + ".1")
+
+if sampling_ok and size_ok and time_ok and tail_ok and fork_ok:
+    print("SUCCESS: Per-lead messages are sampled, logs rotate by size and time, and tails don't read the whole file.")
+else:
+    print("FAILURE: Logging checks failed.")
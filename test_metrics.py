@@ -0,0 +1,88 @@
+import asyncio
+import os
+import tempfile
+import time
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from fastapi.testclient import TestClient
+import metrics
+from api import app
+from collectors.base_collector import BaseCollector
+from database import init_db
+from processors.data_processor import DataProcessor
+
+print("--- Testing Pipeline and API Metrics ---")
+init_db()
+
+def sample(name, labels=None):
+    return metrics.REGISTRY.get_sample_value(name, labels or {}) or 0
+
+class FlakyCollector(BaseCollector):
+    requests_per_second = None
+
+    def __init__(self):
+        super().__init__("Metrics Test")
+
+    async def collect(self, num_samples=10):
+        async for lead in self.fetch_all(self.fetch_item, range(num_samples)):
+            self.save_lead(lead)
+
+    async def fetch_item(self, i):
+        if i % 5 == 0:
+            raise RuntimeError("listing page gone")
+        return {"email": f"lead{i}@example.com", "phone": f"+2782{i:07d}", "company": f"Company {i}"}
+
+collector = FlakyCollector()
+collector.scheduler.jitter = 0
+asyncio.run(collector.collect(num_samples=20))
+fetches_ok = sample("leadforge_collector_fetches_total", {"niche": "Metrics Test", "outcome": "success"})
+fetches_failed = sample("leadforge_collector_fetches_total", {"niche": "Metrics Test", "outcome": "error"})
+fetch_count = sample("leadforge_collector_fetch_seconds_count", {"niche": "Metrics Test"})
+print(f"Fetches: {fetches_ok:.0f} succeeded, {fetches_failed:.0f} failed, {fetch_count:.0f} timed")
+
+processor = DataProcessor(collector.data)
+processor.clean_data(enrich=False)
+processor.score_leads()
+stages = {stage: sample("leadforge_processor_stage_seconds_count", {"stage": stage}) for stage in ("prepare", "score")}
+print(f"Processor stages timed: {stages}")
+
+client = TestClient(app)
+client.get("/health")
+client.get("/jobs/abc123")
+client.get("/jobs/def456")
+client.get("/no-such-page")
+response = client.get("/metrics")
+text = response.text
+job_requests = sample("leadforge_http_requests_total", {"method": "GET", "route": "/jobs/{job_id}", "status": "401"})
+print(f"/metrics: {response.status_code} {response.headers['content-type']}, {len(text.splitlines())} lines; "
+      f"/jobs/{{job_id}} requests without a token: {job_requests:.0f}")
+
+textfile = os.path.join(workdir, "leadforge.prom")
+metrics.METRICS_TEXTFILE = textfile
+metrics.export_batch()
+with open(textfile) as f:
+    exported = f.read()
+
+# Instrumentation must be cheap enough to leave on: time a labelled histogram observation
+observations = 100000
+histogram = metrics.FETCH_SECONDS.labels("Overhead Test")
+started = time.perf_counter()
+for _ in range(observations):
+    with histogram.time():
+        pass
+per_observation_us = (time.perf_counter() - started) / observations * 1e6
+print(f"Overhead: {per_observation_us:.2f} us per timed block")
+
+if (fetches_ok == 16 and fetches_failed == 4 and fetch_count == 20
+        and all(stages.values())
+        and response.status_code == 200 and "leadforge_http_request_seconds_bucket" in text
+        and job_requests == 2 and "/jobs/abc123" not in text
+        and 'route="unmatched"' in text
+        and "leadforge_collector_fetches_total" in exported
+        and per_observation_us < 50):
+    print("SUCCESS: Stages, fetches and requests are measured, exposed on /metrics and exported for batch runs.")
+else:
+    print("FAILURE: Metrics missing or wrong.")
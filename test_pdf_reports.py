@@ -0,0 +1,54 @@
+import os
+import tempfile
+from pypdf import PdfReader
+from generators.pdf_renderer import ROWS_ON_FIRST_PAGE, ROWS_PER_PAGE, paginate, write
+from main import start_pdf_pool
+
+print("--- Testing Paginated, Parallel PDF Reports ---")
+workdir = tempfile.mkdtemp()
+LEADS = 3000
+
+records = [{"first_name": f"Agent{i}", "last_name": "Doe", "company": f"Company {i}", "location": "Cape Town",
+            "phone": f"+2782{i:07d}", "email": f"agent{i}@example.com", "score": i % 100} for i in range(LEADS)]
+records[0]["company"] = "A Company Name Far Too Long To Fit In Its Column"
+records[1]["first_name"], records[1]["last_name"] = "Zoë", "北京"
+records[2]["location"] = "N/A"
+
+def pages_text(path):
+    return [page.extract_text() for page in PdfReader(path).pages]
+
+# The same report, rendered in one process and in chunks of 10 pages across a pool
+serial = pages_text(write(records, os.path.join(workdir, "serial.pdf"), title="Agents"))
+pool = start_pdf_pool(2)
+try:
+    chunked = pages_text(write(records, os.path.join(workdir, "chunked.pdf"), title="Agents", executor=pool, chunk_pages=10))
+    small = pages_text(write(records[:10], os.path.join(workdir, "small.pdf"), title="Agents", executor=pool, chunk_pages=10))
+finally:
+    pool.shutdown()
+
+expected_pages = 1 + -(-(LEADS - ROWS_ON_FIRST_PAGE) // ROWS_PER_PAGE)
+print(f"Pages: {len(serial)} serial, {len(chunked)} chunked (expected {expected_pages}), {len(small)} for 10 leads")
+pages_ok = len(serial) == len(chunked) == expected_pages == len(paginate(list(range(LEADS)))) and len(small) == 1 \
+    and serial == chunked
+
+# Each page numbered in the whole report, the title on the first only, every lead once in order
+eleventh = chunked[10]
+first_row = ROWS_ON_FIRST_PAGE + 9 * ROWS_PER_PAGE
+print(f"Page 11 starts with Agent{first_row}: {f'Agent{first_row} Doe' in eleventh}; "
+      f"footers: {chunked[0].splitlines()[-1]!r}, {eleventh.splitlines()[-1]!r}")
+layout_ok = chunked[0].startswith("Agents") and not eleventh.startswith("Agents") \
+    and f"Page 1 of {expected_pages}" in chunked[0] and f"Page 11 of {expected_pages}" in eleventh \
+    and f"Agent{first_row} Doe" in eleventh and f"Agent{first_row - 1} Doe" in chunked[9] \
+    and sum(text.count("@example.com") for text in chunked) == LEADS
+
+# Cells: long text is clipped, text outside Latin-1 is replaced, N/A is left blank
+first_page = chunked[0]
+print(f"Cells: clipped {'Far Too Long To Fit In Its Column' not in first_page}, "
+      f"Latin-1 {'Zoë ??' in first_page}, N/A shown {'N/A' in first_page}")
+cells_ok = "A Company Name" in first_page and "Far Too Long To Fit In Its Column" not in first_page \
+    and "Zoë ??" in first_page and "N/A" not in first_page
+
+if pages_ok and layout_ok and cells_ok:
+    print("\nSUCCESS: PDF reports paginate to fixed pages and render the same in chunks across processes.")
+else:
+    print(f"\nFAILURE: PDF report checks failed: pages {pages_ok}, layout {layout_ok}, cells {cells_ok}")
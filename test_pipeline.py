@@ -0,0 +1,86 @@
+import asyncio
+import os
+import tempfile
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+import main
+import processors.data_processor  # Loaded before leaving the source tree (see below)
+import generators.excel_writer
+import generators.pdf_renderer
+from collectors.base_collector import BaseCollector
+from database import SessionLocal, Export, Lead
+from registry import LazyRegistry
+
+print("--- Testing Concurrent Niche Pipelines ---")
+# Reports are written under the working directory: use the test's own
+os.chdir(workdir)
+
+sessions = []
+active = {"now": 0, "most": 0}
+
+class PipelineCollector(BaseCollector):
+    niche = None
+    requests_per_second = None
+
+    def __init__(self, db_session=None):
+        super().__init__(self.niche, db_session)
+        sessions.append(db_session)
+
+    async def collect(self, num_samples=20):
+        active["now"] += 1
+        active["most"] = max(active["most"], active["now"])
+        try:
+            for i in range(num_samples):
+                await asyncio.sleep(0.02)
+                key = self.niche.lower().replace(" ", ".")
+                self.save_lead({"email": f"{key}{i}@example.com", "phone": f"+2785{ord(self.niche[0])}{i:05d}",
+                                "first_name": f"Person{i}", "company": f"{self.niche} Co"})
+        finally:
+            active["now"] -= 1
+
+class AlphaCollector(PipelineCollector):
+    niche = "Alpha Niche"
+
+class BetaCollector(PipelineCollector):
+    niche = "Beta Niche"
+
+class GammaCollector(PipelineCollector):
+    niche = "Gamma Niche"
+
+class BrokenCollector(PipelineCollector):
+    niche = "Broken Niche"
+
+    async def collect(self, num_samples=20):
+        await asyncio.sleep(0.02)
+        raise RuntimeError("listing site is down")
+
+niches = LazyRegistry("niche")
+for collector in (AlphaCollector, BetaCollector, GammaCollector, BrokenCollector):
+    niches.register(collector.niche.lower().replace(" ", "_"), f"__main__:{collector.__name__}", label=collector.niche)
+main.NICHES = niches
+main.niche_label = lambda key: niches.meta(key)["label"]
+
+results = {result["niche"]: result for result in asyncio.run(main.main_async(max_concurrency=2))}
+
+with SessionLocal() as db:
+    stored = {niche: db.query(Lead).filter(Lead.niche == niche).count() for niche in results}
+    reported = {niche: db.query(Export).filter(Export.niche == niche).count() for niche in results}
+print(f"Results: { {niche: (result['status'], result['leads']) for niche, result in results.items()} }")
+print(f"Stored: {stored}, reports: {reported}")
+print(f"Sessions: {len(sessions)} collectors, {len(set(map(id, sessions)))} distinct sessions; "
+      f"at most {active['most']} niches collecting at once")
+
+healthy = ("Alpha Niche", "Beta Niche", "Gamma Niche")
+pipeline_ok = all(results[niche]["status"] == "success" and results[niche]["leads"] == 20 and stored[niche] == 20
+                  and reported[niche] == 2 for niche in healthy)
+isolation_ok = results["Broken Niche"]["status"] == "failed" and "listing site is down" in results["Broken Niche"]["error"] \
+    and stored["Broken Niche"] == 0
+concurrency_ok = len(set(map(id, sessions))) == 4 and active["most"] == 2
+
+if pipeline_ok and isolation_ok and concurrency_ok:
+    print("\nSUCCESS: Niches run concurrently up to the limit, each on its own session, and a failing one doesn't stop the rest.")
+else:
+    print(f"\nFAILURE: Pipeline checks failed: pipeline {pipeline_ok}, isolation {isolation_ok}, concurrency {concurrency_ok}")
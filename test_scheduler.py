@@ -0,0 +1,156 @@
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+import scheduler
+from database import init_db, SessionLocal, Source
+from scheduler import CronSchedule, IntervalSchedule, ScheduledNiche, SchedulerService, parse_schedule
+
+print("--- Testing the Cron Parser and Scheduler Service ---")
+init_db()
+
+# Cron: next matching minute, day fields, aliases and intervals
+cases = [
+    ("*/15 9-17 * * 1-5", datetime(2026, 10, 16, 17, 50), datetime(2026, 10, 19, 9, 0)),  # Friday evening -> Monday
+    ("0 6 * * *", datetime(2026, 10, 17, 6, 0), datetime(2026, 10, 18, 6, 0)),
+    ("0 0 13 * 5", datetime(2026, 10, 10), datetime(2026, 10, 13)),  # The 13th or a Friday
+    ("0 0 13 * 5", datetime(2026, 10, 13), datetime(2026, 10, 16)),
+    ("30 2 * * 7", datetime(2026, 10, 17, 12, 0), datetime(2026, 10, 18, 2, 30)),  # 7 is Sunday too
+    ("0 0 29 2 *", datetime(2026, 3, 1), datetime(2028, 2, 29)),
+    ("5,35 */6 1 1,7 *", datetime(2026, 1, 1, 6, 40), datetime(2026, 1, 1, 12, 5)),
+]
+found = [CronSchedule(expression).next_after(moment) for expression, moment, _ in cases]
+for (expression, moment, expected), actual in zip(cases, found):
+    print(f"  {expression!r} after {moment}: {actual} (expected {expected})")
+aliases = [parse_schedule(text).next_after(datetime(2026, 10, 17, 10, 59, 30)) for text in ("@hourly", "@daily", "@weekly")]
+intervals = [parse_schedule(text).seconds for text in ("every 30m", "Every 1.5h", "every 45s", "every 1d")]
+print(f"Aliases: {aliases}; intervals: {intervals}")
+cron_ok = found == [expected for _, _, expected in cases] \
+    and aliases == [datetime(2026, 10, 17, 11), datetime(2026, 10, 18), datetime(2026, 10, 18)] \
+    and intervals == [1800, 5400, 45, 86400]
+
+rejected = []
+for text in ("* * *", "61 * * * *", "0 0 0 * *", "*/0 * * * *", "5-1 * * * *", "0 0 30 2 *", "every 5x", "every", "every 0s"):
+    try:
+        parse_schedule(text)
+    except ValueError:
+        rejected.append(text)
+try:
+    SchedulerService(niches=[], overlap="maybe")
+except ValueError:
+    rejected.append("overlap maybe")
+print(f"Rejected: {rejected}")
+invalid_ok = len(rejected) == 10
+
+# The service, with pipelines that only take time
+runs = []
+durations = {}
+
+async def fake_run_niche(collector_class, niche_name, num_samples=20, pdf_executor=None):
+    run = {"niche": niche_name, "start": time.monotonic(), "end": None}
+    runs.append(run)
+    try:
+        await asyncio.sleep(durations[niche_name])
+        if niche_name == "Broken":
+            raise RuntimeError("listing site is down")
+        return 7
+    finally:
+        run["end"] = time.monotonic()
+
+scheduler.run_niche = fake_run_niche
+
+sessions = []
+
+def counting_sessions():
+    """The scheduler's session factory, recording whether each session was opened on the event loop."""
+    try:
+        asyncio.get_running_loop()
+        sessions.append("event loop")
+    except RuntimeError:
+        sessions.append("worker thread")
+    return SessionLocal()
+
+scheduler.SessionLocal = counting_sessions
+
+def serve(niches, seconds, overlap="skip", max_concurrency=4, stops=1, shutdown_timeout=30):
+    """Runs the service for `seconds`, then stops it `stops` times; returns how long it took to stop."""
+    runs.clear()
+    service = SchedulerService(niches=niches, jitter=0, overlap=overlap, max_concurrency=max_concurrency,
+                               shutdown_timeout=shutdown_timeout)
+
+    async def main():
+        serving = asyncio.create_task(service.run(run_now=True))
+        await asyncio.sleep(seconds)
+        stopped = time.monotonic()
+        for _ in range(stops):
+            service.stop()
+        await serving
+        return time.monotonic() - stopped
+
+    return asyncio.run(main())
+
+def niche(name, seconds, every):
+    durations[name] = seconds
+    return ScheduledNiche(None, name, IntervalSchedule(every))
+
+def sources():
+    with SessionLocal() as db:
+        return {source.name: source for source in db.query(Source).all()}
+
+def most_at_once(selected):
+    moments = sorted([(run["start"], 1) for run in selected] + [(run["end"], -1) for run in selected])
+    most = now = 0
+    for _, change in moments:
+        now += change
+        most = max(most, now)
+    return most
+
+# Overlap: due every 0.2s, a run takes 0.5s; "skip" drops the slots that come due meanwhile
+serve([niche("Skipped", 0.5, 0.2)], 1.1)
+skipped = list(runs)
+gaps = [later["start"] - earlier["end"] for earlier, later in zip(skipped, skipped[1:])]
+# "queue" starts one more run as soon as the previous one ends, however many slots came due
+serve([niche("Queued", 0.5, 0.2)], 1.1, overlap="queue")
+queued = list(runs)
+queue_gaps = [later["start"] - earlier["end"] for earlier, later in zip(queued, queued[1:])]
+print(f"Overlap: skip ran {len(skipped)} times, gaps {[round(gap, 2) for gap in gaps]}; "
+      f"queue ran {len(queued)} times, gaps {[round(gap, 2) for gap in queue_gaps]}")
+overlap_ok = len(skipped) == 2 and most_at_once(skipped) == 1 and all(0 < gap < 0.25 for gap in gaps) \
+    and len(queued) == 3 and most_at_once(queued) == 1 and all(gap < 0.05 for gap in queue_gaps)
+
+# Bookkeeping on the sources table, and a limit on pipelines at once
+serve([niche("Alpha", 0.3, 60), niche("Beta", 0.3, 60), niche("Gamma", 0.3, 60), niche("Broken", 0.1, 60)],
+      0.5, max_concurrency=2)
+rows = sources()
+print(f"Records: {[(name, rows[name].status, rows[name].last_leads, rows[name].last_error) for name in ('Alpha', 'Broken')]}, "
+      f"schedule {rows['Alpha'].schedule!r}; at most {most_at_once(runs)} of {len(runs)} pipelines at once; "
+      f"{sessions.count('worker thread')} sessions in worker threads, {sessions.count('event loop')} on the event loop")
+records_ok = most_at_once(runs) == 2 and len(runs) == 4 and sessions and "event loop" not in sessions \
+    and all(rows[name].status == scheduler.SUCCESS and rows[name].last_leads == 7 for name in ("Alpha", "Beta", "Gamma")) \
+    and rows["Broken"].status == scheduler.FAILED and rows["Broken"].last_error == "listing site is down" \
+    and rows["Alpha"].schedule == "every 60s" and rows["Alpha"].last_duration_seconds >= 0.3 \
+    and rows["Alpha"].last_scraped is not None and rows["Alpha"].next_run_at > datetime.utcnow()
+
+# Shutdown: a running pipeline finishes; a second signal, or the timeout, interrupts it
+graceful = serve([niche("Graceful", 0.6, 60)], 0.1)
+graceful_status = sources()["Graceful"].status
+cancelled = serve([niche("Cancelled", 5, 60)], 0.1, stops=2)
+timed_out = serve([niche("Timed Out", 5, 60)], 0.1, shutdown_timeout=0.3)
+rows = sources()
+print(f"Shutdown: graceful took {graceful:.2f}s ({graceful_status}), second signal {cancelled:.2f}s "
+      f"({rows['Cancelled'].status}), timeout {timed_out:.2f}s ({rows['Timed Out'].status})")
+shutdown_ok = 0.4 < graceful < 1.0 and graceful_status == scheduler.SUCCESS \
+    and cancelled < 1.0 and rows["Cancelled"].status == scheduler.INTERRUPTED \
+    and 0.3 <= timed_out < 1.5 and rows["Timed Out"].status == scheduler.INTERRUPTED
+
+if cron_ok and invalid_ok and overlap_ok and records_ok and shutdown_ok:
+    print("\nSUCCESS: Schedules fire when due, overlapping runs are skipped or queued, and shutdown lets runs finish.")
+else:
+    print(f"\nFAILURE: Scheduler checks failed: cron {cron_ok}, invalid {invalid_ok}, overlap {overlap_ok}, "
+          f"records {records_ok}, shutdown {shutdown_ok}")
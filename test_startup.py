@@ -0,0 +1,49 @@
+import os
+import re
+import subprocess
+import sys
+
+# Import-time budgets (ms, best of RUNS) for the API and the CLI. Heavy
+# libraries (pandas, fpdf, Excel writers, the collectors) must load on first
+# use, not at startup; raise a budget only for a deliberate new dependency.
+BUDGETS_MS = {
+    "api": int(os.getenv("STARTUP_BUDGET_MS_API", "1200")),
+    "main": int(os.getenv("STARTUP_BUDGET_MS_CLI", "800")),
+    "scheduler": int(os.getenv("STARTUP_BUDGET_MS_CLI", "800")),
+}
+LAZY_MODULES = ("pandas", "numpy", "fpdf", "pypdf", "xlsxwriter", "openpyxl", "httpx", "collectors.base_collector")
+RUNS = 3
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+env = dict(os.environ, PYTHONPATH=SRC)
+
+def import_time_ms(module):
+    """Cumulative import time of module in a fresh interpreter, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", result.stderr, re.MULTILINE)
+    return int(match.group(1)) / 1000
+
+def eager_imports(module):
+    """The LAZY_MODULES that importing module loads anyway."""
+    code = f"import sys, {module}; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+print("--- Testing Startup Import Time ---")
+failures = []
+for module, budget in BUDGETS_MS.items():
+    elapsed = min(import_time_ms(module) for _ in range(RUNS))
+    eager = eager_imports(module)
+    print(f"import {module}: {elapsed:.0f} ms (budget {budget} ms), eagerly loaded: {eager or 'none of the lazy modules'}")
+    if elapsed > budget:
+        failures.append(f"{module} took {elapsed:.0f} ms")
+    if eager:
+        failures.append(f"{module} imports {', '.join(eager)} at startup")
+
+if not failures:
+    print("\nSUCCESS: The API and the CLI start within budget and load heavy libraries lazily.")
+else:
+    print(f"\nFAILURE: {'; '.join(failures)}")
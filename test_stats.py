@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func
+from api import app
+from collectors.base_collector import BaseCollector
+from database import async_engine, delete_leads, rebuild_lead_stats, SessionLocal, Lead
+import stats
+
+print("--- Testing Incremental Lead Counters ---")
+
+class ListCollector(BaseCollector):
+    def __init__(self, db_session, niche_name):
+        super().__init__(niche_name, db_session, batch_size=25)
+
+    async def collect(self, leads=()):
+        for lead in leads:
+            self.save_lead(lead)
+
+def save(niche, numbers, source):
+    with SessionLocal() as db:
+        collector = ListCollector(db, niche)
+        for i in numbers:
+            collector.save_lead({"email": f"stat{i}@example.com", "phone": f"+2782{i:07d}", "source": source})
+        collector.flush()
+
+def counted():
+    """Lead counts per niche the slow way, straight from the leads table."""
+    with SessionLocal() as db:
+        return dict(db.query(Lead.niche, func.count(Lead.id)).group_by(Lead.niche).order_by(Lead.niche).all())
+
+statements = []
+event.listen(async_engine.sync_engine, "before_cursor_execute",
+             lambda conn, cursor, statement, *args: statements.append(statement))
+
+with TestClient(app) as client:
+    token = client.post("/token", data={"username": "admin@leadforge.com", "password": "admin"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Counters follow new leads, not re-seen ones, and deletions
+    save("Tutors", range(30), "Teach Me 2")
+    save("Plumbers", range(100, 120), "Yellow Pages")
+    save("Tutors", range(20, 40), "SA Tutors")  # 10 re-seen, 10 new; the re-seen ones move source
+    save("Tutors", range(35, 40), None)  # Re-seen without a source: it stays
+    with SessionLocal() as db:
+        delete_leads(db, [lead_id for (lead_id,) in db.query(Lead.id).filter(Lead.niche == "Tutors").limit(5)])
+        db.commit()
+    statements.clear()
+    served = client.get("/stats", headers=headers).json()
+    reads_totals = any("lead_totals" in statement for statement in statements)
+    reads_leads = any(" leads" in statement and "lead_totals" not in statement for statement in statements)
+    print(f"Stats: {served}, counted {counted()}; /stats read the leads table: {reads_leads}")
+    sources = client.get("/stats/breakdown", params={"bucket": "month", "niche": "Tutors", "by_source": True},
+                         headers=headers).json()
+    sources = {entry["source"]: entry["count"] for entry in sources}
+    with SessionLocal() as db:
+        stored_sources = dict(db.query(Lead.source, func.count(Lead.id)).filter(Lead.niche == "Tutors").group_by(Lead.source).all())
+    print(f"Tutors by source: {sources}, stored {stored_sources}")
+    counters_ok = served == counted() == {"Plumbers": 20, "Tutors": 35} and reads_totals and not reads_leads \
+        and sources == stored_sources == {"Teach Me 2": 15, "SA Tutors": 20}
+
+    # Concurrent collectors: every new lead counted once
+    threads = [threading.Thread(target=save, args=("Movers", range(200 + offset, 300 + offset), "Race"))
+               for offset in (0, 50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    served = client.get("/stats", headers=headers).json()
+    print(f"Concurrent collectors: {served['Movers']} Movers counted, {counted()['Movers']} stored")
+    race_ok = served["Movers"] == counted()["Movers"] == 150
+
+    # Breakdown: per day, week (from Monday) and month, rebuilt from the leads table
+    with SessionLocal() as db:
+        for day, ids in ((datetime(2026, 1, 5), range(100, 105)), (datetime(2026, 1, 11), range(105, 110)),
+                         (datetime(2026, 2, 3), range(110, 120))):
+            db.query(Lead).filter(Lead.email_key.in_([f"stat{i}@example.com" for i in ids])).update(
+                {"date_added": day}, synchronize_session=False)
+        rebuild_lead_stats(db)
+        db.commit()
+    weeks = client.get("/stats/breakdown", params={"bucket": "week", "niche": "Plumbers"}, headers=headers).json()
+    months = client.get("/stats/breakdown", params={"bucket": "month", "niche": "Plumbers", "by_source": True,
+                                                   "until": "2026-12-31"}, headers=headers).json()
+    bad = client.get("/stats/breakdown", params={"bucket": "year"}, headers=headers).status_code
+    print(f"Weeks: {[(entry['period'], entry['count']) for entry in weeks]}, "
+          f"months: {[(entry['period'], entry['source'], entry['count']) for entry in months]}, bad bucket: {bad}")
+    breakdown_ok = [(entry["period"], entry["count"]) for entry in weeks] == [("2026-01-05", 10), ("2026-02-02", 10)] \
+        and [(entry["period"], entry["source"], entry["count"]) for entry in months] == [
+            ("2026-01-01", "Yellow Pages", 10), ("2026-02-01", "Yellow Pages", 10)] \
+        and bad == 400 and stats.bucket_start(date(2026, 2, 3), "week") == date(2026, 2, 2)
+
+if counters_ok and race_ok and breakdown_ok:
+    print("\nSUCCESS: Niche counters are maintained with every write, served without counting leads, and broken down by period.")
+else:
+    print(f"\nFAILURE: Stats checks failed: counters {counters_ok}, race {race_ok}, breakdown {breakdown_ok}")
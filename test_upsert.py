@@ -0,0 +1,87 @@
+import os
+import tempfile
+import threading
+
+# A database of the test's own, set before the application is imported
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
+
+from collectors.base_collector import BaseCollector
+from database import init_db, SessionLocal, Lead
+
+print("--- Testing Lead Dedup Keys and Upserts ---")
+init_db()
+
+class ListCollector(BaseCollector):
+    def __init__(self, db_session, niche_name="Upsert Test", batch_size=50):
+        super().__init__(niche_name, db_session, batch_size=batch_size, flush_interval_ms=60000)
+
+    async def collect(self, leads=()):
+        for lead in leads:
+            self.save_lead(lead)
+
+def save(leads, niche_name="Upsert Test", batch_size=50):
+    """Saves the leads through save_lead, outside an event loop (each flush is synchronous)."""
+    with SessionLocal() as db:
+        collector = ListCollector(db, niche_name, batch_size)
+        for lead in leads:
+            collector.save_lead(lead)
+        collector.flush()
+        return collector
+
+def stored(**filters):
+    with SessionLocal() as db:
+        return db.query(Lead).filter_by(**filters).all()
+
+# Across batches: formats normalize to one key, and fields merge by policy
+save([{"email": "Jane@Example.com ", "phone": "082 123 4567", "first_name": "Jane", "company": "Old Co", "location": "Durban"}])
+second = save([{"email": "jane@example.com", "phone": "+27 82 123 4567", "first_name": None, "company": "New Co"}],
+              niche_name="Other Niche")
+jane = stored(email_key="jane@example.com")
+print(f"Re-seen lead: {len(jane)} row(s), first_name={jane[0].first_name!r}, company={jane[0].company!r}, "
+      f"location={jane[0].location!r}, niche={jane[0].niche!r}; counted as new: {len(second.data)}")
+merge_ok = len(jane) == 1 and jane[0].first_name == "Jane" and jane[0].company == "New Co" \
+    and jane[0].location == "Durban" and jane[0].niche == "Upsert Test" and not second.data
+
+# Within a batch: every sighting is merged into one row, whether it shares the email or only the phone
+batch = save([
+    {"email": "sam@example.com", "phone": "0831112222", "company": "First Co"},
+    {"email": None, "phone": "+27831112222", "role": "Agent"},
+    {"email": "SAM@example.com", "phone": None, "company": "Last Co"},
+])
+sam = stored(phone_key="+27831112222")
+print(f"One batch, three sightings: {len(sam)} row(s), company={sam[0].company!r}, role={sam[0].role!r}; "
+      f"new leads: {len(batch.data)}")
+batch_ok = len(sam) == 1 and sam[0].company == "Last Co" and sam[0].role == "Agent" and len(batch.data) == 1
+
+# A shared switchboard number doesn't merge people with different emails; a phone-only sighting joins them
+save([{"email": "ann@agency.co.za", "phone": "0215550000"}])
+save([{"email": "bob@agency.co.za", "phone": "021 555 0000"}, {"email": None, "phone": "0215550000", "role": "Agent"}])
+switchboard = stored(phone_key="+27215550000")
+print(f"Switchboard number: {sorted(lead.email_key for lead in switchboard)}, "
+      f"phone-only sighting merged into {[lead.email_key for lead in switchboard if lead.role == 'Agent']}")
+switchboard_ok = sorted(lead.email_key for lead in switchboard) == ["ann@agency.co.za", "bob@agency.co.za"] \
+    and [lead.email_key for lead in switchboard if lead.role == "Agent"] == ["ann@agency.co.za"]
+
+# Concurrent collectors: one sees each person with an email, the other by phone only
+PEOPLE = 300
+barrier = threading.Barrier(2)
+
+def race(with_email):
+    leads = [{"email": f"racer{i}@example.com" if with_email else None, "phone": f"+2784{i:07d}"} for i in range(PEOPLE)]
+    barrier.wait()
+    save(leads, niche_name="Race Test", batch_size=5)
+
+threads = [threading.Thread(target=race, args=(with_email,)) for with_email in (True, False)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+racers = stored(niche="Race Test")
+print(f"Concurrent collectors: {len(racers)} leads stored for {PEOPLE} people")
+race_ok = len(racers) == PEOPLE and len({lead.phone_key for lead in racers}) == PEOPLE
+
+if merge_ok and batch_ok and switchboard_ok and race_ok:
+    print("\nSUCCESS: Leads are matched by normalized email or phone, merged by policy, and never inserted twice.")
+else:
+    print(f"\nFAILURE: Upsert checks failed: merge {merge_ok}, batch {batch_ok}, switchboard {switchboard_ok}, race {race_ok}")